@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+BatchFn = Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]
+
+
+class _TierStats:
+    __slots__ = ("calls", "hits", "errors", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.hits = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / self.calls, 4) if self.calls else 0.0,
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class ClassifierMetrics:
+    """
+    Per-tier counters for answer classification. A tier is "called" when an answer
+    reaches it and "hits" when its result is the one used, so hit rates show how much
+    traffic each tier absorbs before the next (slower) one.
+    """
+
+    def __init__(self) -> None:
+        self._tiers: Dict[str, _TierStats] = {}
+        self.batches = 0
+        self.batched_items = 0
+        self.max_batch = 0
+
+    def observe(self, tier: str, started: float, *, hit: bool, error: bool = False) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats = self._tiers.setdefault(tier, _TierStats())
+        stats.calls += 1
+        stats.hits += int(hit)
+        stats.errors += int(error)
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+    def observe_batch(self, size: int) -> None:
+        self.batches += 1
+        self.batched_items += size
+        self.max_batch = max(self.max_batch, size)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "tiers": {tier: stats.snapshot() for tier, stats in self._tiers.items()},
+            "batches": {
+                "requests": self.batches,
+                "items": self.batched_items,
+                "mean_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                "max_size": self.max_batch,
+            },
+        }
+
+
+class ClassificationBatcher:
+    """
+    Micro-batching for LLM classifications.
+
+    Concurrent `classify` calls (from different sessions) are collected for up to
+    `window_ms`, or until `max_batch_size` are waiting, and sent to `classify_batch`
+    as one request. Identical inputs in a batch are sent once. If the batch call
+    fails, every waiter gets the exception and falls back on its own.
+    """
+
+    def __init__(
+        self,
+        classify_batch: BatchFn,
+        *,
+        max_batch_size: int = 8,
+        window_ms: float = 15.0,
+        metrics: Optional[ClassifierMetrics] = None,
+    ) -> None:
+        self.classify_batch = classify_batch
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window_ms = window_ms
+        self.metrics = metrics
+        self._pending: List[Tuple[str, "asyncio.Future[Dict[str, Any]]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task[None]] = set()
+
+    async def classify(self, text: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[str, "asyncio.Future[Dict[str, Any]]"]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        if self.metrics is not None:
+            self.metrics.observe_batch(len(texts))
+        try:
+            results = await self.classify_batch(texts)
+            if len(results) != len(texts):
+                raise ValueError(f"batch classifier returned {len(results)} results for {len(texts)} inputs")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, results))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+@lru_cache
+def get_classifier_metrics() -> ClassifierMetrics:
+    return ClassifierMetrics()
@@ -19,6 +19,7 @@ def general_chat():
         state.messages.append({"role": "assistant", "content": reply})
         state.qna_mode = False
         state.current_question_id = None
+        state.qna_tree_version = None
         return state
 
     return _chat
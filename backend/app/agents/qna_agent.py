@@ -1,76 +1,208 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import re
+import time
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 from instructor import from_openai
-from openai import OpenAI
+from langgraph.config import get_stream_writer
+from openai import AsyncOpenAI
 
 from ..core.config import get_settings
-from ..qna_graph.models import HasTraitEdge, ProgrammingLanguagePreference, QuestionNode
+from ..qna_graph.compiled_tree import CompiledQuestion, CompiledTree, PatternMatch, word_regex
+from ..qna_graph.models import (
+    HasTraitEdge,
+    ProgrammingLanguagePreference,
+    ProgrammingLanguagePreferenceBatch,
+    QuestionNode,
+)
 from ..qna_graph.service import QnaService
+from ..services.llm_cache import get_llm_cache, normalize_input
 from ..utils.langgraph_state import ChatState
+from .answer_classifier import ClassificationBatcher, get_classifier_metrics
+from .question_prefetch import PrefetchKey, QuestionTextPrefetcher, StreamWriter
 
 settings = get_settings()
 
+CLASSIFIER_PROMPT_VERSION = "v1"
+_LANGUAGE_CACHE_NAMESPACE = "qna.classify.ProgrammingLanguagePreference"
+
+ClassifierResult = tuple[str | None, Dict[str, Any], float]
+
 
 def _slugify(text: str) -> str:
     return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
 
 
+_POLYGLOT_RE = word_regex(["depends", "no favorite", "whatever", "polyglot"])
+_LANGUAGE_RE = word_regex(["python", "java", "go", "rust", "typescript", "javascript", "c++", "c#", "ruby"])
+
+
 def _heuristic_classify_language(answer: str) -> ProgrammingLanguagePreference:
-    lower = answer.lower()
-    polyglot_patterns = [
-        "depends",
-        "no favorite",
-        "whatever",
-        "whatever the problem is",
-        "depends on the problem",
-        "polyglot",
-    ]
-    for pat in polyglot_patterns:
-        if pat in lower:
-            return ProgrammingLanguagePreference(kind="polyglot", language_name=None)
-    # simple language match
-    langs = ["python", "java", "go", "rust", "typescript", "javascript", "c++", "c#", "ruby"]
-    for lang in langs:
-        if lang in lower:
-            return ProgrammingLanguagePreference(kind="single_language", language_name=lang)
+    if _POLYGLOT_RE.search(answer):
+        return ProgrammingLanguagePreference(kind="polyglot", language_name=None)
+    match = _LANGUAGE_RE.search(answer)
+    if match:
+        return ProgrammingLanguagePreference(kind="single_language", language_name=match.group(0).lower())
     return ProgrammingLanguagePreference(kind="unknown", language_name=None)
 
 
-def classify_with_instructor(question: QuestionNode, answer_text: str) -> tuple[str | None, Dict[str, Any], float]:
+def _pattern_language_preference(match: PatternMatch) -> ProgrammingLanguagePreference:
+    if match.normalized_value == "polyglot":
+        return ProgrammingLanguagePreference(kind="polyglot", language_name=None)
+    return ProgrammingLanguagePreference(kind="single_language", language_name=match.matched)
+
+
+def _is_language_classifier(question: QuestionNode) -> bool:
     classifier_cfg = question.classifier or {}
-    strategy = classifier_cfg.get("strategy")
-    dataclass_name = classifier_cfg.get("dataclass")
-    if strategy == "instructor_dataclass" and dataclass_name == "ProgrammingLanguagePreference":
-        if not settings.OPENAI_API_KEY:
-            pref = _heuristic_classify_language(answer_text)
-        else:
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            inst_client = from_openai(client)
-            pref = inst_client.chat.completions.create(
-                model=settings.OPENAI_CHAT_MODEL,
-                messages=[{"role": "user", "content": answer_text}],
-                response_model=ProgrammingLanguagePreference,
-            )
-        normalized = None
-        attributes: Dict[str, Any] = {"kind": pref.kind}
-        if pref.kind == "polyglot":
-            normalized = "polyglot"
-        elif pref.kind == "single_language" and pref.language_name:
-            normalized = _slugify(pref.language_name)
-            attributes["language_name"] = pref.language_name
-        else:
-            normalized = "unknown"
+    return (
+        classifier_cfg.get("strategy") == "instructor_dataclass"
+        and classifier_cfg.get("dataclass") == "ProgrammingLanguagePreference"
+    )
+
+
+async def _classify_languages_with_openai(answer_texts: List[str]) -> List[Dict[str, Any]]:
+    """Classify a batch of answers in one structured request; results are in input order."""
+    inst_client = from_openai(AsyncOpenAI(api_key=settings.OPENAI_API_KEY))
+    if len(answer_texts) == 1:
+        pref = await inst_client.chat.completions.create(
+            model=settings.OPENAI_CHAT_MODEL,
+            messages=[{"role": "user", "content": answer_texts[0]}],
+            response_model=ProgrammingLanguagePreference,
+        )
+        return [{"kind": pref.kind, "language_name": pref.language_name}]
+    numbered = "\n".join(f"{i}. {json.dumps(text)}" for i, text in enumerate(answer_texts, 1))
+    batch = await inst_client.chat.completions.create(
+        model=settings.OPENAI_CHAT_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "Each numbered line is one person's answer about their favorite programming language. "
+                f"Classify every answer independently and return exactly {len(answer_texts)} items in the same order.",
+            },
+            {"role": "user", "content": numbered},
+        ],
+        response_model=ProgrammingLanguagePreferenceBatch,
+    )
+    return [{"kind": pref.kind, "language_name": pref.language_name} for pref in batch.items]
+
+
+@lru_cache
+def _language_batcher() -> ClassificationBatcher:
+    return ClassificationBatcher(
+        _classify_languages_with_openai,
+        max_batch_size=settings.QNA_CLASSIFY_BATCH_SIZE,
+        window_ms=settings.QNA_CLASSIFY_BATCH_WINDOW_MS,
+        metrics=get_classifier_metrics(),
+    )
+
+
+def _language_result(pref: ProgrammingLanguagePreference, confidence: Optional[float] = None) -> ClassifierResult:
+    attributes: Dict[str, Any] = {"kind": pref.kind}
+    if pref.kind == "polyglot":
+        normalized = "polyglot"
+    elif pref.kind == "single_language" and pref.language_name:
+        normalized = _slugify(pref.language_name)
+        attributes["language_name"] = pref.language_name
+    else:
+        normalized = "unknown"
+    if confidence is None:
         confidence = 0.9 if normalized != "unknown" else 0.5
-        return normalized, attributes, confidence
+    return normalized, attributes, confidence
+
 
-    # Fallback
-    pref = _heuristic_classify_language(answer_text)
-    normalized = "polyglot" if pref.kind == "polyglot" else _slugify(pref.language_name or "unknown")
-    confidence = 0.6
-    return normalized, {"kind": pref.kind, "language_name": pref.language_name}, confidence
+def _pattern_result(question: QuestionNode, match: PatternMatch) -> ClassifierResult:
+    if _is_language_classifier(question):
+        return _language_result(_pattern_language_preference(match), match.confidence)
+    return match.normalized_value, {"option": match.option.label, "matched": match.matched}, match.confidence
+
+
+def _pattern_tier(
+    question: QuestionNode, answer_text: str, compiled: Optional[CompiledQuestion]
+) -> tuple[Optional[PatternMatch], Optional[ClassifierResult]]:
+    started = time.perf_counter()
+    match = compiled.classify(answer_text) if compiled is not None else None
+    confident = match is not None and match.confidence >= settings.QNA_CLASSIFY_MIN_CONFIDENCE
+    get_classifier_metrics().observe("pattern", started, hit=confident)
+    return match, _pattern_result(question, match) if confident else None
+
+
+def _heuristic_tier(question: QuestionNode, answer_text: str, match: Optional[PatternMatch]) -> ClassifierResult:
+    started = time.perf_counter()
+    if match is not None:
+        # Without an LLM verdict even an ambiguous pattern match beats the generic heuristic.
+        result = _pattern_result(question, match)
+    elif _is_language_classifier(question):
+        result = _language_result(_heuristic_classify_language(answer_text))
+    else:
+        pref = _heuristic_classify_language(answer_text)
+        normalized = "polyglot" if pref.kind == "polyglot" else _slugify(pref.language_name or "unknown")
+        result = normalized, {"kind": pref.kind, "language_name": pref.language_name}, 0.6
+    get_classifier_metrics().observe("heuristic", started, hit=True)
+    return result
+
+
+async def _cached_language_classification(answer_text: str) -> Dict[str, Any]:
+    cache = get_llm_cache()
+    key = cache.make_key(
+        _LANGUAGE_CACHE_NAMESPACE,
+        settings.OPENAI_CHAT_MODEL,
+        CLASSIFIER_PROMPT_VERSION,
+        normalize_input(answer_text, casefold=True),
+    )
+    if cache.enabled:
+        started = time.perf_counter()
+        cached = await asyncio.to_thread(cache.lookup, _LANGUAGE_CACHE_NAMESPACE, key)
+        get_classifier_metrics().observe("llm_cache", started, hit=cached is not None)
+        if cached is not None:
+            return cached
+    started = time.perf_counter()
+    try:
+        value = await _language_batcher().classify(answer_text)
+    except Exception:
+        get_classifier_metrics().observe("llm", started, hit=False, error=True)
+        raise
+    get_classifier_metrics().observe("llm", started, hit=True)
+    if cache.enabled:
+        await asyncio.to_thread(
+            cache.set,
+            _LANGUAGE_CACHE_NAMESPACE,
+            key,
+            value,
+            model=settings.OPENAI_CHAT_MODEL,
+            template_version=CLASSIFIER_PROMPT_VERSION,
+        )
+    return value
+
+
+async def classify_answer(
+    question: QuestionNode,
+    answer_text: str,
+    compiled: Optional[CompiledQuestion] = None,
+) -> ClassifierResult:
+    """
+    Tiered classification of a free-text answer:
+
+    1. the question's compiled option patterns, accepted at `QNA_CLASSIFY_MIN_CONFIDENCE`;
+    2. the LLM, through the response cache and a micro-batcher shared by all sessions;
+    3. local heuristics, when no API key is configured or the LLM call fails.
+
+    Per-tier hit rates and latency are in `get_classifier_metrics()`.
+    """
+    match, result = _pattern_tier(question, answer_text, compiled)
+    if result is not None:
+        return result
+    if _is_language_classifier(question) and settings.OPENAI_API_KEY:
+        try:
+            value = await _cached_language_classification(answer_text)
+        except Exception as e:
+            print(f"[qna] LLM classification failed, using heuristics: {e}")
+        else:
+            return _language_result(ProgrammingLanguagePreference(**value))
+    return _heuristic_tier(question, answer_text, match)
 
 
 def _build_traits(user_id: str, question: QuestionNode, normalized_value: str, attributes: Dict[str, Any], confidence: float) -> List[HasTraitEdge]:
@@ -101,17 +233,26 @@ def _summarize_history(messages: list[dict[str, str]], limit: int = 8) -> str:
     return "\n".join(snippet)
 
 
-def _generate_question_text(question: QuestionNode, state: ChatState) -> str:
+async def _generate_question_text(
+    question: QuestionNode, state: ChatState, *, writer: Optional[StreamWriter] = None
+) -> str:
     """
     If a generation_prompt is provided on the question node, use the LLM to craft
     a contextual question based on conversation history. Falls back to static text.
+
+    Tokens are forwarded to the LangGraph stream writer as they arrive, so streaming
+    callers see the question being written; for `ainvoke` the writer is a no-op.
+    Speculative generations pass a `TokenRelay` that holds tokens back until the
+    branch wins.
     """
     if not question.generation_prompt:
         return question.text
     if not settings.OPENAI_API_KEY:
         return question.text
+    if writer is None:
+        writer = get_stream_writer()
     try:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         history = _summarize_history(state.messages)
         messages = [
             {"role": "system", "content": question.generation_prompt},
@@ -120,23 +261,56 @@ def _generate_question_text(question: QuestionNode, state: ChatState) -> str:
                 "content": f"Conversation history:\n{history}\n\nReturn one concise follow-up question.",
             },
         ]
-        resp = client.chat.completions.create(model=settings.OPENAI_CHAT_MODEL, messages=messages, max_tokens=100)
-        content = resp.choices[0].message.content if resp and resp.choices else None
-        return content.strip() if content else question.text
+        response = await client.chat.completions.create(
+            model=settings.OPENAI_CHAT_MODEL, messages=messages, max_tokens=100, stream=True
+        )
+        parts: List[str] = []
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                writer({"type": "token", "question_id": question.id, "content": delta})
+        content = "".join(parts).strip()
+        return content or question.text
     except Exception:
         return question.text
 
 
+def _speculative_branches(question: QuestionNode, tree: CompiledTree, answer_text: str) -> List[QuestionNode]:
+    """Next questions worth generating ahead of classification (only LLM-generated ones)."""
+    compiled = tree.questions[question.id]
+    if question.qtype != "free_text_classified":
+        # Unclassified answers normalize deterministically, so the branch is already known.
+        next_q = compiled.next_question(answer_text.strip().lower())
+        candidates = (next_q,) if next_q else ()
+    else:
+        match = compiled.classify(answer_text)
+        if match is not None and match.confidence >= settings.QNA_CLASSIFY_MIN_CONFIDENCE:
+            # classify_answer will take this value, so only its branch can follow.
+            next_q = compiled.next_question(match.normalized_value)
+            candidates = (next_q,) if next_q else ()
+        else:
+            candidates = compiled.branch_targets()
+    branches = [q for q in candidates if q.generation_prompt]
+    return branches[: settings.QNA_PREFETCH_MAX_BRANCHES]
+
+
 def ask_next_question(qna_service: QnaService):
     async def _ask(state: ChatState) -> ChatState:
-        next_q = await qna_service.get_next_question_for_user(state.user_id, state.qna_tree_id or "")
+        tree_id = state.qna_tree_id or ""
+        if not state.qna_tree_version:
+            # Pin the tree version so a reload mid-conversation doesn't reroute this flow.
+            tree = qna_service.get_compiled_tree(tree_id)
+            state.qna_tree_version = tree.content_hash if tree else None
+        next_q = await qna_service.get_next_question_for_user(state.user_id, tree_id, state.qna_tree_version)
         if not next_q:
             state.qna_mode = False
             state.current_question_id = None
+            state.qna_tree_version = None
             return state
         state.qna_mode = True
         state.current_question_id = next_q.id
-        question_text = _generate_question_text(next_q, state)
+        question_text = await _generate_question_text(next_q, state)
         _append_message(state, "assistant", question_text)
         state.pending_attribute = next_q.attribute
         return state
@@ -145,36 +319,30 @@ def ask_next_question(qna_service: QnaService):
 
 
 def process_answer(qna_service: QnaService):
-    async def _process(state: ChatState) -> ChatState:
-        if not state.current_question_id:
-            return state
-        # latest human message
-        latest_user = next((m for m in reversed(state.messages) if m.get("role") == "user"), None)
-        if not latest_user:
-            return state
-        answer_text = latest_user.get("content", "")
-        tree = qna_service.get_tree(state.qna_tree_id or "")
-        if not tree:
-            state.qna_mode = False
-            return state
-        question = tree.questions.get(state.current_question_id)
-        if not question:
-            state.qna_mode = False
-            return state
+    prefetcher = QuestionTextPrefetcher()
 
+    async def _finish_answer(
+        state: ChatState,
+        question: QuestionNode,
+        tree: CompiledTree,
+        answer_text: str,
+        speculative: Dict[str, PrefetchKey],
+    ) -> ChatState:
         normalized_value = None
         attributes: Dict[str, Any] = {}
         confidence = 0.5
 
         if question.qtype == "free_text_classified":
-            normalized_value, attributes, confidence = classify_with_instructor(question, answer_text)
+            normalized_value, attributes, confidence = await classify_answer(
+                question, answer_text, tree.questions[question.id]
+            )
         else:
             normalized_value = answer_text.strip().lower()
             attributes = {"value": normalized_value}
             confidence = 0.4
 
         traits = _build_traits(state.user_id, question, normalized_value or "unknown", attributes, confidence)
-        # Best-effort graph persistence; continue Q&A even if graph errors.
+        # Best-effort persistence (queued for the graph when write-behind is on); continue Q&A even on errors.
         try:
             await qna_service.record_answer(
                 user_id=state.user_id,
@@ -184,6 +352,7 @@ def process_answer(qna_service: QnaService):
                 attributes=attributes,
                 confidence=confidence,
                 traits=traits,
+                tree_id=tree.tree_id,
             )
         except Exception:
             pass
@@ -193,17 +362,60 @@ def process_answer(qna_service: QnaService):
         )
 
         # Decide next question using in-memory tree follow-ups to avoid graph lookups blocking the flow.
-        follow = question.follow_ups or {}
-        next_id = follow.get(normalized_value) or follow.get("default")
-        next_q = tree.questions.get(next_id) if next_id else None
+        next_q = tree.next_question(question.id, normalized_value)
+
+        winner = prefetcher.take(speculative.pop(next_q.id)) if next_q and next_q.id in speculative else None
+
         if next_q:
             state.current_question_id = next_q.id
             state.qna_mode = True
-            question_text = _generate_question_text(next_q, state)
+            if winner is not None:
+                task, relay = winner
+                relay.attach(get_stream_writer())
+                question_text = await task
+            else:
+                question_text = await _generate_question_text(next_q, state)
             _append_message(state, "assistant", question_text)
         else:
             state.qna_mode = False
             state.current_question_id = None
+            state.qna_tree_version = None
         return state
 
+    async def _process(state: ChatState) -> ChatState:
+        if not state.current_question_id:
+            return state
+        # latest human message
+        latest_user = next((m for m in reversed(state.messages) if m.get("role") == "user"), None)
+        if not latest_user:
+            return state
+        answer_text = latest_user.get("content", "")
+        tree = qna_service.get_compiled_tree(state.qna_tree_id or "", state.qna_tree_version)
+        if not tree:
+            state.qna_mode = False
+            state.qna_tree_version = None
+            return state
+        question = tree.question(state.current_question_id)
+        if not question:
+            state.qna_mode = False
+            state.qna_tree_version = None
+            return state
+
+        # Generate likely next-question texts while the answer is classified and persisted.
+        # The history they see is exactly what the chosen branch would see afterwards.
+        speculative: Dict[str, PrefetchKey] = {}
+        if settings.QNA_SPECULATIVE_PREFETCH and settings.OPENAI_API_KEY:
+            history = _summarize_history(state.messages)
+            snapshot = ChatState(messages=list(state.messages))
+            for branch in _speculative_branches(question, tree, answer_text):
+                key = prefetcher.make_key(tree.tree_id, branch.id, history)
+                prefetcher.start(key, lambda relay, b=branch: _generate_question_text(b, snapshot, writer=relay))
+                speculative[branch.id] = key
+
+        try:
+            return await _finish_answer(state, question, tree, answer_text, speculative)
+        finally:
+            # Losers, or every branch if classification/persistence raised.
+            prefetcher.discard(speculative.values())
+
     return _process
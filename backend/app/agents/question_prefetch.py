@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+PrefetchKey = Tuple[str, str, str]
+StreamWriter = Callable[[Any], None]
+
+
+class TokenRelay:
+    """
+    Stream writer for a speculative generation. Tokens are buffered until the branch
+    wins; `attach` then replays them to the real writer and forwards the rest live,
+    so the chosen question still streams. Losing branches never reach the client.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: List[Any] = []
+        self._writer: Optional[StreamWriter] = None
+
+    def __call__(self, chunk: Any) -> None:
+        if self._writer is None:
+            self._buffer.append(chunk)
+        else:
+            self._writer(chunk)
+
+    def attach(self, writer: StreamWriter) -> None:
+        buffered, self._buffer = self._buffer, []
+        for chunk in buffered:
+            writer(chunk)
+        self._writer = writer
+
+
+class QuestionTextPrefetcher:
+    """
+    Speculative generation of follow-up question text.
+
+    While an answer is being classified, `process_answer` starts generating the text
+    of every likely next question. Generations are keyed by (tree, question, history
+    hash) so an identical turn (retry, duplicate request) reuses the in-flight task;
+    once the real branch is known the winner is taken and the losers are cancelled.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._tasks: "OrderedDict[PrefetchKey, Tuple[asyncio.Task[str], TokenRelay]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"started": 0, "reused": 0, "hits": 0, "misses": 0, "discarded": 0}
+
+    @staticmethod
+    def make_key(tree_id: str, question_id: str, history: str) -> PrefetchKey:
+        return tree_id, question_id, hashlib.sha1(history.encode("utf-8")).hexdigest()
+
+    def start(self, key: PrefetchKey, generate: Callable[[TokenRelay], Awaitable[str]]) -> None:
+        if key in self._tasks:
+            self.stats["reused"] += 1
+            self._tasks.move_to_end(key)
+            return
+        relay = TokenRelay()
+        self._tasks[key] = (asyncio.ensure_future(generate(relay)), relay)
+        self.stats["started"] += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        overflow = len(self._tasks) - self.max_entries
+        if overflow <= 0:
+            return
+        # Finished generations go first; cancelling one still running is the last resort.
+        finished = [key for key, (task, _) in self._tasks.items() if task.done()]
+        running = [key for key in self._tasks if key not in set(finished)]
+        for key in (finished + running)[:overflow]:
+            task, _ = self._tasks.pop(key)
+            task.cancel()
+
+    def take(self, key: PrefetchKey) -> Optional[Tuple["asyncio.Task[str]", TokenRelay]]:
+        """The generation for `key`, or None; a cancelled generation counts as a miss."""
+        entry = self._tasks.pop(key, None)
+        if entry is not None and entry[0].cancelled():
+            entry = None
+        self.stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def discard(self, keys: Iterable[PrefetchKey]) -> None:
+        for key in keys:
+            entry = self._tasks.pop(key, None)
+            if entry is not None:
+                entry[0].cancel()
+                self.stats["discarded"] += 1
@@ -10,6 +10,7 @@ from . import (
     candidates,
     jobs,
     matching,
+    metrics,
     users,
 )
 
@@ -24,3 +25,4 @@ api_router.include_router(matching.router)
 api_router.include_router(agent_jobs.router)
 api_router.include_router(agent_candidates.router)
 api_router.include_router(chat_routes.router)
+api_router.include_router(metrics.router)
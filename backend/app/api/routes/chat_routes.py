@@ -1,17 +1,96 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+import json
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ...core.config import get_settings
+from ...core.database import SessionLocal
+from ...models.user import User
+from ...services.conversation_store import ConversationRecord, ConversationStore
 from ...utils.langgraph_state import ChatState
-from ...schemas.chat import ChatRequest, ChatResponse, ChatMessage
-from ..deps import get_current_user, get_db
+from ...schemas.chat import ChatMessage, ChatRequest, ChatResponse, ChatSocketFrame
+from ..deps import decode_token, get_current_user, get_db, get_user_from_token
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 settings = get_settings()
 
 
+def _load_conversation(store: ConversationStore, db: Session, payload: ChatRequest, current_user) -> ConversationRecord:
+    user_type = payload.user_type or ("candidate" if getattr(current_user, "role", None) == "candidate" else "job_poster")
+    if payload.conversation_id:
+        convo = store.get(db, payload.conversation_id, user_id=current_user.id)
+        if convo is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return convo
+    return store.create(db, user_id=current_user.id, user_type=user_type)
+
+
+def _build_state(convo: ConversationRecord, payload: ChatRequest, current_user) -> ChatState:
+    """Rebuild graph state from the stored conversation; explicitly sent Q&A fields win."""
+    incoming = [m.model_dump() for m in payload.messages]
+    incoming.append({"role": "user", "content": payload.message})
+
+    explicit = payload.model_fields_set
+    state = ChatState(
+        messages=list(convo.messages) + incoming,
+        conversation_id=convo.id,
+        user_id=str(current_user.id),
+        # Applied to the stored conversation by `_finish_turn` once the turn persists.
+        user_type=payload.user_type or convo.user_type,  # type: ignore[arg-type]
+        qna_tree_id=payload.qna_tree_id if "qna_tree_id" in explicit else convo.qna_tree_id,
+        qna_tree_version=convo.qna_tree_version,
+        qna_mode=payload.qna_mode if "qna_mode" in explicit else convo.qna_mode,
+        current_question_id=payload.current_question_id if "current_question_id" in explicit else convo.current_question_id,
+    )
+    return state
+
+
+def _finish_turn(
+    store: ConversationStore,
+    db: Session,
+    convo: ConversationRecord,
+    result_state: ChatState,
+    *,
+    turn_start: int,
+    reply_start: int,
+) -> ChatResponse:
+    """
+    Persist this turn's messages (client-sent and graph-produced, from `turn_start`)
+    and return only what the graph added (from `reply_start`).
+    """
+    # Strip non-serializable metadata (db session, user objects)
+    meta = dict(result_state.metadata or {})
+    meta.pop("db", None)
+    meta.pop("current_user", None)
+
+    new_messages = result_state.messages[reply_start:]
+    store.append(
+        db,
+        convo,
+        result_state.messages[turn_start:],
+        user_type=result_state.user_type,
+        qna_tree_id=result_state.qna_tree_id,
+        qna_mode=result_state.qna_mode,
+        current_question_id=result_state.current_question_id,
+        qna_tree_version=result_state.qna_tree_version,
+    )
+
+    return ChatResponse(
+        conversation_id=convo.id,
+        messages=[ChatMessage(**m) for m in new_messages],
+        qna_mode=result_state.qna_mode,
+        current_question_id=result_state.current_question_id,
+        qna_tree_id=result_state.qna_tree_id,
+        metadata=meta,
+    )
+
+
 @router.post("/router", response_model=ChatResponse)
 async def route_chat(
     payload: ChatRequest,
@@ -24,34 +103,298 @@ async def route_chat(
         raise HTTPException(status_code=500, detail="Router graph not initialized")
 
     router_graph = request.app.state.router_graph
+    store: ConversationStore = request.app.state.conversation_store
 
-    messages = [m.model_dump() for m in payload.messages]
-    messages.append({"role": "user", "content": payload.message})
-
-    user_type = payload.user_type or ("candidate" if getattr(current_user, "role", None) == "candidate" else "job_poster")
-    state = ChatState(
-        messages=messages,
-        user_id=str(current_user.id),
-        user_type=user_type,  # type: ignore[arg-type]
-        qna_tree_id=payload.qna_tree_id,
-        qna_mode=payload.qna_mode,
-        current_question_id=payload.current_question_id,
-    )
+    convo = _load_conversation(store, db, payload, current_user)
+    turn_start = len(convo.messages)
+    state = _build_state(convo, payload, current_user)
+    reply_start = len(state.messages)
     state.metadata["db"] = db
     state.metadata["current_user"] = current_user
 
     raw_state = await router_graph.ainvoke(state)
     result_state: ChatState = raw_state if isinstance(raw_state, ChatState) else ChatState(**raw_state)
 
-    # Strip non-serializable metadata (db session, user objects)
-    meta = dict(result_state.metadata or {})
-    meta.pop("db", None)
-    meta.pop("current_user", None)
+    return _finish_turn(store, db, convo, result_state, turn_start=turn_start, reply_start=reply_start)
 
-    return ChatResponse(
-        messages=[ChatMessage(**m) for m in result_state.messages],
-        qna_mode=result_state.qna_mode,
-        current_question_id=result_state.current_question_id,
-        qna_tree_id=result_state.qna_tree_id,
-        metadata=meta,
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _turn_events(
+    router_graph,
+    store: ConversationStore,
+    db: Session,
+    convo: ConversationRecord,
+    state: ChatState,
+    *,
+    turn_start: int,
+    reply_start: int,
+    outcome: Dict[str, Any] | None = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run one streamed turn, yielding `(event, data)` pairs: `node` when a graph node
+    finishes, `token` for LLM output as it is generated, `message` for each message
+    appended to the conversation, and a final `done` carrying the `/chat/router` body.
+    The resulting ChatState is left in `outcome["state"]` for callers that keep it.
+    """
+    final_values: Dict[str, Any] | None = None
+    emitted = reply_start
+    async for mode, chunk in router_graph.astream(state, stream_mode=["custom", "updates", "values"]):
+        if mode == "custom":
+            yield chunk.get("type", "custom"), chunk
+        elif mode == "updates":
+            for node in chunk:
+                yield "node", {"node": node}
+        elif mode == "values":
+            final_values = chunk
+            messages = chunk.get("messages") or []
+            for m in messages[emitted:]:
+                yield "message", {"role": m.get("role"), "content": m.get("content")}
+            emitted = max(emitted, len(messages))
+
+    result_state = ChatState(**final_values) if final_values is not None else state
+    response = _finish_turn(store, db, convo, result_state, turn_start=turn_start, reply_start=reply_start)
+    if outcome is not None:
+        outcome["state"] = result_state
+    yield "done", response.model_dump()
+
+
+async def _stream_turn(router_graph, store: ConversationStore, payload: ChatRequest, current_user) -> AsyncIterator[str]:
+    # The request-scoped session may be closed before the body is streamed; use our own.
+    db = SessionLocal()
+    try:
+        convo = _load_conversation(store, db, payload, current_user)
+        turn_start = len(convo.messages)
+        state = _build_state(convo, payload, current_user)
+        reply_start = len(state.messages)
+        state.metadata["db"] = db
+        state.metadata["current_user"] = current_user
+
+        yield _sse("start", {"conversation_id": convo.id})
+        async for event, data in _turn_events(
+            router_graph, store, db, convo, state, turn_start=turn_start, reply_start=reply_start
+        ):
+            yield _sse(event, data)
+    except HTTPException as e:
+        yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        print(f"[chat] streaming turn failed: {e}")
+        yield _sse("error", {"status_code": 500, "detail": "Chat turn failed"})
+    finally:
+        db.close()
+
+
+@router.post("/router/stream")
+async def route_chat_stream(
+    payload: ChatRequest,
+    request: Request,
+    current_user=Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Server-sent events variant of `/chat/router` for low time-to-first-token.
+    Emits `start`, then the `_turn_events` stream (`node`, `token`, `message`, `done`), or `error`.
+    """
+    print(f"Streaming chat message: {payload.message}")
+    if not hasattr(request.app.state, "router_graph"):
+        raise HTTPException(status_code=500, detail="Router graph not initialized")
+
+    return StreamingResponse(
+        _stream_turn(request.app.state.router_graph, request.app.state.conversation_store, payload, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+class _SocketSession:
+    """
+    Per-connection chat state for `/chat/ws`. The DB session, user, conversation and
+    graph state are loaded once and kept for the life of the socket; the token's
+    expiry is checked on every frame. Each turn still re-reads the conversation
+    through the store (a primary-key check while the hot copy is current), so turns
+    sent over HTTP/SSE on the same conversation are picked up and `seq` values never
+    collide.
+    """
+
+    def __init__(self, websocket: WebSocket, router_graph, store: ConversationStore) -> None:
+        self.websocket = websocket
+        self.router_graph = router_graph
+        self.store = store
+        self.db: Session = SessionLocal()
+        self.user: Optional[User] = None
+        self.expires_at: Optional[datetime] = None
+        self.conversation_id: Optional[str] = None
+        self.message_count = 0  # as of the end of our last turn
+        self.state: Optional[ChatState] = None
+        self.queue: "asyncio.Queue[ChatSocketFrame]" = asyncio.Queue(maxsize=settings.CHAT_WS_MAX_PENDING)
+
+    async def send(self, frame_type: str, data: Dict[str, Any], frame_id: Optional[str] = None) -> None:
+        await self.websocket.send_text(json.dumps({"type": frame_type, "id": frame_id, **data}, default=str))
+
+    def token_expired(self) -> bool:
+        return self.expires_at is not None and datetime.now(timezone.utc) >= self.expires_at
+
+    def release(self) -> None:
+        # Hands the connection back to the pool between turns; the Session object is reused.
+        self.db.close()
+
+    async def authenticate(self, frame: ChatSocketFrame) -> None:
+        try:
+            token_data = decode_token(frame.token or "")
+            user = get_user_from_token(frame.token or "", self.db)
+            # Detached, so commits on this session never expire it and it needs no reload per turn.
+            self.db.expunge(user)
+            if frame.conversation_id:
+                convo = self.store.get(self.db, frame.conversation_id, user_id=user.id)
+                if convo is None:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+            else:
+                user_type = frame.user_type or ("candidate" if getattr(user, "role", None) == "candidate" else "job_poster")
+                convo = self.store.create(self.db, user_id=user.id, user_type=user_type)
+        finally:
+            self.release()
+        self.user = user
+        self.expires_at = datetime.fromtimestamp(token_data.exp, timezone.utc) if token_data.exp is not None else None
+        self.conversation_id = convo.id
+        self.message_count = convo.message_count
+
+    def _state_for(self, convo: ConversationRecord, frame: ChatSocketFrame) -> ChatState:
+        incoming: List[Dict[str, Any]] = [m.model_dump() for m in frame.messages]
+        incoming.append({"role": "user", "content": frame.content or ""})
+        state = self.state
+        if state is None or convo.message_count != self.message_count:
+            # First turn, or the conversation moved on elsewhere: rebuild from the store.
+            state = ChatState(
+                messages=list(convo.messages),
+                conversation_id=convo.id,
+                user_id=str(self.user.id),
+                user_type=convo.user_type,  # type: ignore[arg-type]
+                qna_tree_id=convo.qna_tree_id,
+                qna_tree_version=convo.qna_tree_version,
+                qna_mode=convo.qna_mode,
+                current_question_id=convo.current_question_id,
+                pending_attribute=self.state.pending_attribute if self.state else None,
+                traits=self.state.traits if self.state else {},
+            )
+        else:
+            # Keep the same window of history the store holds.
+            del state.messages[: max(len(state.messages) - self.store.history_window, 0)]
+        state.messages.extend(incoming)
+        if frame.qna_tree_id:
+            state.qna_tree_id = frame.qna_tree_id
+        state.metadata["db"] = self.db
+        state.metadata["current_user"] = self.user
+        return state
+
+    async def run_turn(self, frame: ChatSocketFrame) -> None:
+        try:
+            await self._run_turn(frame)
+        except BaseException:
+            self.message_count = -1  # state may hold half a turn; rebuild it from the store next time
+            raise
+        finally:
+            self.release()
+
+    async def _run_turn(self, frame: ChatSocketFrame) -> None:
+        if self.token_expired():
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+        convo = self.store.get(self.db, self.conversation_id or "", user_id=self.user.id)
+        if convo is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        turn_start = len(convo.messages)
+        state = self._state_for(convo, frame)
+
+        outcome: Dict[str, Any] = {}
+        async for event, data in _turn_events(
+            self.router_graph,
+            self.store,
+            self.db,
+            convo,
+            state,
+            turn_start=turn_start,
+            reply_start=len(state.messages),
+            outcome=outcome,
+        ):
+            await self.send(event, data, frame.id)
+
+        self.message_count = convo.message_count
+        self.state = outcome.get("state")
+
+    async def process(self) -> None:
+        """Handle queued turns in order while the reader keeps accepting frames."""
+        while True:
+            frame = await self.queue.get()
+            try:
+                await self.run_turn(frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[chat] websocket turn failed: {e}")
+                status_code, detail = (e.status_code, e.detail) if isinstance(e, HTTPException) else (500, "Chat turn failed")
+                try:
+                    await self.send("error", {"status_code": status_code, "detail": detail}, frame.id)
+                except Exception:
+                    # Connection already gone; the reader loop will clean up.
+                    pass
+            finally:
+                self.queue.task_done()
+
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket) -> None:
+    """
+    Long-lived chat channel. The first frame must be
+    `{"type": "auth", "token": ..., "conversation_id"?: ..., "user_type"?: ...}`; after `ready`,
+    send `{"type": "message", "id": ..., "content": ...}` frames. Messages may be sent without
+    waiting for replies; they are processed in order and every event echoes the message `id`.
+    """
+    await websocket.accept()
+    app_state = websocket.app.state
+    if not hasattr(app_state, "router_graph"):
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    session = _SocketSession(websocket, app_state.router_graph, app_state.conversation_store)
+    worker: Optional[asyncio.Task] = None
+    try:
+        try:
+            first = ChatSocketFrame.model_validate_json(await websocket.receive_text())
+            if first.type != "auth":
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="First frame must be auth")
+            await session.authenticate(first)
+        except (HTTPException, ValueError) as e:
+            detail = e.detail if isinstance(e, HTTPException) else "Invalid auth frame"
+            await session.send("error", {"status_code": getattr(e, "status_code", 400), "detail": detail})
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        await session.send("ready", {"conversation_id": session.conversation_id})
+        worker = asyncio.create_task(session.process())
+
+        while True:
+            raw = await websocket.receive_text()
+            if session.token_expired():
+                await session.send("error", {"status_code": status.HTTP_401_UNAUTHORIZED, "detail": "Token expired"})
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return
+            try:
+                frame = ChatSocketFrame.model_validate_json(raw)
+            except ValueError:
+                await session.send("error", {"status_code": 400, "detail": "Invalid frame"})
+                continue
+            if frame.type == "ping":
+                await session.send("pong", {}, frame.id)
+            elif frame.type == "message":
+                try:
+                    session.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    await session.send("error", {"status_code": 429, "detail": "Too many pending messages"}, frame.id)
+            else:
+                await session.send("error", {"status_code": 400, "detail": f"Unsupported frame type {frame.type}"}, frame.id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if worker is not None:
+            worker.cancel()
+        session.release()
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ...models.match_log import MatchLog
 from ...models.user import User
+from ...qna_graph.scoring import GraphMatchScore, top_k_scores
 from ...schemas.matching import (
     CandidateMatchOut,
     CandidatesForJobRequest,
     CandidatesForJobResponse,
+    GraphJobsForUserRequest,
+    GraphScoreOut,
+    GraphScoresResponse,
+    GraphUsersForJobRequest,
     JobMatchOut,
     JobsForCandidateRequest,
     JobsForCandidateResponse,
 )
+from ...services.matching import graph_jobs_for_user as score_jobs_for_user
+from ...services.matching import graph_users_for_job as score_users_for_job
 from ...services.matching import rank_candidates_for_job, rank_jobs_for_candidate
 from ..deps import get_current_user, get_db
 
+
 router = APIRouter(prefix="/matching", tags=["matching"])
 
 
@@ -108,3 +120,74 @@ def jobs_for_candidate(
 
     db.commit()
     return JobsForCandidateResponse(candidate_id=payload.candidate_id, matches=out_matches)
+
+
+def _score_out(item: GraphMatchScore) -> GraphScoreOut:
+    return GraphScoreOut(id=item.subject_id, score=item.score, breakdown=item.breakdown)
+
+
+async def _ndjson(batches: AsyncIterator[List[GraphMatchScore]]) -> AsyncIterator[str]:
+    async for batch in batches:
+        for item in batch:
+            yield json.dumps(_score_out(item).model_dump()) + "\n"
+
+
+async def _graph_scores(batches: AsyncIterator[List[GraphMatchScore]], top_k: int, stream: bool):
+    if stream:
+        return StreamingResponse(_ndjson(batches), media_type="application/x-ndjson")
+    return GraphScoresResponse(matches=[_score_out(m) for m in await top_k_scores(batches, top_k)])
+
+
+def _graph_batches(request: Request, score, **kwargs) -> AsyncIterator[List[GraphMatchScore]]:
+    try:
+        return score(
+            graph_client=getattr(request.app.state, "graph_client", None),
+            projection=getattr(request.app.state, "trait_projection", None),
+            **kwargs,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/graph/users_for_job", response_model=GraphScoresResponse)
+async def graph_users_for_job(
+    payload: GraphUsersForJobRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Graph trait scores of one job in the caller's org against that org's users in one
+    traversal (per `GRAPH_SCORING_CHUNK_SIZE` ids), or from the trait projection when
+    `GRAPH_SCORING_SOURCE=projection`.
+    """
+    batches = _graph_batches(
+        request,
+        score_users_for_job,
+        db=db,
+        org_id=current_user.org_id,
+        job_id=payload.job_id,
+        user_ids=payload.user_ids,
+    )
+    return await _graph_scores(batches, payload.top_k, payload.stream)
+
+
+@router.post("/graph/jobs_for_user", response_model=GraphScoresResponse)
+async def graph_jobs_for_user(
+    payload: GraphJobsForUserRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Graph trait scores of one user in the caller's org against that org's jobs."""
+    batches = _graph_batches(
+        request,
+        score_jobs_for_user,
+        db=db,
+        org_id=current_user.org_id,
+        user_id=payload.user_id,
+        job_ids=payload.job_ids,
+    )
+    return await _graph_scores(batches, payload.top_k, payload.stream)
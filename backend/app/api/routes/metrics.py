@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Request
+
+from ...agents.answer_classifier import get_classifier_metrics
+from ...models.user import User
+from ...services.llm_cache import get_llm_cache
+from ..deps import get_current_user
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/llm_cache")
+def llm_cache_metrics(current_user: User = Depends(get_current_user)):
+    return get_llm_cache().stats()
+
+
+@router.get("/qna_classifier")
+def qna_classifier_metrics(current_user: User = Depends(get_current_user)):
+    return get_classifier_metrics().snapshot()
+
+
+@router.get("/graph_outbox")
+def graph_outbox_metrics(request: Request, current_user: User = Depends(get_current_user)):
+    write_behind = getattr(request.app.state, "graph_write_behind", None)
+    if write_behind is None:
+        return {"enabled": False}
+    return {"enabled": True, **write_behind.snapshot()}
+
+
+@router.get("/graph_queries")
+def graph_query_metrics(request: Request, current_user: User = Depends(get_current_user)):
+    client = getattr(request.app.state, "graph_client", None)
+    if client is None:
+        return {"templates": [], "slow_queries": []}
+    return client.instrumentation.snapshot()
+
+
+@router.get("/graph")
+def graph_metrics(request: Request, current_user: User = Depends(get_current_user)):
+    repo = getattr(request.app.state, "qna_repo", None)
+    if repo is None:
+        return {"operations": {}}
+    stats = repo.stats()
+    stats["client"] = repo.client.stats()
+    qna_service = getattr(request.app.state, "qna_service", None)
+    if qna_service is not None:
+        stats["progress_cache"] = qna_service.progress.snapshot()
+        stats["qna_trees"] = qna_service.trees.snapshot()
+    projection = getattr(request.app.state, "trait_projection", None)
+    if projection is not None:
+        stats["trait_projection"] = projection.snapshot()
+    return stats
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from pathlib import Path
 from typing import List, Optional
 
 from pydantic import AnyHttpUrl
@@ -26,20 +27,66 @@ class Settings(BaseSettings):
     OPENAI_CHAT_MODEL: str = "gpt-4o-mini"
     MATCHING_USE_OPENAI: bool = False  # set true in env to enable embeddings
 
+    # LLM response cache (extraction/classification calls)
+    LLM_CACHE_BYPASS: bool = False  # set true to always call the LLM
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Chat conversations (server-side history)
+    CHAT_HISTORY_WINDOW: int = 50  # messages fed back into the router graph per turn
+    CHAT_CONVERSATION_CACHE_SIZE: int = 1000  # conversations kept in memory per worker
+    CHAT_WS_MAX_PENDING: int = 16  # queued messages per WebSocket before rejecting
+
+    # Q&A flow
+    QNA_SPECULATIVE_PREFETCH: bool = True  # generate likely next questions during classification
+    QNA_PREFETCH_MAX_BRANCHES: int = 3
+    QNA_CLASSIFY_MIN_CONFIDENCE: float = 0.8  # pattern matches below this go to the LLM
+    QNA_CLASSIFY_BATCH_SIZE: int = 8  # LLM classifications per request; 1 disables batching
+    QNA_CLASSIFY_BATCH_WINDOW_MS: float = 15.0  # how long a classification waits for others to batch with
+    QNA_UPSERT_CHUNK_SIZE: int = 500  # rows per UNWIND statement when upserting a tree
+    QNA_WRITE_BEHIND: bool = True  # queue answer/trait graph writes in SQL and flush in the background
+    QNA_OUTBOX_BATCH_SIZE: int = 100
+    QNA_OUTBOX_FLUSH_INTERVAL: float = 1.0  # seconds between idle polls
+    QNA_OUTBOX_MAX_ATTEMPTS: int = 8  # then the entry is parked with status "failed"
+    QNA_PROGRESS_CACHE_SIZE: int = 10_000  # per-user progress/trait entries kept per worker
+    QNA_PROGRESS_CACHE_TTL: float = 300.0  # seconds; bounds staleness across workers
+    QNA_TREE_RELOAD_SECONDS: float = 2.0  # poll interval for Q&A tree YAML changes; 0 disables hot reload
+    QNA_TREE_VERSIONS_KEPT: int = 5  # versions per tree kept for conversations pinned to an older one
+    # Compiled trees keyed by YAML hash; empty disables. Must only be writable by the service.
+    QNA_TREE_CACHE_DIR: str = str(Path(__file__).resolve().parents[2] / ".cache" / "qna_trees")
+
     # Graph backends
-    GRAPH_BACKEND: str = "age"  # "age" or "neptune"
+    GRAPH_BACKEND: str = "age"  # "age", "neptune" or "memory" (in-process; tests and single-node setups)
+    GRAPH_SLOW_QUERY_MS: float = 200.0  # graph calls at or above this are logged; 0 disables
+    GRAPH_SLOW_QUERY_LOG_SIZE: int = 100  # slow calls kept for /metrics/graph_queries
+    GRAPH_SCORING_CHUNK_SIZE: int = 1000  # ids per traversal in bulk graph scoring
+    GRAPH_SCORING_SOURCE: str = "graph"  # "graph" (Cypher) or "projection" (in-process trait vectors)
+    TRAIT_PROJECTION_REFRESH_SECONDS: float = 5.0  # how often a worker reloads vectors written elsewhere
+    TRAIT_PROJECTION_REBUILD: bool = False  # backfill the projection from graph edges on startup
     AGE_HOST: str = "localhost"
     AGE_PORT: int = 5432
     AGE_DB: str = "recruiting"
     AGE_USER: str = "age"
     AGE_PASSWORD: str = "agepassword"
     AGE_GRAPH_NAME: str = "recruiting_graph"
+    AGE_PARAMETERIZED_CYPHER: bool = True  # false falls back to inlining params into Cypher text
+    AGE_STATEMENT_CACHE_SIZE: int = 256  # prepared statements kept per pooled connection
+    AGE_POOL_MIN_SIZE: int = 10
+    AGE_POOL_MAX_SIZE: int = 10
+    AGE_POOL_MAX_INACTIVE_LIFETIME: float = 300.0  # seconds before idle connections are closed
 
     NEPTUNE_ENDPOINT: Optional[str] = None
     NEPTUNE_PORT: Optional[int] = None
     NEPTUNE_REGION: Optional[str] = None
     NEPTUNE_USE_HTTPS: bool = True
-    NEPTUNE_USE_BOLT: bool = False
+    NEPTUNE_USE_BOLT: bool = False  # needs the optional neo4j driver (pip install "recruiting-backend[bolt]")
+    NEPTUNE_POOL_LIMIT: int = 100  # max open connections
+    NEPTUNE_KEEPALIVE_TIMEOUT: float = 30.0  # seconds an idle connection is kept
+    NEPTUNE_CONNECT_TIMEOUT: float = 5.0
+    NEPTUNE_REQUEST_TIMEOUT: float = 30.0
+    NEPTUNE_MAX_RETRIES: int = 3  # on throttling, 5xx and concurrent-modification errors
+
+    MEMORY_GRAPH_SNAPSHOT_PATH: Optional[str] = None  # JSON file loaded on startup and saved on shutdown
 
     # Seeding
     SEED_JOBS_FILE: str = "backend/app/data/seed_jobs.yaml"
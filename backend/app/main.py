@@ -6,10 +6,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import api_router
 from .core.config import get_settings
 from .qna_graph import get_graph_client
+from .qna_graph.outbox import GraphWriteBehind
+from .qna_graph.progress_cache import ProgressCache
+from .qna_graph.projection import TraitProjection
 from .qna_graph.repository import QnaGraphRepository
 from .qna_graph.service import QnaService
+from .qna_graph.tree_registry import TreeRegistry
 from .agents.router_agent import build_router_graph
 from .seed import seed_demo_data
+from .services.conversation_store import ConversationStore
 
 settings = get_settings()
 
@@ -35,16 +40,54 @@ def health_check():
 async def startup_event() -> None:
     # Initialize graph backend and preload Q&A trees
     graph_client = get_graph_client(settings)
-    repo = QnaGraphRepository(graph_client, settings.AGE_GRAPH_NAME)
-    qna_service = QnaService(repo)
+    repo = QnaGraphRepository(graph_client, settings.AGE_GRAPH_NAME, upsert_chunk_size=settings.QNA_UPSERT_CHUNK_SIZE)
+    write_behind = None
+    if settings.QNA_WRITE_BEHIND:
+        write_behind = GraphWriteBehind(
+            repo,
+            batch_size=settings.QNA_OUTBOX_BATCH_SIZE,
+            flush_interval=settings.QNA_OUTBOX_FLUSH_INTERVAL,
+            max_attempts=settings.QNA_OUTBOX_MAX_ATTEMPTS,
+        )
+        write_behind.start()
+    projection = TraitProjection(refresh_seconds=settings.TRAIT_PROJECTION_REFRESH_SECONDS)
+    await projection.refresh(force=True)
+    if settings.TRAIT_PROJECTION_REBUILD:
+        try:
+            await projection.rebuild_from_graph(graph_client)
+        except Exception as e:
+            print(f"[startup] trait projection rebuild failed: {e}")
+    qna_service = QnaService(
+        repo,
+        write_behind,
+        progress_cache=ProgressCache(
+            max_entries=settings.QNA_PROGRESS_CACHE_SIZE,
+            ttl_seconds=settings.QNA_PROGRESS_CACHE_TTL,
+        ),
+        projection=projection,
+        trees=TreeRegistry(
+            repo,
+            poll_interval=settings.QNA_TREE_RELOAD_SECONDS,
+            keep_versions=settings.QNA_TREE_VERSIONS_KEPT,
+            cache_dir=settings.QNA_TREE_CACHE_DIR or None,
+        ),
+    )
 
     config_dir = Path(__file__).parent / "qna_graph" / "config"
-    await qna_service.preload_directory(config_dir)
+    # Q&A runs from the compiled trees; graph upserts finish in the background.
+    await qna_service.preload_directory(config_dir, background_sync=True)
+    qna_service.trees.start(config_dir)
 
     app.state.graph_client = graph_client
     app.state.qna_repo = repo
     app.state.qna_service = qna_service
+    app.state.graph_write_behind = write_behind
+    app.state.trait_projection = projection
     app.state.router_graph = build_router_graph(qna_service)
+    app.state.conversation_store = ConversationStore(
+        history_window=settings.CHAT_HISTORY_WINDOW,
+        hot_size=settings.CHAT_CONVERSATION_CACHE_SIZE,
+    )
 
     # Seed demo data (org, user, job) if YAML present
     seed_demo_data(settings.SEED_JOBS_FILE, settings.SEED_DEMO_PASSWORD)
@@ -52,6 +95,10 @@ async def startup_event() -> None:
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
+    if getattr(app.state, "qna_service", None) is not None:
+        await app.state.qna_service.trees.stop()
+    if getattr(app.state, "graph_write_behind", None) is not None:
+        await app.state.graph_write_behind.stop()
     if hasattr(app.state, "graph_client"):
         try:
             await app.state.graph_client.close()
@@ -0,0 +1,14 @@
+# Import every model so `Base.metadata.create_all` (api/routes/auth.py) creates all tables
+# and string relationship targets resolve whichever model is imported first.
+from . import (  # noqa: F401
+    application,
+    candidate,
+    conversation,
+    graph_outbox,
+    job,
+    llm_cache,
+    match_log,
+    organization,
+    trait_vector,
+    user,
+)
@@ -0,0 +1,47 @@
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+
+from ..core.database import Base
+
+
+class Conversation(Base):
+    __tablename__ = "chat_conversations"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    user_type = Column(String, nullable=True)
+    qna_tree_id = Column(String, nullable=True)
+    # Content hash of the tree version the Q&A session is pinned to.
+    qna_tree_version = Column(String, nullable=True)
+    qna_mode = Column(Boolean, default=False)
+    current_question_id = Column(String, nullable=True)
+
+    message_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    user = relationship("User", backref="chat_conversations")
+    messages = relationship("ConversationMessage", back_populates="conversation", order_by="ConversationMessage.seq")
+
+
+class ConversationMessage(Base):
+    __tablename__ = "chat_messages"
+    # Two writers appending from the same message count collide here instead of interleaving.
+    __table_args__ = (UniqueConstraint("conversation_id", "seq"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(String(36), ForeignKey("chat_conversations.id"), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    conversation = relationship("Conversation", back_populates="messages")
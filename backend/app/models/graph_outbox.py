@@ -0,0 +1,30 @@
+from sqlalchemy import JSON, Column, DateTime, Integer, String, Text, func
+
+from ..core.database import Base
+
+
+class GraphOutboxEntry(Base):
+    __tablename__ = "graph_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # Entries for the same user are flushed in id order.
+    user_id = Column(String, nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+
+    status = Column(String, nullable=False, default="pending", index=True)  # pending / failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class GraphOutboxLease(Base):
+    """Which worker may flush the outbox; the holder renews it before every batch."""
+
+    __tablename__ = "graph_outbox_lease"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
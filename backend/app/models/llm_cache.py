@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, Column, DateTime, Integer, String, func
+
+from ..core.database import Base
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True)
+    namespace = Column(String, nullable=False, index=True)
+    model = Column(String, nullable=False)
+    template_version = Column(String, nullable=False)
+
+    value = Column(JSON, nullable=False)
+    hits = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    last_used_at = Column(DateTime(timezone=True), nullable=True, index=True)
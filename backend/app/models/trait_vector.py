@@ -0,0 +1,31 @@
+from sqlalchemy import JSON, Column, DateTime, Float, String, func
+
+from ..core.database import Base
+
+
+class TraitVector(Base):
+    __tablename__ = "trait_vectors"
+
+    id = Column(String, primary_key=True)  # "<kind>:<subject_id>"
+    kind = Column(String, nullable=False, index=True)  # "job" (REQUIRES_SKILL); users are in `trait_vector_edges`
+    subject_id = Column(String, nullable=False)
+
+    # {"requirements": [[attribute, concept, weight], ...]}
+    vector = Column(JSON, nullable=False)
+
+    # Set by the writer; other workers reload rows changed since their last refresh.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class TraitVectorEdge(Base):
+    """One HAS_TRAIT edge of a user's vector, so workers upsert edges instead of whole vectors."""
+
+    __tablename__ = "trait_vector_edges"
+
+    user_id = Column(String, primary_key=True)
+    edge_key = Column(String, primary_key=True)  # attribute|normalized_value|concept, as the graph MERGE
+    attribute = Column(String, nullable=False)
+    concept = Column(String, nullable=False)
+    value = Column(Float, nullable=False)  # strength * confidence
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,6 +1,8 @@
 from .graph_client_base import GraphClient
 from .age_graph_client import AgeGraphClient
 from .neptune_graph_client import NeptuneGraphClient
+from .memory_graph_client import InMemoryGraphClient
+from .instrumentation import QueryInstrumentation
 
 
 def get_graph_client(settings) -> GraphClient:
@@ -8,6 +10,10 @@ def get_graph_client(settings) -> GraphClient:
     Return a graph client based on configuration.
     """
     backend = (settings.GRAPH_BACKEND or "age").lower()
+    instrumentation = QueryInstrumentation(
+        slow_query_ms=settings.GRAPH_SLOW_QUERY_MS,
+        slow_log_size=settings.GRAPH_SLOW_QUERY_LOG_SIZE,
+    )
     if backend == "age":
         return AgeGraphClient(
             host=settings.AGE_HOST,
@@ -16,6 +22,12 @@ def get_graph_client(settings) -> GraphClient:
             user=settings.AGE_USER,
             password=settings.AGE_PASSWORD,
             graph_name=settings.AGE_GRAPH_NAME,
+            parameterized=settings.AGE_PARAMETERIZED_CYPHER,
+            statement_cache_size=settings.AGE_STATEMENT_CACHE_SIZE,
+            pool_min_size=settings.AGE_POOL_MIN_SIZE,
+            pool_max_size=settings.AGE_POOL_MAX_SIZE,
+            pool_max_inactive_lifetime=settings.AGE_POOL_MAX_INACTIVE_LIFETIME,
+            instrumentation=instrumentation,
         )
     if backend == "neptune":
         return NeptuneGraphClient(
@@ -24,5 +36,15 @@ def get_graph_client(settings) -> GraphClient:
             region=settings.NEPTUNE_REGION,
             use_https=settings.NEPTUNE_USE_HTTPS,
             use_bolt=settings.NEPTUNE_USE_BOLT,
+            pool_limit=settings.NEPTUNE_POOL_LIMIT,
+            keepalive_timeout=settings.NEPTUNE_KEEPALIVE_TIMEOUT,
+            connect_timeout=settings.NEPTUNE_CONNECT_TIMEOUT,
+            request_timeout=settings.NEPTUNE_REQUEST_TIMEOUT,
+            max_retries=settings.NEPTUNE_MAX_RETRIES,
+            instrumentation=instrumentation,
+        )
+    if backend == "memory":
+        return InMemoryGraphClient(
+            snapshot_path=settings.MEMORY_GRAPH_SNAPSHOT_PATH, instrumentation=instrumentation
         )
     raise ValueError(f"Unsupported GRAPH_BACKEND: {settings.GRAPH_BACKEND}")
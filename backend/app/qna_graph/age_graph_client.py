@@ -2,11 +2,132 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import asyncpg
 
-from .graph_client_base import GraphClient
+from .graph_client_base import GraphClient, Statement
+from .instrumentation import QueryInstrumentation
+
+
+def _encode_agtype(value: Any) -> str:
+    # agtype's text input accepts JSON; non-JSON values (e.g. datetimes) are sent as strings.
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+# agtype text output is JSON plus type annotations on graph entities and numerics,
+# e.g. `{"id": 1, "label": "User", "properties": {...}}::vertex` or `1.5::numeric`.
+_AGTYPE_ANNOTATION_RE = re.compile(r"::(?:vertex|edge|path|numeric)(?=\s*[,\]}]|\s*$)")
+_json_decode = json.JSONDecoder().decode
+
+
+def _decode_agtype(value: str) -> Any:
+    """Text-format agtype decoder registered on each connection."""
+    if "::" in value:
+        # Matched against a copy with string values blanked, so `"a::vertex"` survives.
+        masked = _mask_nested(value, quotes='"', brackets=False)
+        pieces, start = [], 0
+        for match in _AGTYPE_ANNOTATION_RE.finditer(masked):
+            pieces.append(value[start : match.start()])
+            start = match.end()
+        value = "".join(pieces) + value[start:]
+    return _json_decode(value)
+
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _identifier(name: str) -> str:
+    # Graph/label names end up in DDL, where they cannot be bound as parameters.
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"invalid AGE identifier: {name!r}")
+    return name
+
+
+def _mask_nested(text: str, *, quotes: str = "'\"`", brackets: bool = True) -> str:
+    """
+    Same-length copy of `text` with string literals (opened by any of `quotes`) and,
+    if `brackets`, anything inside brackets blanked out, so top-level keywords and
+    commas can be found with plain searches.
+    """
+    out = list(text)
+    depth = 0
+    quote: Optional[str] = None
+    escaped = False
+    for i, ch in enumerate(text):
+        if quote is not None:
+            out[i] = "_"
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+            continue
+        if ch in quotes:
+            quote = ch
+            out[i] = "_"
+        elif not brackets:
+            continue
+        elif ch in "([{":
+            depth += 1
+            out[i] = "_"
+        elif ch in ")]}":
+            depth = max(depth - 1, 0)
+            out[i] = "_"
+        elif depth:
+            out[i] = "_"
+    return "".join(out)
+
+
+_RETURN_RE = re.compile(r"\bRETURN\b", re.IGNORECASE)
+_RETURN_END_RE = re.compile(r"\b(?:ORDER\s+BY|SKIP|LIMIT|UNION)\b", re.IGNORECASE)
+_DISTINCT_RE = re.compile(r"\s*DISTINCT\b", re.IGNORECASE)
+_ALIAS_RE = re.compile(r"\s+AS\s+`?([A-Za-z_][A-Za-z0-9_]*)`?\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def _return_columns(query: str) -> Optional[Tuple[str, ...]]:
+    """
+    Result keys of the final RETURN clause: each item's alias, or its expression text
+    when unaliased. None when the query has no RETURN or returns `*`.
+    """
+    masked = _mask_nested(query)
+    matches = list(_RETURN_RE.finditer(masked))
+    if not matches:
+        return None
+    start = matches[-1].end()
+    end_match = _RETURN_END_RE.search(masked, start)
+    end = end_match.start() if end_match else len(query)
+    distinct = _DISTINCT_RE.match(masked, start)
+    if distinct:
+        start = distinct.end()
+    columns: List[str] = []
+    item_start = start
+    for i in range(start, end + 1):
+        if i == end or masked[i] == ",":
+            item = query[item_start:i].strip()
+            alias = _ALIAS_RE.search(_mask_nested(item))
+            columns.append(alias.group(1) if alias else item)
+            item_start = i + 1
+    if not columns or any(c in ("", "*") for c in columns):
+        return None
+    return tuple(columns)
+
+
+@lru_cache(maxsize=512)
+def _cypher_sql(graph_name: str, query: str, parameterized: bool, columns: int) -> str:
+    """
+    Wrap a Cypher template in AGE's SQL call, with one agtype column per RETURN item
+    (AGE requires the column list to match). The result only depends on the template,
+    so asyncpg's per-connection statement cache prepares and plans it once.
+    """
+    params_arg = ", $1" if parameterized else ""
+    column_defs = ", ".join(f"c{i} agtype" for i in range(columns)) if columns else "row agtype"
+    # Use literal graph name to avoid parameter parsing issues in AGE
+    return f"SELECT * FROM cypher('{graph_name}', $$ {query} $${params_arg}) AS ({column_defs});"
 
 
 class AgeGraphClient(GraphClient):
@@ -21,22 +142,33 @@ class AgeGraphClient(GraphClient):
         user: str = "age",
         password: str = "agepassword",
         graph_name: str = "recruiting_graph",
+        parameterized: bool = True,
+        statement_cache_size: int = 256,
+        pool_min_size: int = 10,
+        pool_max_size: int = 10,
+        pool_max_inactive_lifetime: float = 300.0,
+        instrumentation: Optional[QueryInstrumentation] = None,
     ) -> None:
+        super().__init__(instrumentation=instrumentation)
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
         self.graph_name = graph_name
+        self.parameterized = parameterized
+        self.statement_cache_size = statement_cache_size
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_max_inactive_lifetime = pool_max_inactive_lifetime
         self._pool: Optional[asyncpg.pool.Pool] = None
         self._lock = asyncio.Lock()
 
     def _inline_params(self, query: str, params: Dict[str, Any]) -> str:
         """
-        Inline simple params into a Cypher string. This is a temporary workaround
-        for AGE parameter typing quirks; do not use with untrusted user input.
+        Inline simple params into a Cypher string. Only used when parameterized
+        execution is disabled; do not use with untrusted user input.
         """
-        import re
 
         def fmt(v: Any) -> str:
             if isinstance(v, str):
@@ -46,6 +178,10 @@ class AgeGraphClient(GraphClient):
                 return "true" if v else "false"
             if v is None:
                 return "null"
+            if isinstance(v, (list, tuple)):
+                return "[" + ", ".join(fmt(item) for item in v) + "]"
+            if isinstance(v, dict):
+                return "{" + ", ".join(f"{k}: {fmt(item)}" for k, item in v.items()) + "}"
             return str(v)
 
         def repl(match: re.Match[str]) -> str:
@@ -56,61 +192,146 @@ class AgeGraphClient(GraphClient):
 
         return re.sub(r"\$(\w+)", repl, query)
 
+    async def _ensure_extension(self) -> None:
+        # The agtype codec below can only be registered once the extension exists.
+        conn = await asyncpg.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+        )
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS age;")
+        finally:
+            await conn.close()
+
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """
+        Runs once per pooled connection. search_path is passed as a startup setting
+        (see `_get_pool`), so it survives the pool's RESET ALL on release; LOAD is
+        per-backend and also survives it.
+        """
+        await conn.execute("LOAD 'age';")
+        # Binds Cypher params as the agtype argument of cypher() and decodes result
+        # columns once, in the protocol layer.
+        await conn.set_type_codec(
+            "agtype",
+            schema="ag_catalog",
+            encoder=_encode_agtype,
+            decoder=_decode_agtype,
+            format="text",
+        )
+
     async def _get_pool(self) -> asyncpg.pool.Pool:
         if self._pool is None:
             async with self._lock:
                 if self._pool is None:
+                    await self._ensure_extension()
                     self._pool = await asyncpg.create_pool(
                         host=self.host,
                         port=self.port,
                         user=self.user,
                         password=self.password,
                         database=self.database,
+                        min_size=self.pool_min_size,
+                        max_size=self.pool_max_size,
+                        max_inactive_connection_lifetime=self.pool_max_inactive_lifetime,
+                        init=self._init_connection,
+                        statement_cache_size=self.statement_cache_size,
+                        server_settings={"search_path": 'ag_catalog, "$user", public'},
                     )
         return self._pool
 
     async def init_schema(self) -> None:
         pool = await self._get_pool()
         async with pool.acquire() as conn:
-            await conn.execute("CREATE EXTENSION IF NOT EXISTS age;")
-            await conn.execute("LOAD 'age';")
-            await conn.execute("SET search_path = ag_catalog, \"$user\", public;")
+            # Extension, LOAD and search_path are handled when the pool and its connections are created.
             await conn.execute(
                 "SELECT create_graph($1) WHERE NOT EXISTS (SELECT 1 FROM ag_catalog.ag_graph WHERE name=$1);",
                 self.graph_name,
             )
 
+    async def ensure_indexes(self, vertex_labels: Sequence[str], edge_labels: Sequence[str]) -> None:
+        """
+        AGE stores each label as a table with an agtype `properties` column. MATCH/MERGE
+        property maps become `properties @> {...}` filters, which a GIN index serves;
+        edge traversals join on start_id/end_id. Labels are created first so the indexes
+        exist before the first write.
+        """
+        graph = _identifier(self.graph_name)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            existing = {
+                r["name"]
+                for r in await conn.fetch(
+                    "SELECT l.name FROM ag_catalog.ag_label l JOIN ag_catalog.ag_graph g ON l.graph = g.graphid WHERE g.name = $1;",
+                    graph,
+                )
+            }
+            for kind, labels in (("v", vertex_labels), ("e", edge_labels)):
+                for label in labels:
+                    label = _identifier(label)
+                    if label not in existing:
+                        create = "create_vlabel" if kind == "v" else "create_elabel"
+                        await conn.execute(f"SELECT {create}('{graph}', '{label}');")
+                    table = f'"{graph}"."{label}"'
+                    prefix = f"{graph}_{label}".lower()
+                    await conn.execute(f'CREATE INDEX IF NOT EXISTS "{prefix}_props_gin" ON {table} USING gin (properties);')
+                    if kind == "e":
+                        await conn.execute(f'CREATE INDEX IF NOT EXISTS "{prefix}_start_id" ON {table} (start_id);')
+                        await conn.execute(f'CREATE INDEX IF NOT EXISTS "{prefix}_end_id" ON {table} (end_id);')
+
     async def ensure_graph(self, graph_name: str) -> None:
         # graph name is fixed at init; this keeps interface parity.
         if graph_name != self.graph_name:
             self.graph_name = graph_name
         await self.init_schema()
 
-    async def run_cypher(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    async def _fetch(self, conn: asyncpg.Connection, query: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        columns = _return_columns(query)
+        width = len(columns) if columns else 0
+        if self.parameterized and params:
+            result = await conn.fetch(_cypher_sql(self.graph_name, query, True, width), params)
+        else:
+            cypher_query = self._inline_params(query, params or {})
+            result = await conn.fetch(_cypher_sql(self.graph_name, cypher_query, False, width))
+        if columns:
+            return [dict(zip(columns, record)) for record in result]
+        return [record[0] for record in result]
+
+    async def _run_cypher(
+        self, query: str, params: Optional[Dict[str, Any]] = None, *, idempotent: bool = False
+    ) -> List[Dict[str, Any]]:
         """
-        Execute Cypher against AGE. To avoid signature/typing issues, parameters are inlined
-        into the Cypher string. This is safe for our controlled YAML inputs; avoid using with untrusted user strings.
+        Execute Cypher against AGE. Params are sent as a single agtype map bound to
+        `cypher(graph, query, $1)`, so each query template maps to one SQL string that
+        asyncpg prepares once per connection and reuses. With `parameterized=False`
+        params are inlined into the Cypher text instead (no plan reuse).
         """
         pool = await self._get_pool()
         async with pool.acquire() as conn:
-            await conn.execute("SET search_path = ag_catalog, \"$user\", public;")
-            cypher_query = self._inline_params(query, params or {})
-            # Use literal graph name to avoid parameter parsing issues in AGE
-            cypher_sql = f"SELECT * FROM cypher('{self.graph_name}', $$ {cypher_query} $$) AS (row agtype);"
-            result = await conn.fetch(cypher_sql)
-            rows = []
-            for r in result:
-                val = r.get("row")
-                if hasattr(val, "to_python"):
-                    rows.append(val.to_python())
-                elif isinstance(val, str):
-                    try:
-                        rows.append(json.loads(val))
-                    except Exception:
-                        rows.append(val)
-                else:
-                    rows.append(val)
-            return rows
+            return await self._fetch(conn, query, params)
+
+    async def _run_transaction(
+        self, statements: Sequence[Statement], *, idempotent: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                return [await self._fetch(conn, query, params) for query, params in statements]
+
+    def is_connection_error(self, exc: BaseException) -> bool:
+        return super().is_connection_error(exc) or isinstance(
+            exc,
+            (
+                asyncpg.PostgresConnectionError,
+                asyncpg.InterfaceError,
+                # Graph schema dropped or extension not loaded on the backend.
+                asyncpg.InvalidSchemaNameError,
+                asyncpg.UndefinedFunctionError,
+            ),
+        )
 
     async def close(self) -> None:
         if self._pool:
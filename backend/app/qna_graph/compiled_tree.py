@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import re
+import sys
+from collections import deque
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Pattern, Set, Tuple
+
+from .models import QTreeDefinition, QuestionNode
+from .yaml_loader import QTreeValidationError
+
+_EMPTY: Mapping[str, QuestionNode] = MappingProxyType({})
+
+
+# Confidence of a pattern match naming one option, and of one naming several or
+# appearing next to a negation (below the classify threshold, so the LLM decides).
+PATTERN_MATCH_CONFIDENCE = 0.9
+PATTERN_AMBIGUOUS_CONFIDENCE = 0.5
+
+# Words that can flip what a matched pattern means ("not python", "don't like java").
+_NEGATION = re.compile(
+    r"(?<!\w)(?:not|no|never|neither|nor|without|except|dislike|hate|avoid|cannot|\w+n['\u2019]t"
+    r"|dont|doesnt|didnt|cant|wont|isnt|arent|wasnt|wouldnt|havent)(?!\w)",
+    re.IGNORECASE,
+)
+
+
+def word_regex(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    """One case-insensitive alternation matching any of `patterns` as whole words."""
+    unique = sorted(set(patterns), key=lambda p: (-len(p), p))
+    if not unique:
+        return None
+    # Longest first so "typescript" wins over "type"; lookarounds instead of \b so
+    # patterns like "c++" still respect word boundaries ("go" never matches "good").
+    alternatives = "|".join(re.escape(p) for p in unique)
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledOption:
+    label: str
+    normalized_value: Optional[str]
+    normalized_value_from_entity: bool
+    tags: Tuple[str, ...]
+    patterns: Tuple[str, ...]
+
+    def value_for(self, matched: str) -> Optional[str]:
+        if self.normalized_value is not None:
+            return self.normalized_value
+        if self.normalized_value_from_entity:
+            return sys.intern(re.sub(r"[^a-z0-9]+", "_", matched.lower()).strip("_"))
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class PatternMatch:
+    normalized_value: str
+    option: CompiledOption
+    matched: str
+    confidence: float
+
+
+class PatternClassifier:
+    """
+    Every option pattern of a question compiled into a single regex, so classifying an
+    answer is one scan of the text. An answer whose matches all map to one value gets
+    `PATTERN_MATCH_CONFIDENCE`; one naming several values ("java, or maybe rust") or
+    containing a negation outside the matched patterns ("don't like python") returns
+    the first with `PATTERN_AMBIGUOUS_CONFIDENCE`.
+    """
+
+    __slots__ = ("_regex", "_options")
+
+    def __init__(self, options: Tuple[CompiledOption, ...]) -> None:
+        self._options: Dict[str, CompiledOption] = {}
+        for option in options:
+            for pattern in option.patterns:
+                self._options.setdefault(pattern, option)  # first option declaring a pattern wins
+        self._regex = word_regex(self._options)
+
+    def classify(self, text: str) -> Optional[PatternMatch]:
+        if self._regex is None or not text:
+            return None
+        first: Optional[PatternMatch] = None
+        values: Set[str] = set()
+        spans: List[Tuple[int, int]] = []
+        for m in self._regex.finditer(text):
+            spans.append(m.span())
+            matched = m.group(0).lower()
+            option = self._options.get(matched)
+            value = option.value_for(matched) if option is not None else None
+            if value is None:
+                continue
+            values.add(value)
+            if first is None:
+                first = PatternMatch(value, option, matched, PATTERN_MATCH_CONFIDENCE)
+        if first is not None and (len(values) > 1 or _negated(text, spans)):
+            return PatternMatch(first.normalized_value, first.option, first.matched, PATTERN_AMBIGUOUS_CONFIDENCE)
+        return first
+
+
+def _negated(text: str, spans: List[Tuple[int, int]]) -> bool:
+    # Negations inside a matched pattern ("no favorite") are part of the option itself.
+    return any(
+        not any(start <= m.start() and m.end() <= end for start, end in spans) for m in _NEGATION.finditer(text)
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuestion:
+    node: QuestionNode
+    transitions: Mapping[str, QuestionNode]
+    default_next: Optional[QuestionNode]
+    options: Tuple[CompiledOption, ...]
+    classifier: PatternClassifier
+
+    def classify(self, text: str) -> Optional[PatternMatch]:
+        """Match `text` against the option patterns; None when no pattern occurs in it."""
+        return self.classifier.classify(text)
+
+    def next_question(self, normalized_value: Optional[str]) -> Optional[QuestionNode]:
+        if normalized_value is not None:
+            target = self.transitions.get(normalized_value)
+            if target is not None:
+                return target
+        return self.default_next
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Mapping proxies cannot be pickled; the transitions travel as a plain dict.
+        return _restore_question, (self.node, dict(self.transitions), self.default_next, self.options, self.classifier)
+
+    def branch_targets(self) -> Tuple[QuestionNode, ...]:
+        """Distinct next questions, default first."""
+        targets: Dict[str, QuestionNode] = {}
+        if self.default_next is not None:
+            targets[self.default_next.id] = self.default_next
+        for target in self.transitions.values():
+            targets.setdefault(target.id, target)
+        return tuple(targets.values())
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTree:
+    """
+    Immutable, validated form of a `QTreeDefinition`. Transitions are resolved to
+    question objects at load, so a turn is a couple of dict lookups.
+    """
+
+    definition: QTreeDefinition
+    tree_id: str
+    root: QuestionNode
+    questions: Mapping[str, CompiledQuestion]
+    # Version id: hash of the source YAML (set by `TreeRegistry`).
+    content_hash: str = ""
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _restore_tree, (self.definition, self.tree_id, self.root, dict(self.questions), self.content_hash)
+
+    def question(self, qid: Optional[str]) -> Optional[QuestionNode]:
+        compiled = self.questions.get(qid) if qid else None
+        return compiled.node if compiled else None
+
+    def next_question(self, qid: str, normalized_value: Optional[str]) -> Optional[QuestionNode]:
+        """The question after answering `qid` with `normalized_value`; None at the end of the tree."""
+        compiled = self.questions.get(qid)
+        return compiled.next_question(normalized_value) if compiled else None
+
+
+def _restore_question(
+    node: QuestionNode,
+    transitions: Dict[str, QuestionNode],
+    default_next: Optional[QuestionNode],
+    options: Tuple[CompiledOption, ...],
+    classifier: PatternClassifier,
+) -> CompiledQuestion:
+    return CompiledQuestion(
+        node=node,
+        transitions=MappingProxyType({sys.intern(v): t for v, t in transitions.items()}) if transitions else _EMPTY,
+        default_next=default_next,
+        options=options,
+        classifier=classifier,
+    )
+
+
+def _restore_tree(
+    definition: QTreeDefinition,
+    tree_id: str,
+    root: QuestionNode,
+    questions: Dict[str, CompiledQuestion],
+    content_hash: str,
+) -> CompiledTree:
+    return CompiledTree(
+        definition=definition,
+        tree_id=tree_id,
+        root=root,
+        questions=MappingProxyType(questions),
+        content_hash=content_hash,
+    )
+
+
+def _compile_options(qid: str, options: List[Dict[str, Any]]) -> Tuple[CompiledOption, ...]:
+    compiled = []
+    for option in options:
+        if not isinstance(option, dict):
+            raise QTreeValidationError(f"Option in question {qid} must be a mapping")
+        patterns = tuple(str(p).strip().lower() for p in option.get("patterns") or [] if str(p).strip())
+        normalized = option.get("normalized_value")
+        compiled.append(
+            CompiledOption(
+                label=str(option.get("label", "")),
+                normalized_value=sys.intern(str(normalized)) if normalized is not None else None,
+                normalized_value_from_entity=bool(option.get("normalized_value_from_entity", False)),
+                tags=tuple(str(t) for t in option.get("tags") or []),
+                patterns=patterns,
+            )
+        )
+    return tuple(compiled)
+
+
+def _validate_graph(tree: QTreeDefinition, edges: Dict[str, Set[str]], terminal: Set[str]) -> None:
+    seen = {tree.root_question_id}
+    queue = deque([tree.root_question_id])
+    while queue:
+        for target in edges[queue.popleft()]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    unreachable = sorted(set(tree.questions) - seen)
+    if unreachable:
+        raise QTreeValidationError(f"Questions unreachable from {tree.root_question_id}: {', '.join(unreachable)}")
+
+    # Loops are fine ("tell me more until 'next question'") as long as every
+    # question can still reach the end of the tree.
+    incoming: Dict[str, Set[str]] = {qid: set() for qid in tree.questions}
+    for source, targets in edges.items():
+        for target in targets:
+            incoming[target].add(source)
+    can_finish = set(terminal)
+    queue = deque(terminal)
+    while queue:
+        for source in incoming[queue.popleft()]:
+            if source not in can_finish:
+                can_finish.add(source)
+                queue.append(source)
+    trapped = sorted(set(tree.questions) - can_finish)
+    if trapped:
+        raise QTreeValidationError(f"Questions caught in a cycle with no way out: {', '.join(trapped)}")
+
+
+def compile_qtree(tree: QTreeDefinition) -> CompiledTree:
+    """Validate follow-up targets, reachability and cycles, and build the transition tables."""
+    if tree.root_question_id not in tree.questions:
+        raise QTreeValidationError("root_question_id must exist in questions")
+    nodes = {sys.intern(qid): node for qid, node in tree.questions.items()}
+    edges: Dict[str, Set[str]] = {qid: set() for qid in nodes}
+    terminal: Set[str] = set()
+    for qid, node in nodes.items():
+        follow_ups = {} if node.end_of_tree else dict(node.follow_ups or {})
+        for value, target in follow_ups.items():
+            if target not in nodes:
+                raise QTreeValidationError(f"Follow-up '{value}' of question {qid} points to unknown question {target}")
+            edges[qid].add(target)
+        if "default" not in follow_ups:
+            # Ends the tree (`end_of_tree`, no follow-ups) or on any value without a branch.
+            terminal.add(qid)
+    _validate_graph(tree, edges, terminal)
+
+    questions: Dict[str, CompiledQuestion] = {}
+    for qid, node in nodes.items():
+        follow_ups = {} if node.end_of_tree else node.follow_ups or {}
+        transitions = {sys.intern(str(v)): nodes[t] for v, t in follow_ups.items() if v != "default"}
+        default_id = follow_ups.get("default")
+        options = _compile_options(qid, node.options or [])
+        questions[qid] = CompiledQuestion(
+            node=node,
+            transitions=MappingProxyType(transitions) if transitions else _EMPTY,
+            default_next=nodes[default_id] if default_id else None,
+            options=options,
+            classifier=PatternClassifier(options),
+        )
+    return CompiledTree(
+        definition=tree,
+        tree_id=tree.tree_id,
+        root=nodes[tree.root_question_id],
+        questions=MappingProxyType(questions),
+    )
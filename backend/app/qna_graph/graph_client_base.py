@@ -1,15 +1,120 @@
 from __future__ import annotations
 
 import abc
-from typing import Any, Dict, List, Optional
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .instrumentation import QueryInstrumentation, normalize_query, payload_bytes
+
+Statement = Tuple[str, Optional[Dict[str, Any]]]
 
 
 class GraphClient(abc.ABC):
-    """Abstract graph client interface for AGE and Neptune."""
+    """
+    Abstract graph client interface for AGE, Neptune and the in-memory graph.
 
-    @abc.abstractmethod
-    async def run_cypher(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    Backends implement `_run_cypher` (and `_run_transaction` where they support real
+    transactions); the public `run_cypher` / `run_transaction` time every call into
+    `self.instrumentation`.
+
+    `idempotent=True` marks reads and MERGE-only writes, which are safe to replay;
+    backends that retry may then also retry errors where the first attempt could
+    already have been applied (timeouts, dropped connections).
+    """
+
+    def __init__(self, *, instrumentation: Optional[QueryInstrumentation] = None) -> None:
+        self.instrumentation = instrumentation or QueryInstrumentation()
+
+    def _error_class(self, exc: BaseException) -> str:
+        if isinstance(exc, asyncio.TimeoutError):
+            return "timeout"
+        if self.is_connection_error(exc):
+            return "connection"
+        return type(exc).__name__
+
+    async def run_cypher(
+        self, query: str, params: Optional[Dict[str, Any]] = None, *, idempotent: bool = False
+    ) -> List[Dict[str, Any]]:
         """Run a Cypher query and return rows as dicts."""
+        started = time.perf_counter()
+        rows: List[Dict[str, Any]] = []
+        error: Optional[str] = None
+        try:
+            rows = await self._run_cypher(query, params, idempotent=idempotent)
+            return rows
+        except Exception as exc:
+            error = self._error_class(exc)
+            raise
+        finally:
+            self.instrumentation.observe(
+                normalize_query(query),
+                (time.perf_counter() - started) * 1000,
+                rows=len(rows),
+                size=payload_bytes(query, params),
+                error=error,
+            )
+
+    async def run_transaction(
+        self, statements: Sequence[Statement], *, idempotent: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several Cypher statements atomically and return each statement's rows."""
+        started = time.perf_counter()
+        results: List[List[Dict[str, Any]]] = []
+        error: Optional[str] = None
+        try:
+            results = await self._run_transaction(statements, idempotent=idempotent)
+            return results
+        except Exception as exc:
+            error = self._error_class(exc)
+            raise
+        finally:
+            self.instrumentation.observe(
+                QueryInstrumentation.transaction_template(statements),
+                (time.perf_counter() - started) * 1000,
+                rows=sum(len(rows) for rows in results),
+                size=sum(payload_bytes(query, params) for query, params in statements),
+                error=error,
+            )
+
+    @abc.abstractmethod
+    async def _run_cypher(
+        self, query: str, params: Optional[Dict[str, Any]] = None, *, idempotent: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Backend implementation of `run_cypher`."""
+
+    async def run_many(
+        self, statements: Sequence[Statement], *, max_concurrency: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run independent read statements concurrently and return each statement's rows,
+        in order. Each statement goes out on its own pooled connection (AGE) or
+        keep-alive request (Neptune), so the batch costs roughly the slowest read rather
+        than the sum. Use `run_transaction` when the statements must see one snapshot
+        or write together. `max_concurrency` caps how many run at once.
+        """
+        if len(statements) <= 1:
+            return [await self.run_cypher(query, params, idempotent=True) for query, params in statements]
+        if max_concurrency is None:
+            return list(
+                await asyncio.gather(*(self.run_cypher(query, params, idempotent=True) for query, params in statements))
+            )
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(query: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.run_cypher(query, params, idempotent=True)
+
+        return list(await asyncio.gather(*(run_one(query, params) for query, params in statements)))
+
+    async def _run_transaction(
+        self, statements: Sequence[Statement], *, idempotent: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Backends without multi-statement transactions (Neptune HTTP, where every request
+        is its own transaction) run them in order; override where the backend allows it.
+        """
+        return [await self._run_cypher(query, params, idempotent=idempotent) for query, params in statements]
 
     @abc.abstractmethod
     async def init_schema(self) -> None:
@@ -19,6 +124,24 @@ class GraphClient(abc.ABC):
     async def ensure_graph(self, graph_name: str) -> None:
         """Ensure the graph exists (no-op if already present)."""
 
+    async def ensure_indexes(self, vertex_labels: Sequence[str], edge_labels: Sequence[str]) -> None:
+        """
+        Provision property/adjacency indexes for these labels. No-op by default
+        (Neptune indexes automatically); backends that need explicit indexes override it.
+        """
+        return None
+
+    def is_connection_error(self, exc: BaseException) -> bool:
+        """
+        True if `exc` means the backend connection (or the graph itself) went away, so
+        callers that memoize schema readiness should re-check it. Backends extend this.
+        """
+        return isinstance(exc, (ConnectionError, OSError, asyncio.TimeoutError))
+
+    def stats(self) -> Dict[str, Any]:
+        """Client-level counters for the metrics endpoint; backends add what they track."""
+        return {"backend": type(self).__name__}
+
     async def close(self) -> None:
         """Override if the client needs teardown."""
         return None
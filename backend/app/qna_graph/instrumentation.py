@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+    """
+    Collapse a Cypher statement to its template: whitespace squeezed and literals
+    (as produced by inlined parameters) replaced with `?`.
+    """
+    template = _STRING_RE.sub("?", query)
+    template = _NUMBER_RE.sub("?", template)
+    return _SPACE_RE.sub(" ", template).strip()
+
+
+def payload_bytes(query: str, params: Optional[Dict[str, Any]]) -> int:
+    size = len(query.encode("utf-8"))
+    if params:
+        size += len(json.dumps(params, default=str).encode("utf-8"))
+    return size
+
+
+class _TemplateStats:
+    __slots__ = ("calls", "errors", "rows", "payload_bytes", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.rows = 0
+        self.payload_bytes = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, rows: int, size: int, error: Optional[str]) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.payload_bytes += size
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "rows": self.rows,
+            "payload_bytes": self.payload_bytes,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "histogram_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+class QueryInstrumentation:
+    """
+    Per-template timing for graph calls: latency histogram, row counts, payload size
+    and error classes, plus a bounded log of calls slower than `slow_query_ms`.
+
+    `GraphClient.run_cypher` / `run_transaction` feed it; templates come from
+    `normalize_query`, and a transaction is keyed by its distinct statement templates.
+    """
+
+    def __init__(self, *, slow_query_ms: float = 200.0, slow_log_size: int = 100, max_templates: int = 500) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.max_templates = max_templates
+        self._templates: Dict[str, _TemplateStats] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+
+    @staticmethod
+    def transaction_template(statements: Sequence[Any]) -> str:
+        templates: List[str] = []
+        for query, _ in statements:
+            template = normalize_query(query)
+            if template not in templates:
+                templates.append(template)
+        return "TRANSACTION: " + " ; ".join(templates)
+
+    def observe(self, template: str, elapsed_ms: float, *, rows: int, size: int, error: Optional[str] = None) -> None:
+        stats = self._templates.get(template)
+        if stats is None:
+            if len(self._templates) >= self.max_templates:
+                template = "<other>"
+            stats = self._templates.setdefault(template, _TemplateStats())
+        stats.observe(elapsed_ms, rows, size, error)
+        if self.slow_query_ms > 0 and elapsed_ms >= self.slow_query_ms:
+            entry = {
+                "template": template,
+                "elapsed_ms": round(elapsed_ms, 2),
+                "rows": rows,
+                "payload_bytes": size,
+                "error": error,
+                "at": time.time(),
+            }
+            self._slow.append(entry)
+            print(f"[graph] slow query {entry['elapsed_ms']}ms rows={rows} bytes={size}: {template[:300]}")
+
+    def reset(self) -> None:
+        self._templates.clear()
+        self._slow.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Templates ordered by total time, so the dominant operations come first."""
+        templates = sorted(self._templates.items(), key=lambda item: item[1].total_ms, reverse=True)
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "templates": [{"template": template, **stats.snapshot()} for template, stats in templates],
+            "slow_queries": list(self._slow),
+        }
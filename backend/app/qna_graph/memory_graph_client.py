@@ -0,0 +1,1227 @@
+"""
+In-process property graph with an openCypher interpreter.
+
+Covers the subset of Cypher the repository, scoring and projection code use:
+MATCH / OPTIONAL MATCH (with WHERE), MERGE (with ON CREATE / ON MATCH SET), CREATE,
+SET, DELETE / DETACH DELETE, UNWIND, WITH and RETURN (DISTINCT, aggregates,
+ORDER BY, SKIP, LIMIT). Nodes are indexed by label and by (label, property) value,
+and every node keeps its incoming/outgoing edges, so anchored patterns never scan.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .graph_client_base import GraphClient, Statement
+from .instrumentation import QueryInstrumentation
+
+
+class CypherError(ValueError):
+    """Unsupported or malformed Cypher for the in-memory graph."""
+
+
+# --- graph store ---------------------------------------------------------------
+
+
+class Node:
+    __slots__ = ("id", "labels", "props")
+
+    def __init__(self, node_id: int, labels: Set[str], props: Dict[str, Any]) -> None:
+        self.id = node_id
+        self.labels = labels
+        self.props = props
+
+
+class Edge:
+    __slots__ = ("id", "type", "start", "end", "props")
+
+    def __init__(self, edge_id: int, rel_type: str, start: Node, end: Node, props: Dict[str, Any]) -> None:
+        self.id = edge_id
+        self.type = rel_type
+        self.start = start
+        self.end = end
+        self.props = props
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable stand-in for a value, for indexes, grouping and DISTINCT."""
+    if isinstance(value, Node):
+        return ("node", value.id)
+    if isinstance(value, Edge):
+        return ("edge", value.id)
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple(_freeze(v) for v in value))
+    return value
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.nodes: Dict[int, Node] = {}
+        self.edges: Dict[int, Edge] = {}
+        self.out: Dict[int, Set[int]] = defaultdict(set)
+        self.inc: Dict[int, Set[int]] = defaultdict(set)
+        self.by_label: Dict[str, Set[int]] = defaultdict(set)
+        self.by_prop: Dict[Tuple[str, str], Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.next_id = 1
+        # Inverse operations of the statement/transaction in progress.
+        self.undo: Optional[List[Callable[[], None]]] = None
+
+    def _log(self, fn: Callable[[], None]) -> None:
+        if self.undo is not None:
+            self.undo.append(fn)
+
+    def _index(self, node: Node, key: str, value: Any, add: bool) -> None:
+        frozen = _freeze(value)
+        for label in node.labels:
+            bucket = self.by_prop[(label, key)]
+            if add:
+                bucket[frozen].add(node.id)
+            else:
+                bucket[frozen].discard(node.id)
+
+    def create_node(self, labels: Sequence[str], props: Dict[str, Any], node_id: Optional[int] = None) -> Node:
+        node = Node(node_id or self.next_id, set(labels), {k: v for k, v in props.items() if v is not None})
+        self.next_id = max(self.next_id, node.id + 1)
+        self.nodes[node.id] = node
+        for label in node.labels:
+            self.by_label[label].add(node.id)
+        for key, value in node.props.items():
+            self._index(node, key, value, True)
+        self._log(lambda: self.delete_node(node, detach=True))
+        return node
+
+    def create_edge(self, rel_type: str, start: Node, end: Node, props: Dict[str, Any], edge_id: Optional[int] = None) -> Edge:
+        edge = Edge(edge_id or self.next_id, rel_type, start, end, {k: v for k, v in props.items() if v is not None})
+        self.next_id = max(self.next_id, edge.id + 1)
+        self.edges[edge.id] = edge
+        self.out[start.id].add(edge.id)
+        self.inc[end.id].add(edge.id)
+        self._log(lambda: self.delete_edge(edge))
+        return edge
+
+    def set_prop(self, entity: Any, key: str, value: Any) -> None:
+        old = entity.props.get(key)
+        if isinstance(entity, Node) and key in entity.props:
+            self._index(entity, key, old, False)
+        if value is None:
+            entity.props.pop(key, None)
+        else:
+            entity.props[key] = value
+            if isinstance(entity, Node):
+                self._index(entity, key, value, True)
+        self._log(lambda: self.set_prop(entity, key, old))
+
+    def delete_edge(self, edge: Edge) -> None:
+        if self.edges.pop(edge.id, None) is None:
+            return
+        self.out[edge.start.id].discard(edge.id)
+        self.inc[edge.end.id].discard(edge.id)
+        self._log(lambda: self._restore_edge(edge))
+
+    def _restore_edge(self, edge: Edge) -> None:
+        self.edges[edge.id] = edge
+        self.out[edge.start.id].add(edge.id)
+        self.inc[edge.end.id].add(edge.id)
+
+    def delete_node(self, node: Node, *, detach: bool) -> None:
+        if node.id not in self.nodes:
+            return
+        attached = self.out[node.id] | self.inc[node.id]
+        if attached and not detach:
+            raise CypherError("Cannot delete a node that still has relationships; use DETACH DELETE")
+        for edge_id in list(attached):
+            self.delete_edge(self.edges[edge_id])
+        del self.nodes[node.id]
+        for label in node.labels:
+            self.by_label[label].discard(node.id)
+        for key, value in node.props.items():
+            self._index(node, key, value, False)
+        self._log(lambda: self._restore_node(node))
+
+    def _restore_node(self, node: Node) -> None:
+        self.nodes[node.id] = node
+        for label in node.labels:
+            self.by_label[label].add(node.id)
+        for key, value in node.props.items():
+            self._index(node, key, value, True)
+
+    def candidates(self, labels: Sequence[str], props: Dict[str, Any]) -> Iterator[Node]:
+        ids: Optional[Set[int]] = None
+        for label in labels:
+            pool = self.by_label.get(label, set())
+            for key, value in props.items():
+                try:
+                    pool = self.by_prop[(label, key)].get(_freeze(value), set())
+                except TypeError:
+                    continue
+                break
+            ids = set(pool) if ids is None else ids & pool
+        if ids is None:
+            ids = set(self.nodes)
+        for node_id in ids:
+            node = self.nodes.get(node_id)
+            if node is not None:
+                yield node
+
+
+# --- tokenizer -----------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+|//[^\n]*)
+    |(?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    |(?P<number>\d+\.\d+|\d+)
+    |(?P<param>\$[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*|`[^`]+`)
+    |(?P<op>->|<-|<>|<=|>=|!=|\+=|[()\[\]{}:,.;\-<>=+*/%|])
+    """,
+    re.VERBOSE,
+)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", "'": "'", '"': '"'}
+
+
+@dataclass
+class _Tok:
+    kind: str
+    value: Any
+    start: int
+    end: int
+
+
+def _tokenize(query: str) -> List[_Tok]:
+    tokens: List[_Tok] = []
+    pos = 0
+    while pos < len(query):
+        m = _TOKEN_RE.match(query, pos)
+        if not m:
+            raise CypherError(f"Unexpected character at {pos}: {query[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "string":
+            value = re.sub(r"\\(.)", lambda e: _ESCAPES.get(e.group(1), e.group(1)), text[1:-1])
+            tokens.append(_Tok("string", value, m.start(), m.end()))
+        elif kind == "number":
+            tokens.append(_Tok("number", float(text) if "." in text else int(text), m.start(), m.end()))
+        elif kind == "param":
+            tokens.append(_Tok("param", text[1:], m.start(), m.end()))
+        elif kind == "ident":
+            tokens.append(_Tok("ident", text.strip("`"), m.start(), m.end()))
+        elif kind == "op":
+            tokens.append(_Tok("op", text, m.start(), m.end()))
+        pos = m.end()
+    tokens.append(_Tok("eof", None, len(query), len(query)))
+    return tokens
+
+
+# --- AST -------------------------------------------------------------------------
+
+_AGGREGATES = {"count", "sum", "avg", "min", "max", "collect"}
+
+
+@dataclass
+class NodePat:
+    var: Optional[str]
+    labels: List[str]
+    props: Optional[tuple]
+
+
+@dataclass
+class RelPat:
+    var: Optional[str]
+    types: List[str]
+    props: Optional[tuple]
+    direction: str  # "out", "in" or "both", relative to the left node
+
+
+@dataclass
+class PatternPart:
+    nodes: List[NodePat]
+    rels: List[RelPat]
+
+
+@dataclass
+class Projection:
+    distinct: bool = False
+    star: bool = False
+    items: List[Tuple[tuple, str]] = field(default_factory=list)
+    order: List[Tuple[tuple, bool]] = field(default_factory=list)
+    skip: Optional[tuple] = None
+    limit: Optional[tuple] = None
+    where: Optional[tuple] = None
+
+
+def _has_agg(expr: Any) -> bool:
+    if not isinstance(expr, tuple):
+        return False
+    if expr and expr[0] == "agg":
+        return True
+    return any(
+        _has_agg(part) if isinstance(part, tuple) else any(_has_agg(p) for p in part) if isinstance(part, list) else False
+        for part in expr[1:]
+    )
+
+
+class _Parser:
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.toks = _tokenize(query)
+        self.pos = 0
+
+    # token helpers
+    def peek(self, offset: int = 0) -> _Tok:
+        return self.toks[min(self.pos + offset, len(self.toks) - 1)]
+
+    def next(self) -> _Tok:
+        tok = self.toks[self.pos]
+        self.pos += 1
+        return tok
+
+    def is_kw(self, *words: str, offset: int = 0) -> bool:
+        for i, word in enumerate(words):
+            tok = self.peek(offset + i)
+            if tok.kind != "ident" or tok.value.upper() != word:
+                return False
+        return True
+
+    def accept_kw(self, *words: str) -> bool:
+        if self.is_kw(*words):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect_kw(self, word: str) -> None:
+        if not self.accept_kw(word):
+            raise CypherError(f"Expected {word} near {self.query[self.peek().start:self.peek().start + 30]!r}")
+
+    def is_op(self, op: str) -> bool:
+        tok = self.peek()
+        return tok.kind == "op" and tok.value == op
+
+    def accept_op(self, op: str) -> bool:
+        if self.is_op(op):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_op(self, op: str) -> None:
+        if not self.accept_op(op):
+            raise CypherError(f"Expected {op!r} near {self.query[self.peek().start:self.peek().start + 30]!r}")
+
+    def ident(self) -> str:
+        tok = self.next()
+        if tok.kind != "ident":
+            raise CypherError(f"Expected identifier near {self.query[tok.start:tok.start + 30]!r}")
+        return tok.value
+
+    # clauses
+    def parse(self) -> List[tuple]:
+        clauses: List[tuple] = []
+        while self.peek().kind != "eof":
+            if self.accept_op(";"):
+                continue
+            clauses.append(self.clause())
+        return clauses
+
+    def clause(self) -> tuple:
+        optional = self.accept_kw("OPTIONAL", "MATCH")
+        if optional or self.accept_kw("MATCH"):
+            parts = self.patterns()
+            where = self.expr() if self.accept_kw("WHERE") else None
+            return ("match", optional, parts, where)
+        if self.accept_kw("MERGE"):
+            part = self.pattern_part()
+            on_create: List[tuple] = []
+            on_match: List[tuple] = []
+            while self.is_kw("ON"):
+                self.next()
+                if self.accept_kw("CREATE"):
+                    self.expect_kw("SET")
+                    on_create.extend(self.set_items())
+                else:
+                    self.expect_kw("MATCH")
+                    self.expect_kw("SET")
+                    on_match.extend(self.set_items())
+            return ("merge", part, on_create, on_match)
+        if self.accept_kw("CREATE"):
+            return ("create", self.patterns())
+        if self.accept_kw("SET"):
+            return ("set", self.set_items())
+        detach = self.accept_kw("DETACH", "DELETE")
+        if detach or self.accept_kw("DELETE"):
+            exprs = [self.expr()]
+            while self.accept_op(","):
+                exprs.append(self.expr())
+            return ("delete", detach, exprs)
+        if self.accept_kw("UNWIND"):
+            value = self.expr()
+            self.expect_kw("AS")
+            return ("unwind", value, self.ident())
+        if self.accept_kw("WITH"):
+            return ("with", self.projection(allow_where=True))
+        if self.accept_kw("RETURN"):
+            return ("return", self.projection(allow_where=False))
+        tok = self.peek()
+        raise CypherError(f"Unsupported clause near {self.query[tok.start:tok.start + 30]!r}")
+
+    def set_items(self) -> List[tuple]:
+        items = [self.set_item()]
+        while self.accept_op(","):
+            items.append(self.set_item())
+        return items
+
+    def set_item(self) -> tuple:
+        var = self.ident()
+        if self.accept_op("+="):
+            return ("merge_map", var, self.expr())
+        if self.accept_op("="):
+            return ("replace_map", var, self.expr())
+        self.expect_op(".")
+        key = self.ident()
+        self.expect_op("=")
+        return ("prop", var, key, self.expr())
+
+    def projection(self, *, allow_where: bool) -> Projection:
+        proj = Projection(distinct=self.accept_kw("DISTINCT"))
+        if self.accept_op("*"):
+            proj.star = True
+            if self.accept_op(","):
+                proj.items = self.proj_items()
+        else:
+            proj.items = self.proj_items()
+        if self.accept_kw("ORDER", "BY"):
+            while True:
+                expr = self.expr()
+                desc = False
+                if self.accept_kw("DESC") or self.accept_kw("DESCENDING"):
+                    desc = True
+                elif self.accept_kw("ASC") or self.accept_kw("ASCENDING"):
+                    desc = False
+                proj.order.append((expr, desc))
+                if not self.accept_op(","):
+                    break
+        if self.accept_kw("SKIP"):
+            proj.skip = self.expr()
+        if self.accept_kw("LIMIT"):
+            proj.limit = self.expr()
+        if allow_where and self.accept_kw("WHERE"):
+            proj.where = self.expr()
+        return proj
+
+    def proj_items(self) -> List[Tuple[tuple, str]]:
+        items = []
+        while True:
+            start = self.peek().start
+            expr = self.expr()
+            end = self.toks[self.pos - 1].end
+            alias = self.ident() if self.accept_kw("AS") else self.query[start:end].strip()
+            items.append((expr, alias))
+            if not self.accept_op(","):
+                return items
+
+    # patterns
+    def patterns(self) -> List[PatternPart]:
+        parts = [self.pattern_part()]
+        while self.accept_op(","):
+            parts.append(self.pattern_part())
+        return parts
+
+    def pattern_part(self) -> PatternPart:
+        nodes = [self.node_pattern()]
+        rels: List[RelPat] = []
+        while self.is_op("-") or self.is_op("<-"):
+            rels.append(self.rel_pattern())
+            nodes.append(self.node_pattern())
+        return PatternPart(nodes, rels)
+
+    def labels(self, sep_ok: bool) -> List[str]:
+        labels: List[str] = []
+        while self.accept_op(":"):
+            labels.append(self.ident())
+            while sep_ok and self.accept_op("|"):
+                labels.append(self.ident())
+        return labels
+
+    def node_pattern(self) -> NodePat:
+        self.expect_op("(")
+        var = self.ident() if self.peek().kind == "ident" else None
+        labels = self.labels(sep_ok=False)
+        props = self.prop_map() if self.is_op("{") or self.peek().kind == "param" else None
+        self.expect_op(")")
+        return NodePat(var, labels, props)
+
+    def rel_pattern(self) -> RelPat:
+        left_arrow = self.accept_op("<-")
+        if not left_arrow:
+            self.expect_op("-")
+        var, types, props = None, [], None
+        if self.accept_op("["):
+            var = self.ident() if self.peek().kind == "ident" else None
+            types = self.labels(sep_ok=True)
+            props = self.prop_map() if self.is_op("{") or self.peek().kind == "param" else None
+            self.expect_op("]")
+        right_arrow = self.accept_op("->")
+        if not right_arrow:
+            self.expect_op("-")
+        if left_arrow and right_arrow:
+            raise CypherError("Relationship pattern cannot point both ways")
+        direction = "in" if left_arrow else "out" if right_arrow else "both"
+        return RelPat(var, types, props, direction)
+
+    def prop_map(self) -> tuple:
+        if self.peek().kind == "param":
+            return ("param", self.next().value)
+        return self.map_literal()
+
+    def map_literal(self) -> tuple:
+        self.expect_op("{")
+        items: List[Tuple[str, tuple]] = []
+        if not self.accept_op("}"):
+            while True:
+                tok = self.next()
+                if tok.kind not in ("ident", "string"):
+                    raise CypherError("Expected map key")
+                self.expect_op(":")
+                items.append((tok.value, self.expr()))
+                if self.accept_op("}"):
+                    break
+                self.expect_op(",")
+        return ("map", items)
+
+    # expressions (lowest to highest precedence)
+    def expr(self) -> tuple:
+        left = self.and_expr()
+        while True:
+            if self.accept_kw("OR"):
+                left = ("or", left, self.and_expr())
+            elif self.accept_kw("XOR"):
+                left = ("xor", left, self.and_expr())
+            else:
+                return left
+
+    def and_expr(self) -> tuple:
+        left = self.not_expr()
+        while self.accept_kw("AND"):
+            left = ("and", left, self.not_expr())
+        return left
+
+    def not_expr(self) -> tuple:
+        if self.accept_kw("NOT"):
+            return ("not", self.not_expr())
+        return self.comparison()
+
+    def comparison(self) -> tuple:
+        left = self.additive()
+        while True:
+            tok = self.peek()
+            if tok.kind == "op" and tok.value in ("=", "<>", "!=", "<", ">", "<=", ">="):
+                self.next()
+                left = ("cmp", "<>" if tok.value == "!=" else tok.value, left, self.additive())
+            elif self.accept_kw("IN"):
+                left = ("in", left, self.additive())
+            elif self.accept_kw("IS", "NOT", "NULL"):
+                left = ("isnull", left, True)
+            elif self.accept_kw("IS", "NULL"):
+                left = ("isnull", left, False)
+            elif self.accept_kw("STARTS", "WITH"):
+                left = ("str", "starts", left, self.additive())
+            elif self.accept_kw("ENDS", "WITH"):
+                left = ("str", "ends", left, self.additive())
+            elif self.accept_kw("CONTAINS"):
+                left = ("str", "contains", left, self.additive())
+            else:
+                return left
+
+    def additive(self) -> tuple:
+        left = self.multiplicative()
+        while self.is_op("+") or self.is_op("-"):
+            left = ("arith", self.next().value, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> tuple:
+        left = self.unary()
+        while self.is_op("*") or self.is_op("/") or self.is_op("%"):
+            left = ("arith", self.next().value, left, self.unary())
+        return left
+
+    def unary(self) -> tuple:
+        if self.accept_op("-"):
+            return ("neg", self.unary())
+        if self.accept_op("+"):
+            return self.unary()
+        return self.postfix()
+
+    def postfix(self) -> tuple:
+        value = self.atom()
+        while True:
+            if self.is_op(".") and self.peek(1).kind == "ident":
+                self.next()
+                value = ("prop", value, self.ident())
+            elif self.accept_op("["):
+                index = self.expr()
+                self.expect_op("]")
+                value = ("index", value, index)
+            else:
+                return value
+
+    def atom(self) -> tuple:
+        tok = self.peek()
+        if tok.kind in ("string", "number"):
+            self.next()
+            return ("lit", tok.value)
+        if tok.kind == "param":
+            self.next()
+            return ("param", tok.value)
+        if self.accept_op("("):
+            inner = self.expr()
+            self.expect_op(")")
+            return inner
+        if self.is_op("["):
+            self.next()
+            items: List[tuple] = []
+            if not self.accept_op("]"):
+                items.append(self.expr())
+                while self.accept_op(","):
+                    items.append(self.expr())
+                self.expect_op("]")
+            return ("list", items)
+        if self.is_op("{"):
+            return self.map_literal()
+        if tok.kind == "ident":
+            word = tok.value.upper()
+            if word in ("TRUE", "FALSE"):
+                self.next()
+                return ("lit", word == "TRUE")
+            if word == "NULL":
+                self.next()
+                return ("lit", None)
+            if self.peek(1).kind == "op" and self.peek(1).value == "(":
+                name = self.next().value.lower()
+                self.next()
+                distinct = self.accept_kw("DISTINCT")
+                if name == "count" and self.accept_op("*"):
+                    self.expect_op(")")
+                    return ("agg", "count", False, None)
+                args: List[tuple] = []
+                if not self.accept_op(")"):
+                    args.append(self.expr())
+                    while self.accept_op(","):
+                        args.append(self.expr())
+                    self.expect_op(")")
+                if name in _AGGREGATES:
+                    if len(args) != 1:
+                        raise CypherError(f"{name}() takes one argument")
+                    return ("agg", name, distinct, args[0])
+                return ("call", name, args)
+            self.next()
+            return ("var", tok.value)
+        raise CypherError(f"Unexpected token near {self.query[tok.start:tok.start + 30]!r}")
+
+
+@lru_cache(maxsize=512)
+def _parse(query: str) -> List[tuple]:
+    return _Parser(query).parse()
+
+
+# --- evaluation ------------------------------------------------------------------
+
+
+def _truthy(value: Any) -> bool:
+    return value is True
+
+
+def _compare(op: str, left: Any, right: Any) -> Optional[bool]:
+    if left is None or right is None:
+        return None
+    if op == "=":
+        return _freeze(left) == _freeze(right)
+    if op == "<>":
+        return _freeze(left) != _freeze(right)
+    try:
+        if op == "<":
+            return left < right
+        if op == ">":
+            return left > right
+        if op == "<=":
+            return left <= right
+        return left >= right
+    except TypeError:
+        return None
+
+
+def _arith(op: str, left: Any, right: Any) -> Any:
+    if left is None or right is None:
+        return None
+    if op == "+":
+        if isinstance(left, list) or isinstance(right, list):
+            return (left if isinstance(left, list) else [left]) + (right if isinstance(right, list) else [right])
+        if isinstance(left, str) or isinstance(right, str):
+            return f"{left}{right}"
+        return left + right
+    if op == "-":
+        return left - right
+    if op == "*":
+        return left * right
+    if op == "/":
+        if isinstance(left, int) and isinstance(right, int):
+            return int(left / right)
+        return left / right
+    return left % right
+
+
+def _to_output(value: Any) -> Any:
+    if isinstance(value, Node):
+        label = next(iter(value.labels), "")
+        return {"id": value.id, "label": label, "properties": dict(value.props)}
+    if isinstance(value, Edge):
+        return {
+            "id": value.id,
+            "label": value.type,
+            "start_id": value.start.id,
+            "end_id": value.end.id,
+            "properties": dict(value.props),
+        }
+    if isinstance(value, list):
+        return [_to_output(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_output(v) for k, v in value.items()}
+    return value
+
+
+def _sort_key(value: Any) -> tuple:
+    if value is None:
+        return (1, 0, 0)
+    if isinstance(value, bool):
+        return (0, 2, value)
+    if isinstance(value, (int, float)):
+        return (0, 0, value)
+    if isinstance(value, str):
+        return (0, 1, value)
+    return (0, 3, str(_freeze(value)))
+
+
+def _call(name: str, args: List[Any]) -> Any:
+    if name == "coalesce":
+        return next((a for a in args if a is not None), None)
+    first = args[0] if args else None
+    if name in ("tolower", "toupper", "tostring", "trim") and first is None:
+        return None
+    if name == "tolower":
+        return str(first).lower()
+    if name == "toupper":
+        return str(first).upper()
+    if name == "tostring":
+        return first if isinstance(first, str) else json.dumps(first) if isinstance(first, bool) else str(first)
+    if name == "trim":
+        return str(first).strip()
+    if name in ("size", "length"):
+        return None if first is None else len(first)
+    if name == "tointeger":
+        return None if first is None else int(float(first))
+    if name == "tofloat":
+        return None if first is None else float(first)
+    if name == "abs":
+        return None if first is None else abs(first)
+    if name == "round":
+        return None if first is None else round(first, int(args[1]) if len(args) > 1 else 0)
+    if name == "keys":
+        return None if first is None else list((first.props if isinstance(first, (Node, Edge)) else first).keys())
+    if name == "properties":
+        return None if first is None else dict(first.props if isinstance(first, (Node, Edge)) else first)
+    if name == "id":
+        return None if first is None else first.id
+    if name == "labels":
+        return None if first is None else sorted(first.labels)
+    if name == "type":
+        return None if first is None else first.type
+    if name == "head":
+        return first[0] if first else None
+    if name == "last":
+        return first[-1] if first else None
+    raise CypherError(f"Unsupported function: {name}()")
+
+
+class _Executor:
+    def __init__(self, store: _Store, params: Dict[str, Any]) -> None:
+        self.store = store
+        self.params = params
+
+    # expressions
+    def ev(self, expr: tuple, row: Dict[str, Any], group: Optional[List[Dict[str, Any]]] = None) -> Any:
+        kind = expr[0]
+        if kind == "lit":
+            return expr[1]
+        if kind == "param":
+            if expr[1] not in self.params:
+                raise CypherError(f"Missing parameter ${expr[1]}")
+            return self.params[expr[1]]
+        if kind == "var":
+            if expr[1] not in row:
+                raise CypherError(f"Variable `{expr[1]}` not defined")
+            return row[expr[1]]
+        if kind == "prop":
+            target = self.ev(expr[1], row, group)
+            if target is None:
+                return None
+            if isinstance(target, (Node, Edge)):
+                return target.props.get(expr[2])
+            if isinstance(target, dict):
+                return target.get(expr[2])
+            raise CypherError(f"Cannot read property {expr[2]} of {type(target).__name__}")
+        if kind == "index":
+            target, index = self.ev(expr[1], row, group), self.ev(expr[2], row, group)
+            if target is None or index is None:
+                return None
+            if isinstance(target, dict):
+                return target.get(index)
+            return target[index] if -len(target) <= index < len(target) else None
+        if kind == "list":
+            return [self.ev(e, row, group) for e in expr[1]]
+        if kind == "map":
+            return {k: self.ev(e, row, group) for k, e in expr[1]}
+        if kind == "and":
+            left, right = self.ev(expr[1], row, group), self.ev(expr[2], row, group)
+            if left is False or right is False:
+                return False
+            return None if left is None or right is None else True
+        if kind == "or":
+            left, right = self.ev(expr[1], row, group), self.ev(expr[2], row, group)
+            if left is True or right is True:
+                return True
+            return None if left is None or right is None else False
+        if kind == "xor":
+            left, right = self.ev(expr[1], row, group), self.ev(expr[2], row, group)
+            return None if left is None or right is None else bool(left) != bool(right)
+        if kind == "not":
+            value = self.ev(expr[1], row, group)
+            return None if value is None else not value
+        if kind == "cmp":
+            return _compare(expr[1], self.ev(expr[2], row, group), self.ev(expr[3], row, group))
+        if kind == "in":
+            value, container = self.ev(expr[1], row, group), self.ev(expr[2], row, group)
+            if container is None:
+                return None
+            frozen = _freeze(value)
+            if any(_freeze(item) == frozen for item in container):
+                return True
+            return None if value is None else False
+        if kind == "isnull":
+            value = self.ev(expr[1], row, group)
+            return (value is not None) if expr[2] else (value is None)
+        if kind == "str":
+            left, right = self.ev(expr[2], row, group), self.ev(expr[3], row, group)
+            if not isinstance(left, str) or not isinstance(right, str):
+                return None
+            return left.startswith(right) if expr[1] == "starts" else left.endswith(right) if expr[1] == "ends" else right in left
+        if kind == "arith":
+            return _arith(expr[1], self.ev(expr[2], row, group), self.ev(expr[3], row, group))
+        if kind == "neg":
+            value = self.ev(expr[1], row, group)
+            return None if value is None else -value
+        if kind == "call":
+            return _call(expr[1], [self.ev(a, row, group) for a in expr[2]])
+        if kind == "agg":
+            if group is None:
+                raise CypherError("Aggregate functions are only allowed in WITH/RETURN")
+            return self.aggregate(expr, group)
+        raise CypherError(f"Unsupported expression: {kind}")
+
+    def aggregate(self, expr: tuple, group: List[Dict[str, Any]]) -> Any:
+        _, name, distinct, arg = expr
+        if arg is None:  # count(*)
+            return len(group)
+        values = [v for v in (self.ev(arg, r) for r in group) if v is not None]
+        if distinct:
+            seen: Set[Any] = set()
+            unique = []
+            for v in values:
+                key = _freeze(v)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(v)
+            values = unique
+        if name == "count":
+            return len(values)
+        if name == "collect":
+            return values
+        if name == "sum":
+            return sum(values) if values else 0
+        if name == "avg":
+            return sum(values) / len(values) if values else None
+        if name == "min":
+            return min(values, key=_sort_key) if values else None
+        return max(values, key=_sort_key) if values else None
+
+    def props(self, expr: Optional[tuple], row: Dict[str, Any]) -> Dict[str, Any]:
+        if expr is None:
+            return {}
+        value = self.ev(expr, row)
+        if not isinstance(value, dict):
+            raise CypherError("Property map expected")
+        return value
+
+    # pattern matching
+    def _node_ok(self, pat: NodePat, node: Node, row: Dict[str, Any]) -> bool:
+        if pat.var and pat.var in row and row[pat.var] is not node:
+            return False
+        if any(label not in node.labels for label in pat.labels):
+            return False
+        for key, value in self.props(pat.props, row).items():
+            if value is None or _freeze(node.props.get(key)) != _freeze(value):
+                return False
+        return True
+
+    def _rel_ok(self, pat: RelPat, edge: Edge, row: Dict[str, Any]) -> bool:
+        if pat.var and pat.var in row and row[pat.var] is not edge:
+            return False
+        if pat.types and edge.type not in pat.types:
+            return False
+        for key, value in self.props(pat.props, row).items():
+            if value is None or _freeze(edge.props.get(key)) != _freeze(value):
+                return False
+        return True
+
+    def _anchor(self, part: PatternPart, row: Dict[str, Any]) -> int:
+        best, best_score = 0, -1
+        for i, pat in enumerate(part.nodes):
+            if pat.var and pat.var in row:
+                return i
+            score = (2 if pat.props is not None else 0) + (1 if pat.labels else 0)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _anchor_candidates(self, pat: NodePat, row: Dict[str, Any]) -> Iterator[Node]:
+        if pat.var and pat.var in row:
+            bound = row[pat.var]
+            if isinstance(bound, Node):
+                yield bound
+            return
+        props = self.props(pat.props, row)
+        if any(v is None for v in props.values()):
+            return
+        yield from self.store.candidates(pat.labels, props)
+
+    def match_part(self, part: PatternPart, row: Dict[str, Any], used: Set[int]) -> Iterator[Tuple[Dict[str, Any], Set[int]]]:
+        anchor = self._anchor(part, row)
+        steps: List[Tuple[int, int, RelPat, bool]] = [(i, i + 1, part.rels[i], True) for i in range(anchor, len(part.rels))]
+        steps += [(i, i - 1, part.rels[i - 1], False) for i in range(anchor, 0, -1)]
+        placed: Dict[int, Node] = {}
+
+        def bind(pat_var: Optional[str], value: Any, env: Dict[str, Any]) -> Dict[str, Any]:
+            if pat_var and pat_var not in env:
+                env = dict(env)
+                env[pat_var] = value
+            return env
+
+        def walk(step: int, env: Dict[str, Any], used_now: Set[int]) -> Iterator[Tuple[Dict[str, Any], Set[int]]]:
+            if step == len(steps):
+                yield env, used_now
+                return
+            src, dst, rel, forward = steps[step]
+            direction = rel.direction if forward else {"out": "in", "in": "out", "both": "both"}[rel.direction]
+            node = placed[src]
+            edge_ids: List[Tuple[int, bool]] = []
+            if direction in ("out", "both"):
+                edge_ids.extend((e, True) for e in self.store.out.get(node.id, ()))
+            if direction in ("in", "both"):
+                edge_ids.extend((e, False) for e in self.store.inc.get(node.id, ()))
+            for edge_id, outgoing in edge_ids:
+                if edge_id in used_now:
+                    continue
+                edge = self.store.edges[edge_id]
+                if not self._rel_ok(rel, edge, env):
+                    continue
+                other = edge.end if outgoing else edge.start
+                target = part.nodes[dst]
+                if not self._node_ok(target, other, env):
+                    continue
+                placed[dst] = other
+                next_env = bind(target.var, other, bind(rel.var, edge, env))
+                yield from walk(step + 1, next_env, used_now | {edge_id})
+
+        for node in list(self._anchor_candidates(part.nodes[anchor], row)):
+            if not self._node_ok(part.nodes[anchor], node, row):
+                continue
+            placed[anchor] = node
+            yield from walk(0, bind(part.nodes[anchor].var, node, row), used)
+
+    def match(self, parts: List[PatternPart], row: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        def go(i: int, env: Dict[str, Any], used: Set[int]) -> Iterator[Dict[str, Any]]:
+            if i == len(parts):
+                yield env
+                return
+            for next_env, next_used in self.match_part(parts[i], env, used):
+                yield from go(i + 1, next_env, next_used)
+
+        yield from go(0, row, set())
+
+    @staticmethod
+    def pattern_vars(parts: List[PatternPart]) -> List[str]:
+        names: List[str] = []
+        for part in parts:
+            for pat in [*part.nodes, *part.rels]:
+                if pat.var and pat.var not in names:
+                    names.append(pat.var)
+        return names
+
+    def create_part(self, part: PatternPart, row: Dict[str, Any]) -> Dict[str, Any]:
+        env = dict(row)
+        nodes: List[Node] = []
+        for pat in part.nodes:
+            if pat.var and isinstance(env.get(pat.var), Node):
+                nodes.append(env[pat.var])
+                continue
+            node = self.store.create_node(pat.labels, self.props(pat.props, env))
+            if pat.var:
+                env[pat.var] = node
+            nodes.append(node)
+        for i, rel in enumerate(part.rels):
+            if len(rel.types) != 1:
+                raise CypherError("Relationships must have exactly one type to be created")
+            if rel.direction == "in":
+                start, end = nodes[i + 1], nodes[i]
+            else:
+                start, end = nodes[i], nodes[i + 1]
+            edge = self.store.create_edge(rel.types[0], start, end, self.props(rel.props, env))
+            if rel.var:
+                env[rel.var] = edge
+        return env
+
+    # clauses
+    def apply_set(self, items: List[tuple], row: Dict[str, Any]) -> None:
+        for item in items:
+            target = row.get(item[1])
+            if target is None:
+                continue
+            if not isinstance(target, (Node, Edge)):
+                raise CypherError(f"SET target `{item[1]}` is not a node or relationship")
+            if item[0] == "prop":
+                self.store.set_prop(target, item[2], self.ev(item[3], row))
+                continue
+            value = self.ev(item[2], row) or {}
+            if item[0] == "replace_map":
+                for key in list(target.props):
+                    if key not in value:
+                        self.store.set_prop(target, key, None)
+            for key, v in value.items():
+                self.store.set_prop(target, key, v)
+
+    def project(self, proj: Projection, rows: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Returns (output row, ordering env) pairs."""
+        items = list(proj.items)
+        if proj.star:
+            names = list(rows[0].keys()) if rows else []
+            items = [(("var", n), n) for n in names if not any(alias == n for _, alias in items)] + items
+        if any(_has_agg(expr) for expr, _ in items):
+            keys = [(expr, alias) for expr, alias in items if not _has_agg(expr)]
+            groups: Dict[Any, List[Dict[str, Any]]] = {}
+            for row in rows:
+                key = tuple(_freeze(self.ev(expr, row)) for expr, _ in keys)
+                groups.setdefault(key, []).append(row)
+            if not groups and not keys:
+                groups[()] = []
+            out = []
+            for group in groups.values():
+                sample = group[0] if group else {}
+                projected = {alias: self.ev(expr, sample, group) for expr, alias in items}
+                out.append((projected, projected))
+        else:
+            out = []
+            for row in rows:
+                projected = {alias: self.ev(expr, row) for expr, alias in items}
+                out.append((projected, {**row, **projected}))
+        if proj.distinct:
+            seen: Set[Any] = set()
+            unique = []
+            for projected, env in out:
+                key = tuple((k, _freeze(v)) for k, v in projected.items())
+                if key not in seen:
+                    seen.add(key)
+                    unique.append((projected, env))
+            out = unique
+        for expr, desc in reversed(proj.order):
+            out.sort(key=lambda pair: _sort_key(self.ev(expr, pair[1])), reverse=desc)
+        if proj.skip is not None:
+            out = out[int(self.ev(proj.skip, {})):]
+        if proj.limit is not None:
+            out = out[: int(self.ev(proj.limit, {}))]
+        return out
+
+    def run(self, clauses: List[tuple]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = [{}]
+        for clause in clauses:
+            kind = clause[0]
+            if kind == "match":
+                _, optional, parts, where = clause
+                next_rows = []
+                for row in rows:
+                    found = False
+                    for env in self.match(parts, row):
+                        if where is None or _truthy(self.ev(where, env)):
+                            found = True
+                            next_rows.append(env)
+                    if optional and not found:
+                        next_rows.append({**row, **{v: None for v in self.pattern_vars(parts) if v not in row}})
+                rows = next_rows
+            elif kind == "merge":
+                _, part, on_create, on_match = clause
+                next_rows = []
+                for row in rows:
+                    matches = [env for env, _ in self.match_part(part, row, set())]
+                    if matches:
+                        for env in matches:
+                            self.apply_set(on_match, env)
+                        next_rows.extend(matches)
+                    else:
+                        env = self.create_part(part, row)
+                        self.apply_set(on_create, env)
+                        next_rows.append(env)
+                rows = next_rows
+            elif kind == "create":
+                next_rows = []
+                for row in rows:
+                    env = row
+                    for part in clause[1]:
+                        env = self.create_part(part, env)
+                    next_rows.append(env)
+                rows = next_rows
+            elif kind == "set":
+                for row in rows:
+                    self.apply_set(clause[1], row)
+            elif kind == "delete":
+                _, detach, exprs = clause
+                for row in rows:
+                    for expr in exprs:
+                        target = self.ev(expr, row)
+                        if isinstance(target, Edge):
+                            self.store.delete_edge(target)
+                        elif isinstance(target, Node):
+                            self.store.delete_node(target, detach=detach)
+                        elif target is not None:
+                            raise CypherError("DELETE expects nodes or relationships")
+            elif kind == "unwind":
+                _, expr, var = clause
+                next_rows = []
+                for row in rows:
+                    value = self.ev(expr, row)
+                    if value is None:
+                        continue
+                    for item in value if isinstance(value, list) else [value]:
+                        next_rows.append({**row, var: item})
+                rows = next_rows
+            elif kind == "with":
+                proj: Projection = clause[1]
+                rows = [projected for projected, _ in self.project(proj, rows)]
+                if proj.where is not None:
+                    rows = [row for row in rows if _truthy(self.ev(proj.where, row))]
+            elif kind == "return":
+                return [{k: _to_output(v) for k, v in projected.items()} for projected, _ in self.project(clause[1], rows)]
+        return []
+
+
+# --- client ----------------------------------------------------------------------
+
+
+class InMemoryGraphClient(GraphClient):
+    """
+    GraphClient backed by an in-process property graph (see module docstring).
+
+    Useful for tests and benchmarks of repository logic without a graph server, and
+    for single-node deployments. Each statement (and each `run_transaction` batch) is
+    atomic: a failure rolls back its changes. With `snapshot_path` the graph is loaded
+    from that JSON file on first use and written back on `close()`.
+    """
+
+    def __init__(
+        self, *, snapshot_path: Optional[str] = None, instrumentation: Optional[QueryInstrumentation] = None
+    ) -> None:
+        super().__init__(instrumentation=instrumentation)
+        self.snapshot_path = snapshot_path
+        self._store = _Store()
+        self._loaded = False
+        self._stats: Dict[str, int] = {"statements": 0, "errors": 0}
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        for n in data.get("nodes", []):
+            self._store.create_node(n["labels"], n["props"], node_id=n["id"])
+        for e in data.get("edges", []):
+            start, end = self._store.nodes[e["start"]], self._store.nodes[e["end"]]
+            self._store.create_edge(e["type"], start, end, e["props"], edge_id=e["id"])
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        data = {
+            "nodes": [{"id": n.id, "labels": sorted(n.labels), "props": n.props} for n in self._store.nodes.values()],
+            "edges": [
+                {"id": e.id, "type": e.type, "start": e.start.id, "end": e.end.id, "props": e.props}
+                for e in self._store.edges.values()
+            ],
+        }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, default=str)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _execute(self, statements: Sequence[Statement]) -> List[List[Dict[str, Any]]]:
+        self._ensure_loaded()
+        self._store.undo = []
+        try:
+            results = []
+            for query, params in statements:
+                self._stats["statements"] += 1
+                results.append(_Executor(self._store, params or {}).run(_parse(query)))
+            return results
+        except Exception:
+            self._stats["errors"] += 1
+            undo, self._store.undo = self._store.undo, None
+            for fn in reversed(undo or []):
+                fn()
+            raise
+        finally:
+            self._store.undo = None
+
+    async def _run_cypher(
+        self, query: str, params: Optional[Dict[str, Any]] = None, *, idempotent: bool = False
+    ) -> List[Dict[str, Any]]:
+        # Runs synchronously on the event loop, so statements never interleave.
+        return self._execute([(query, params)])[0]
+
+    async def _run_transaction(
+        self, statements: Sequence[Statement], *, idempotent: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        return self._execute(statements)
+
+    async def init_schema(self) -> None:
+        self._ensure_loaded()
+
+    async def ensure_graph(self, graph_name: str) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "nodes": len(self._store.nodes),
+            "edges": len(self._store.edges),
+            **self._stats,
+        }
+
+    async def close(self) -> None:
+        if self._loaded:
+            self.save_snapshot()
@@ -39,6 +39,9 @@ class AnswerRecord:
     confidence: float
     timestamp: datetime
     source: str = "qa_tree"
+    tree_id: Optional[str] = None
+    # Stable id of the Answer node; replaying the same record merges onto it.
+    id: Optional[str] = None
 
 
 @dataclass
@@ -77,3 +80,8 @@ class RequiresSkillEdge:
 class ProgrammingLanguagePreference:
     kind: Literal["polyglot", "single_language", "unknown"]
     language_name: Optional[str] = None
+
+
+@dataclass
+class ProgrammingLanguagePreferenceBatch:
+    items: List[ProgrammingLanguagePreference]
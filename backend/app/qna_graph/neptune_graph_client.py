@@ -1,15 +1,46 @@
 from __future__ import annotations
 
-import json
-from typing import Any, Dict, List, Optional
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
 
 import aiohttp
 
-from .graph_client_base import GraphClient
+from .graph_client_base import GraphClient, Statement
+from .instrumentation import QueryInstrumentation
+
+# Rejections Neptune guarantees were not applied: throttling and optimistic-concurrency
+# conflicts between concurrent writers. Always safe to retry.
+_NOT_APPLIED_STATUSES = {429}
+_NOT_APPLIED_CODES = {"ThrottlingException", "ConcurrentModificationException"}
+# Transient failures where the statement may or may not have committed.
+_TRANSIENT_STATUSES = {500, 502, 503, 504}
+_TRANSIENT_CODES = {"TimeLimitExceededException"}
+_BOLT_TRANSIENT_ERRORS = {"ServiceUnavailable", "SessionExpired", "TransientError"}
+
+
+class NeptuneRetryableError(RuntimeError):
+    """A throttled or conflicting request Neptune did not apply; always retried."""
+
+
+class NeptuneTransientError(RuntimeError):
+    """A transient failure that may have been applied; retried only for idempotent statements."""
 
 
 class NeptuneGraphClient(GraphClient):
-    """Lightweight openCypher client for Amazon Neptune."""
+    """
+    openCypher client for Amazon Neptune over HTTPS (default) or Bolt.
+
+    HTTP requests share one keep-alive `TCPConnector` with a DNS cache; every request
+    has connect and total timeouts. Throttling and concurrent-modification errors
+    are retried up to `max_retries` times with full-jitter exponential backoff.
+    Timeouts, 5xx and dropped connections are retried only for statements run with
+    `idempotent=True`, since a non-idempotent write (`CREATE`) may have committed
+    before the error and would be applied twice. `use_bolt=True` switches to the `neo4j` driver (optional
+    dependency), which also gives `run_transaction` a real transaction.
+    """
 
     def __init__(
         self,
@@ -19,19 +50,67 @@ class NeptuneGraphClient(GraphClient):
         region: Optional[str],
         use_https: bool = True,
         use_bolt: bool = False,
+        pool_limit: int = 100,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        connect_timeout: float = 5.0,
+        request_timeout: float = 30.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 2.0,
+        instrumentation: Optional[QueryInstrumentation] = None,
     ) -> None:
+        super().__init__(instrumentation=instrumentation)
         self.endpoint = endpoint
         self.port = port or 8182
         self.region = region
         self.use_https = use_https
         self.use_bolt = use_bolt
+        self.pool_limit = pool_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        protocol = "https" if use_https else "http"
+        self.url = f"{protocol}://{endpoint}:{self.port}/openCypher"
         self._session: Optional[aiohttp.ClientSession] = None
+        self._driver: Any = None
+        self._latencies_ms: Deque[float] = deque(maxlen=1024)
+        self._stats: Dict[str, int] = {"requests": 0, "retries": 0, "errors": 0}
 
     async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None:
-            self._session = aiohttp.ClientSession()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout, sock_connect=self.connect_timeout),
+            )
         return self._session
 
+    def _get_driver(self) -> Any:
+        if self._driver is None:
+            try:
+                from neo4j import AsyncGraphDatabase
+            except ImportError as e:
+                raise RuntimeError("NEPTUNE_USE_BOLT requires the neo4j driver (pip install neo4j)") from e
+            scheme = "bolt+s" if self.use_https else "bolt"
+            self._driver = AsyncGraphDatabase.driver(
+                f"{scheme}://{self.endpoint}:{self.port}",
+                auth=None,
+                max_connection_pool_size=self.pool_limit,
+                connection_timeout=self.connect_timeout,
+                connection_acquisition_timeout=self.request_timeout,
+                max_connection_lifetime=self.keepalive_timeout * 10,
+            )
+        return self._driver
+
     async def init_schema(self) -> None:
         # Neptune is schema-less for openCypher; no-op placeholder.
         return None
@@ -40,26 +119,116 @@ class NeptuneGraphClient(GraphClient):
         # Neptune doesn't require explicit graph creation.
         return None
 
-    async def run_cypher(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        if not self.endpoint:
-            raise RuntimeError("NEPTUNE_ENDPOINT not configured")
+    def _is_retryable(self, exc: BaseException, idempotent: bool) -> bool:
+        if isinstance(exc, NeptuneRetryableError):
+            return True
+        if isinstance(exc, aiohttp.ClientConnectorError):
+            return True  # never reached the server
+        if self.use_bolt:
+            code = getattr(exc, "code", "") or ""
+            if any(c in code for c in _NOT_APPLIED_CODES):
+                return True
+            return idempotent and (
+                type(exc).__name__ in _BOLT_TRANSIENT_ERRORS or any(c in code for c in _TRANSIENT_CODES)
+            )
+        return idempotent and isinstance(
+            exc, (NeptuneTransientError, aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        )
 
-        protocol = "https" if self.use_https else "http"
-        url = f"{protocol}://{self.endpoint}:{self.port}/openCypher"
+    async def _with_retries(self, attempt_fn, *, idempotent: bool):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self._stats["requests"] += 1
+                result = await attempt_fn()
+                self._latencies_ms.append((time.perf_counter() - started) * 1000)
+                return result
+            except Exception as exc:
+                if attempt >= self.max_retries or not self._is_retryable(exc, idempotent):
+                    self._stats["errors"] += 1
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, delay))
 
+    async def _post(self, query: str, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
         session = await self._get_session()
-
         payload = {"query": query, "parameters": params or {}}
-
-        async with session.post(url, json=payload) as resp:
+        async with session.post(self.url, json=payload) as resp:
             if resp.status >= 400:
                 text = await resp.text()
+                code = ""
+                try:
+                    code = (await resp.json(content_type=None)).get("code", "")
+                except Exception:
+                    pass
+                if resp.status in _NOT_APPLIED_STATUSES or code in _NOT_APPLIED_CODES:
+                    raise NeptuneRetryableError(f"Neptune cypher error {resp.status}: {text}")
+                if resp.status in _TRANSIENT_STATUSES or code in _TRANSIENT_CODES:
+                    raise NeptuneTransientError(f"Neptune cypher error {resp.status}: {text}")
                 raise RuntimeError(f"Neptune cypher error {resp.status}: {text}")
             data = await resp.json()
             # Neptune returns results under "results"
             return data.get("results", data.get("data", []))
 
+    async def _bolt_run(self, statements: Sequence[Statement]) -> List[List[Dict[str, Any]]]:
+        driver = self._get_driver()
+        async with driver.session() as session:
+            tx = await session.begin_transaction()
+            try:
+                results = []
+                for query, params in statements:
+                    cursor = await tx.run(query, params or {})
+                    results.append([record.data() async for record in cursor])
+                await tx.commit()
+                return results
+            except Exception:
+                if not tx.closed():
+                    await tx.rollback()
+                raise
+
+    async def _run_cypher(
+        self, query: str, params: Optional[Dict[str, Any]] = None, *, idempotent: bool = False
+    ) -> List[Dict[str, Any]]:
+        if not self.endpoint:
+            raise RuntimeError("NEPTUNE_ENDPOINT not configured")
+        if self.use_bolt:
+            results = await self._with_retries(lambda: self._bolt_run([(query, params)]), idempotent=idempotent)
+            return results[0]
+        return await self._with_retries(lambda: self._post(query, params), idempotent=idempotent)
+
+    async def _run_transaction(
+        self, statements: Sequence[Statement], *, idempotent: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        if self.use_bolt:
+            if not self.endpoint:
+                raise RuntimeError("NEPTUNE_ENDPOINT not configured")
+            # The whole transaction is retried, so a conflict never leaves it half-applied.
+            return await self._with_retries(lambda: self._bolt_run(statements), idempotent=idempotent)
+        return await super()._run_transaction(statements, idempotent=idempotent)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies_ms)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2) if latencies else 0.0
+
+        return {
+            "backend": "neptune",
+            "transport": "bolt" if self.use_bolt else "https" if self.use_https else "http",
+            **self._stats,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "samples": len(latencies)},
+        }
+
+    def is_connection_error(self, exc: BaseException) -> bool:
+        return super().is_connection_error(exc) or isinstance(exc, aiohttp.ClientConnectionError)
+
     async def close(self) -> None:
         if self._session:
             await self._session.close()
             self._session = None
+        if self._driver is not None:
+            await self._driver.close()
+            self._driver = None
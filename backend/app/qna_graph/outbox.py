@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.database import SessionLocal
+from ..models.graph_outbox import GraphOutboxEntry, GraphOutboxLease
+from .models import AnswerRecord, HasTraitEdge
+from .repository import QnaGraphRepository
+
+KIND_ANSWER = "answer"
+_LEASE_NAME = "graph_outbox"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything stored here is UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _encode_answer(answer: AnswerRecord, traits: List[HasTraitEdge]) -> Dict[str, Any]:
+    data = asdict(answer)
+    data["timestamp"] = answer.timestamp.isoformat()
+    return {"answer": data, "traits": [asdict(t) for t in traits]}
+
+
+def _decode_answer(payload: Dict[str, Any]) -> Tuple[AnswerRecord, List[HasTraitEdge]]:
+    data = dict(payload["answer"])
+    data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return AnswerRecord(**data), [HasTraitEdge(**t) for t in payload.get("traits", [])]
+
+
+class GraphWriteBehind:
+    """
+    Durable write-behind queue for Q&A graph writes.
+
+    `enqueue_answer` stores the answer and its traits in the SQL `graph_outbox` table
+    and returns; a background task flushes due entries to the graph in batches. Entries
+    for one user are applied strictly in order: a failing entry blocks that user's later
+    entries until it succeeds or, after `max_attempts`, is parked with status "failed".
+    Retries back off exponentially up to `max_backoff_seconds`.
+
+    Every worker may enqueue and run `start()`, but only the holder of the
+    `graph_outbox_lease` row flushes. The lease lasts `lease_seconds` and is
+    renewed before each batch, so two workers never flush concurrently. If the
+    holder dies, another worker takes over once the lease expires. Entries are
+    retried after any failure, including after the write may already have been
+    applied; answers carry a stable id that the graph write merges on, so a
+    replay does not duplicate the `Answer`.
+    """
+
+    def __init__(
+        self,
+        repository: QnaGraphRepository,
+        *,
+        session_factory: sessionmaker = SessionLocal,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_attempts: int = 8,
+        max_backoff_seconds: float = 300.0,
+        lease_seconds: float = 30.0,
+    ) -> None:
+        self.repo = repository
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self.stats: Dict[str, int] = {"enqueued": 0, "flushed": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    # --- producer side ---
+
+    def _insert(self, kind: str, user_id: str, payload: Dict[str, Any]) -> None:
+        db: Session = self.session_factory()
+        try:
+            db.add(GraphOutboxEntry(kind=kind, user_id=user_id, payload=payload, status="pending", attempts=0))
+            db.commit()
+        finally:
+            db.close()
+
+    async def enqueue_answer(self, answer: AnswerRecord, traits: List[HasTraitEdge]) -> None:
+        await asyncio.to_thread(self._insert, KIND_ANSWER, answer.user_id, _encode_answer(answer, traits))
+        self.stats["enqueued"] += 1
+        self._wake.set()
+
+    # --- flusher ---
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, *, drain_timeout: float = 5.0) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Last best-effort flush so a clean shutdown leaves little behind.
+        try:
+            await asyncio.wait_for(self.flush_once(), timeout=drain_timeout)
+        except Exception as e:
+            print(f"[graph_outbox] drain on shutdown incomplete: {e}")
+        try:
+            await asyncio.to_thread(self._release_lease)
+        except Exception as e:
+            print(f"[graph_outbox] could not release the flush lease: {e}")
+
+    # --- lease ---
+
+    def _acquire_lease(self) -> bool:
+        """Take or renew the flush lease; False while another live worker holds it."""
+        now = _utcnow()
+        until = now + timedelta(seconds=self.lease_seconds)
+        db: Session = self.session_factory()
+        try:
+            renewed = (
+                db.query(GraphOutboxLease)
+                .filter(
+                    GraphOutboxLease.name == _LEASE_NAME,
+                    or_(GraphOutboxLease.owner == self.owner_id, GraphOutboxLease.expires_at <= now),
+                )
+                .update({"owner": self.owner_id, "expires_at": until}, synchronize_session=False)
+            )
+            if not renewed:
+                if db.get(GraphOutboxLease, _LEASE_NAME) is not None:
+                    db.rollback()
+                    return False
+                db.add(GraphOutboxLease(name=_LEASE_NAME, owner=self.owner_id, expires_at=until))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another worker created the row first
+                return False
+            return True
+        finally:
+            db.close()
+
+    def _release_lease(self) -> None:
+        db: Session = self.session_factory()
+        try:
+            db.query(GraphOutboxLease).filter(
+                GraphOutboxLease.name == _LEASE_NAME, GraphOutboxLease.owner == self.owner_id
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.is_leader = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                flushed = await self.flush_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[graph_outbox] flush failed: {e}")
+                flushed = 0
+            if flushed:
+                continue  # possibly more backlog waiting
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _load_pending(self) -> List[Dict[str, Any]]:
+        now = _utcnow()
+        db: Session = self.session_factory()
+        try:
+            # Users whose head entry is backing off: their later entries must wait too.
+            backing_off = (
+                db.query(GraphOutboxEntry.user_id)
+                .filter(GraphOutboxEntry.status == "pending", GraphOutboxEntry.next_attempt_at > now)
+                .distinct()
+            )
+            rows = (
+                db.query(GraphOutboxEntry)
+                .filter(
+                    GraphOutboxEntry.status == "pending",
+                    or_(GraphOutboxEntry.next_attempt_at.is_(None), GraphOutboxEntry.next_attempt_at <= now),
+                    GraphOutboxEntry.user_id.notin_(backing_off),
+                )
+                .order_by(GraphOutboxEntry.id.asc())
+                .limit(self.batch_size)
+                .all()
+            )
+            return [
+                {
+                    "id": r.id,
+                    "kind": r.kind,
+                    "user_id": r.user_id,
+                    "payload": r.payload,
+                    "attempts": r.attempts or 0,
+                    "next_attempt_at": r.next_attempt_at,
+                }
+                for r in rows
+            ]
+        finally:
+            db.close()
+
+    def _settle(self, done: List[int], failures: List[Tuple[int, int, str]]) -> None:
+        now = _utcnow()
+        db: Session = self.session_factory()
+        try:
+            if done:
+                db.query(GraphOutboxEntry).filter(GraphOutboxEntry.id.in_(done)).delete(synchronize_session=False)
+            for entry_id, attempts, error in failures:
+                row = db.get(GraphOutboxEntry, entry_id)
+                if row is None:
+                    continue
+                row.attempts = attempts
+                row.last_error = error[:2000]
+                if attempts >= self.max_attempts:
+                    row.status = "failed"
+                else:
+                    backoff = min(self.max_backoff_seconds, 2 ** (attempts - 1))
+                    row.next_attempt_at = now + timedelta(seconds=backoff)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _is_due(entry: Dict[str, Any], now: datetime) -> bool:
+        due = entry["next_attempt_at"]
+        return due is None or _as_utc(due) <= now
+
+    async def _apply(self, entry: Dict[str, Any]) -> None:
+        if entry["kind"] == KIND_ANSWER:
+            answer, traits = _decode_answer(entry["payload"])
+            if answer.id is None:
+                # Keyed by the outbox row, so a retry of this entry merges onto the same Answer.
+                answer = replace(answer, id=f"outbox-{entry['id']}")
+            await self.repo.record_answer(answer, traits)
+        else:
+            raise ValueError(f"unknown outbox entry kind: {entry['kind']}")
+
+    async def _flush_user(self, entries: List[Dict[str, Any]], now: datetime) -> Tuple[List[int], Optional[Tuple[int, int, str]]]:
+        done: List[int] = []
+        for entry in entries:
+            if not self._is_due(entry, now):
+                break
+            try:
+                await self._apply(entry)
+            except Exception as e:
+                return done, (entry["id"], entry["attempts"] + 1, str(e))
+            done.append(entry["id"])
+        return done, None
+
+    async def flush_once(self) -> int:
+        """
+        Apply one batch of due entries. Returns how many were applied or failed,
+        or 0 once the batch covered everything pending.
+        """
+        self.is_leader = await asyncio.to_thread(self._acquire_lease)
+        if not self.is_leader:
+            return 0
+        pending = await asyncio.to_thread(self._load_pending)
+        if not pending:
+            return 0
+        now = _utcnow()
+        per_user: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for entry in pending:
+            per_user.setdefault(entry["user_id"], []).append(entry)
+
+        results = await asyncio.gather(*(self._flush_user(entries, now) for entries in per_user.values()))
+        done = [entry_id for ids, _ in results for entry_id in ids]
+        failures = [failure for _, failure in results if failure is not None]
+        await asyncio.to_thread(self._settle, done, failures)
+
+        self.stats["batches"] += 1
+        self.stats["flushed"] += len(done)
+        self.stats["retried"] += sum(1 for _, attempts, _ in failures if attempts < self.max_attempts)
+        self.stats["failed"] += sum(1 for _, attempts, _ in failures if attempts >= self.max_attempts)
+        if len(pending) < self.batch_size:
+            return 0  # nothing beyond this batch; wait for new entries
+        return len(done) + len(failures)
+
+    def _count_by_status(self) -> Dict[str, int]:
+        db: Session = self.session_factory()
+        try:
+            pending = db.query(GraphOutboxEntry).filter(GraphOutboxEntry.status == "pending").count()
+            failed = db.query(GraphOutboxEntry).filter(GraphOutboxEntry.status == "failed").count()
+            return {"pending": pending, "failed": failed}
+        finally:
+            db.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"running": self._task is not None, "leader": self.is_leader, "counters": dict(self.stats), "queue": self._count_by_status()}
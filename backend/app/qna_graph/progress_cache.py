@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from .models import AnswerRecord, HasTraitEdge
+
+_MISSING = object()
+
+
+class _LruTtl:
+    """Small LRU map whose entries also expire `ttl_seconds` after being stored."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        stored_at, value = item
+        if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def pop_user(self, user_id: str) -> None:
+        for key in [k for k in self._data if k == user_id or (isinstance(k, tuple) and k[0] == user_id)]:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ProgressCache:
+    """
+    Per-user Q&A progress kept in process: the last answer and answered question ids
+    per (user, tree), and the user's traits.
+
+    `QnaService.record_answer` writes through, so lookups after a turn never need the
+    graph. Entries are bounded (LRU) and expire after `ttl_seconds`, which also bounds
+    staleness when another worker records answers without a cross-worker invalidation
+    hook configured.
+    """
+
+    def __init__(self, *, max_entries: int = 10_000, ttl_seconds: float = 300.0) -> None:
+        self._last = _LruTtl(max_entries, ttl_seconds)
+        self._answered = _LruTtl(max_entries, ttl_seconds)
+        self._traits = _LruTtl(max_entries, ttl_seconds)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _lookup(self, store: _LruTtl, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            value = store.get(key)
+            found = value is not _MISSING
+            self.stats["hits" if found else "misses"] += 1
+        return found, (value if found else None)
+
+    def lookup_last_answer(self, user_id: str, tree_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        return self._lookup(self._last, (user_id, tree_id))
+
+    def store_last_answer(self, user_id: str, tree_id: str, last: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._last.set((user_id, tree_id), last)
+
+    def lookup_answered(self, user_id: str, tree_id: str) -> Tuple[bool, Optional[Set[str]]]:
+        return self._lookup(self._answered, (user_id, tree_id))
+
+    def store_answered(self, user_id: str, tree_id: str, question_ids: List[str]) -> None:
+        with self._lock:
+            self._answered.set((user_id, tree_id), set(question_ids))
+
+    def lookup_traits(self, user_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        return self._lookup(self._traits, user_id)
+
+    def store_traits(self, user_id: str, traits: Dict[str, Any]) -> None:
+        with self._lock:
+            self._traits.set(user_id, traits)
+
+    def apply_answer(self, tree_id: str, answer: AnswerRecord, traits: List[HasTraitEdge]) -> None:
+        """Write-through after an answer is recorded (mirrors the graph MERGE semantics)."""
+        with self._lock:
+            self._last.set(
+                (answer.user_id, tree_id),
+                {
+                    "question_id": answer.question_id,
+                    "normalized_value": answer.normalized_value,
+                    "ts": answer.timestamp.isoformat(),
+                },
+            )
+            # Answered ids and traits are only extended when already loaded; a partial
+            # set would otherwise be mistaken for the full one.
+            answered = self._answered.get((answer.user_id, tree_id))
+            if answered is not _MISSING:
+                answered.add(answer.question_id)
+            for trait in traits:
+                cached = self._traits.get(trait.user_id)
+                if cached is _MISSING:
+                    continue
+                rows = cached.setdefault(trait.attribute, [])
+                row = next(
+                    (
+                        r
+                        for r in rows
+                        if r.get("normalized_value") == trait.normalized_value
+                        and r.get("concept_type") == trait.concept_type
+                        and r.get("concept_key") == trait.concept_key
+                    ),
+                    None,
+                )
+                if row is None:
+                    row = {
+                        "attribute": trait.attribute,
+                        "normalized_value": trait.normalized_value,
+                        "concept_key": trait.concept_key,
+                        "concept_type": trait.concept_type,
+                    }
+                    rows.append(row)
+                row["strength"] = trait.strength
+                row["confidence"] = trait.confidence
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop everything cached for a user (e.g. on a notification from another worker)."""
+        with self._lock:
+            self._last.pop_user(user_id)
+            self._answered.pop_user(user_id)
+            self._traits.pop_user(user_id)
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": {"last_answer": len(self._last), "answered": len(self._answered), "traits": len(self._traits)},
+            }
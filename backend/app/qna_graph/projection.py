@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.database import SessionLocal
+from ..models.trait_vector import TraitVector, TraitVectorEdge
+from .graph_client_base import GraphClient
+from .models import HasTraitEdge, RequiresSkillEdge
+from .scoring import GraphMatchScore
+
+# (attribute, concept, value) where concept is "<type>:<key>".
+Entry = Tuple[str, str, float]
+# (user_id, edge_key, attribute, concept, value, updated_at)
+EdgeRow = Tuple[str, str, str, str, float, datetime]
+
+# Rows per upsert statement; keeps SQLite under its bound-parameter limit.
+_EDGE_UPSERT_CHUNK = 500
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything stored here is UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _concept(concept_type: str, concept_key: str) -> str:
+    return f"{concept_type}:{concept_key}"
+
+
+def _edge_key(trait: HasTraitEdge) -> str:
+    # Same identity as the HAS_TRAIT MERGE: (attribute, normalized_value, concept).
+    return "|".join((trait.attribute, trait.normalized_value, _concept(trait.concept_type, trait.concept_key)))
+
+
+class TraitProjection:
+    """
+    In-process projection of HAS_TRAIT / REQUIRES_SKILL edges into sparse vectors.
+
+    Each user is a concept -> sum(strength * confidence) vector; each job is a list of
+    (attribute, concept, weight) requirements. Inverted concept indexes let one job be
+    scored against every user (or one user against every job) as a sparse dot product,
+    giving the same totals and per-attribute breakdown as the Cypher in `scoring.py`.
+
+    User vectors are persisted one edge per row (`trait_vector_edges`), upserted in a
+    single statement per batch of traits, so workers writing the same user never
+    overwrite each other's edges; job vectors are stored whole in `trait_vectors`.
+    Other workers pick up changed rows on `refresh()`, at most every
+    `refresh_seconds`. `rebuild_from_graph` backfills the projection from existing edges.
+    """
+
+    def __init__(self, *, session_factory: sessionmaker = SessionLocal, refresh_seconds: float = 5.0) -> None:
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._user_edges: Dict[str, Dict[str, Entry]] = {}
+        self._user_concepts: Dict[str, Dict[str, float]] = {}
+        self._concept_users: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._job_requirements: Dict[str, List[Entry]] = {}
+        self._concept_jobs: Dict[str, Dict[str, List[Tuple[str, float]]]] = defaultdict(dict)
+        self._loaded_until: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    # --- in-memory index maintenance ---
+
+    def _set_user(self, user_id: str, edges: Dict[str, Entry]) -> None:
+        for concept in self._user_concepts.pop(user_id, {}):
+            self._concept_users[concept].pop(user_id, None)
+        concepts: Dict[str, float] = defaultdict(float)
+        for _, concept, value in edges.values():
+            concepts[concept] += value
+        self._user_edges[user_id] = edges
+        self._user_concepts[user_id] = dict(concepts)
+        for concept, value in concepts.items():
+            self._concept_users[concept][user_id] = value
+
+    def _set_job(self, job_id: str, requirements: List[Entry]) -> None:
+        for _, concept, _ in self._job_requirements.pop(job_id, []):
+            self._concept_jobs[concept].pop(job_id, None)
+        self._job_requirements[job_id] = requirements
+        for attribute, concept, weight in requirements:
+            self._concept_jobs[concept].setdefault(job_id, []).append((attribute, weight))
+
+    # --- persistence ---
+
+    def _save(self, kind: str, subject_id: str, vector: Dict[str, Any]) -> None:
+        db: Session = self.session_factory()
+        try:
+            row = db.get(TraitVector, f"{kind}:{subject_id}") or TraitVector(
+                id=f"{kind}:{subject_id}", kind=kind, subject_id=subject_id
+            )
+            row.vector = vector
+            row.updated_at = _utcnow()
+            db.add(row)
+            db.commit()
+        finally:
+            db.close()
+
+    def _save_edges(self, rows: List[Dict[str, Any]]) -> None:
+        db: Session = self.session_factory()
+        try:
+            insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+            for start in range(0, len(rows), _EDGE_UPSERT_CHUNK):
+                chunk = rows[start : start + _EDGE_UPSERT_CHUNK]
+                if insert is None:
+                    for row in chunk:
+                        db.merge(TraitVectorEdge(**row))
+                    continue
+                stmt = insert(TraitVectorEdge).values(chunk)
+                # The graph SETs an edge's strength/confidence, so the row takes the new value.
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[TraitVectorEdge.user_id, TraitVectorEdge.edge_key],
+                        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+                    )
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _load_changed(
+        self, since: Optional[datetime]
+    ) -> Tuple[List[Tuple[str, str, Dict[str, Any], datetime]], List[EdgeRow]]:
+        db: Session = self.session_factory()
+        try:
+            vectors = db.query(TraitVector)
+            edges = db.query(TraitVectorEdge)
+            if since is not None:
+                # Small overlap so rows committed within the same clock tick are not missed.
+                vectors = vectors.filter(TraitVector.updated_at >= since - timedelta(seconds=1))
+                edges = edges.filter(TraitVectorEdge.updated_at >= since - timedelta(seconds=1))
+            return (
+                [(r.kind, r.subject_id, r.vector or {}, r.updated_at) for r in vectors.all()],
+                [(r.user_id, r.edge_key, r.attribute, r.concept, r.value, r.updated_at) for r in edges.all()],
+            )
+        finally:
+            db.close()
+
+    def _apply_row(self, kind: str, subject_id: str, vector: Dict[str, Any]) -> None:
+        if kind == "job":
+            self._set_job(subject_id, [(a, c, float(w)) for a, c, w in vector.get("requirements") or []])
+
+    async def refresh(self, *, force: bool = False) -> None:
+        """Load vectors written by other workers since the last refresh."""
+        if not force and time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        async with self._refresh_lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_seconds:
+                return
+            vectors, edges = await asyncio.to_thread(self._load_changed, self._loaded_until)
+            for kind, subject_id, vector, _ in vectors:
+                self._apply_row(kind, subject_id, vector)
+            self._merge_edges((user_id, key, (attr, concept, value)) for user_id, key, attr, concept, value, _ in edges)
+            for updated_at in [row[-1] for row in vectors] + [row[-1] for row in edges]:
+                if updated_at is not None:
+                    updated_at = _as_utc(updated_at)
+                    if self._loaded_until is None or updated_at > self._loaded_until:
+                        self._loaded_until = updated_at
+            self._last_refresh = time.monotonic()
+
+    def _merge_edges(self, edges: Iterable[Tuple[str, str, Entry]]) -> None:
+        touched: Dict[str, Dict[str, Entry]] = {}
+        for user_id, key, entry in edges:
+            touched.setdefault(user_id, dict(self._user_edges.get(user_id, {})))[key] = entry
+        for user_id, merged in touched.items():
+            self._set_user(user_id, merged)
+
+    # --- writers ---
+
+    async def apply_traits(self, traits: Iterable[HasTraitEdge]) -> None:
+        """Fold newly written HAS_TRAIT edges into their users' vectors."""
+        edges: Dict[Tuple[str, str], Entry] = {}
+        for trait in traits:
+            edges[(trait.user_id, _edge_key(trait))] = (
+                trait.attribute,
+                _concept(trait.concept_type, trait.concept_key),
+                float(trait.strength) * float(trait.confidence),
+            )
+        if not edges:
+            return
+        now = _utcnow()
+        rows = [
+            {"user_id": user_id, "edge_key": key, "attribute": attr, "concept": concept, "value": value, "updated_at": now}
+            for (user_id, key), (attr, concept, value) in edges.items()
+        ]
+        await asyncio.to_thread(self._save_edges, rows)
+        self._merge_edges((user_id, key, entry) for (user_id, key), entry in edges.items())
+
+    async def set_job_requirements(self, job_id: str, requirements: Iterable[RequiresSkillEdge]) -> None:
+        """Replace a job's REQUIRES_SKILL profile."""
+        entries = [(r.attribute, _concept(r.concept_type, r.concept_key), float(r.weight)) for r in requirements]
+        self._set_job(job_id, entries)
+        await asyncio.to_thread(self._save, "job", job_id, {"requirements": [list(e) for e in entries]})
+
+    async def rebuild_from_graph(self, graph_client: GraphClient) -> None:
+        """Backfill every user and job vector from the graph's current edges."""
+        traits = await graph_client.run_cypher(
+            """
+            MATCH (u:User)-[h:HAS_TRAIT]->(c:Concept)
+            RETURN u.id AS user_id, h.attribute AS attribute, h.normalized_value AS normalized_value,
+                   h.strength AS strength, h.confidence AS confidence, c.type AS concept_type, c.key AS concept_key
+            """,
+            idempotent=True,
+        )
+        await self.apply_traits(
+            HasTraitEdge(
+                user_id=str(r["user_id"]),
+                concept_type=r.get("concept_type") or "",
+                concept_key=r.get("concept_key") or "",
+                attribute=r.get("attribute") or "",
+                strength=float(r.get("strength") or 0.0),
+                confidence=float(r.get("confidence") or 0.0),
+                normalized_value=r.get("normalized_value") or "",
+            )
+            for r in traits
+            if r.get("user_id") is not None
+        )
+        requirements = await graph_client.run_cypher(
+            """
+            MATCH (j:Job)-[req:REQUIRES_SKILL]->(c:Concept)
+            RETURN j.id AS job_id, req.attribute AS attribute, req.weight AS weight, req.required AS required,
+                   c.type AS concept_type, c.key AS concept_key
+            """,
+            idempotent=True,
+        )
+        per_job: Dict[str, List[RequiresSkillEdge]] = defaultdict(list)
+        for r in requirements:
+            if r.get("job_id") is None:
+                continue
+            per_job[str(r["job_id"])].append(
+                RequiresSkillEdge(
+                    job_id=str(r["job_id"]),
+                    concept_type=r.get("concept_type") or "",
+                    concept_key=r.get("concept_key") or "",
+                    attribute=r.get("attribute") or "",
+                    weight=float(r.get("weight") or 0.0),
+                    required=bool(r.get("required")),
+                )
+            )
+        for job_id, reqs in per_job.items():
+            await self.set_job_requirements(job_id, reqs)
+
+    # --- scoring ---
+
+    @staticmethod
+    def _to_scores(acc: Dict[str, Dict[str, float]], allowed: Optional[Sequence[str]]) -> List[GraphMatchScore]:
+        allowed_set = set(allowed) if allowed is not None else None
+        scores = [
+            GraphMatchScore(
+                subject_id=subject_id,
+                score=sum(per_attr.values()),
+                breakdown=[{"attribute": attr, "score": value} for attr, value in per_attr.items()],
+            )
+            for subject_id, per_attr in acc.items()
+            if allowed_set is None or subject_id in allowed_set
+        ]
+        scores.sort(key=lambda s: s.score, reverse=True)
+        return scores
+
+    def score_users_for_job(self, job_id: str, user_ids: Optional[Sequence[str]] = None) -> List[GraphMatchScore]:
+        acc: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for attribute, concept, weight in self._job_requirements.get(job_id, []):
+            for user_id, value in self._concept_users.get(concept, {}).items():
+                acc[user_id][attribute] += weight * value
+        return self._to_scores(acc, user_ids)
+
+    def score_jobs_for_user(self, user_id: str, job_ids: Optional[Sequence[str]] = None) -> List[GraphMatchScore]:
+        acc: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for concept, value in self._user_concepts.get(user_id, {}).items():
+            for job_id, requirements in self._concept_jobs.get(concept, {}).items():
+                for attribute, weight in requirements:
+                    acc[job_id][attribute] += weight * value
+        return self._to_scores(acc, job_ids)
+
+    async def iter_users_for_job(
+        self, job_id: str, user_ids: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[List[GraphMatchScore]]:
+        """Drop-in for `scoring.iter_users_for_job` (a single batch)."""
+        await self.refresh()
+        yield self.score_users_for_job(job_id, user_ids)
+
+    async def iter_jobs_for_user(
+        self, user_id: str, job_ids: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[List[GraphMatchScore]]:
+        """Drop-in for `scoring.iter_jobs_for_user` (a single batch)."""
+        await self.refresh()
+        yield self.score_jobs_for_user(user_id, job_ids)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._user_concepts),
+            "jobs": len(self._job_requirements),
+            "concepts": sum(1 for users in self._concept_users.values() if users),
+        }
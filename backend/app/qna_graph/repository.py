@@ -1,41 +1,167 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
 
-from .graph_client_base import GraphClient
+from .graph_client_base import GraphClient, Statement
 from .models import AnswerRecord, HasTraitEdge, QTreeDefinition, QuestionNode
 
 
+def _chunks(rows: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(rows), max(size, 1)):
+        yield rows[i : i + size]
+
+
+# Labels that get explicit indexes on backends that need them (AGE).
+VERTEX_LABELS = ("User", "Question", "QTree", "Concept", "Answer")
+EDGE_LABELS = ("GAVE_ANSWER", "ABOUT", "LAST_ANSWER", "HAS_TRAIT", "HAS_QUESTION", "NEXT")
+
+
+_RECORD_ANSWER_CYPHER = """
+MERGE (u:User {{id:$user_id}})
+MERGE (q:Question {{id:$question_id, tree_id:$tree_id}})
+MERGE (a:Answer {{id:$answer_id}})
+SET a.question_id=$question_id, a.raw_text=$raw_text, a.normalized_value=$normalized_value,
+    a.confidence=$confidence, a.timestamp=$timestamp, a.source=$source
+MERGE (u)-[:GAVE_ANSWER]->(a)
+MERGE (a)-[:ABOUT]->(q)
+{last_answer}
+WITH a
+UNWIND $traits AS t
+MERGE (tu:User {{id:t.user_id}})
+MERGE (c:Concept {{type:t.concept_type, key:t.concept_key}})
+MERGE (tu)-[h:HAS_TRAIT {{attribute:t.attribute, normalized_value:t.normalized_value}}]->(c)
+SET h.strength=t.strength, h.confidence=t.confidence
+"""
+
+# Keeps exactly one LAST_ANSWER edge per (user, tree) so the latest answer is a
+# single hop instead of a sort over every answer.
+_LAST_ANSWER_CYPHER = """
+WITH u, a
+OPTIONAL MATCH (u)-[old:LAST_ANSWER {tree_id:$tree_id}]->(:Answer)
+DELETE old
+WITH DISTINCT u, a
+MERGE (u)-[:LAST_ANSWER {tree_id:$tree_id}]->(a)
+"""
+
+
+# User nodes are only created by `record_answer`, so no row means no answers at all
+# and a row of nulls means answers without a pointer for this tree.
+_LAST_ANSWER_QUERY = """
+MATCH (u:User {id:$user_id})
+OPTIONAL MATCH (u)-[:LAST_ANSWER {tree_id:$tree_id}]->(a:Answer)
+RETURN a.question_id AS question_id, a.normalized_value AS normalized_value, a.timestamp AS ts
+"""
+
+_LAST_ANSWER_FALLBACK_QUERY = """
+MATCH (u:User {id:$user_id})-[:GAVE_ANSWER]->(a:Answer)-[:ABOUT]->(q:Question {tree_id:$tree_id})
+RETURN a.question_id AS question_id, a.normalized_value AS normalized_value, a.timestamp AS ts
+ORDER BY a.timestamp DESC
+LIMIT 1
+"""
+
+_ANSWERED_QUERY = """
+MATCH (u:User {id:$user_id})-[:GAVE_ANSWER]->(a:Answer)-[:ABOUT]->(q:Question {tree_id:$tree_id})
+RETURN DISTINCT q.id AS id
+"""
+
+_TRAITS_QUERY = """
+MATCH (u:User {id:$user_id})-[h:HAS_TRAIT]->(c:Concept)
+RETURN h.attribute AS attribute, h.normalized_value AS normalized_value, h.strength AS strength, h.confidence AS confidence, c.key AS concept_key, c.type AS concept_type
+"""
+
+
+def _answered_ids(rows: List[Dict[str, Any]]) -> List[str]:
+    return [r.get("id") for r in rows if r.get("id") is not None]
+
+
+def _group_traits(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    traits: Dict[str, Any] = {}
+    for row in rows:
+        attr = row.get("attribute")
+        if not attr:
+            continue
+        traits.setdefault(attr, []).append(row)
+    return traits
+
+
 class QnaGraphRepository:
     """Repository for Q&A graph persistence and queries."""
 
-    def __init__(self, graph_client: GraphClient, graph_name: str) -> None:
+    def __init__(self, graph_client: GraphClient, graph_name: str, *, upsert_chunk_size: int = 500) -> None:
         self.client = graph_client
         self.graph_name = graph_name
+        self.upsert_chunk_size = upsert_chunk_size
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
 
     async def init_graph_schema(self) -> None:
         await self.client.ensure_graph(self.graph_name)
         await self.client.init_schema()
-        # Minimal indexes could be added here for AGE. Using MERGE-based patterns keeps things idempotent.
-
-    async def upsert_qtree(self, tree: QTreeDefinition) -> None:
-        await self.init_graph_schema()
-
-        for q in tree.questions.values():
-            cypher = """
-            MERGE (t:QTree {tree_id: $tree_id, user_type: $user_type})
-            SET t.namespace=$namespace, t.version=$version
-            MERGE (q:Question {id: $id, tree_id: $tree_id})
-            SET q.user_type=$user_type, q.text=$text, q.attribute=$attribute,
-                q.qtype=$qtype, q.namespace=$namespace, q.end_of_tree=$end_of_tree,
-                q.generation_prompt=$generation_prompt
-            MERGE (t)-[:HAS_QUESTION]->(q)
-            """
-            params = {
-                "tree_id": tree.tree_id,
-                "user_type": tree.user_type,
-                "namespace": tree.namespace,
-                "version": tree.version,
+        await self.client.ensure_indexes(VERTEX_LABELS, EDGE_LABELS)
+
+    async def ensure_schema(self) -> None:
+        """Run `init_graph_schema` once per process; later calls return immediately."""
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if not self._schema_ready:
+                await self.init_graph_schema()
+                self._schema_ready = True
+
+    def _note_failure(self, exc: BaseException) -> None:
+        # After a lost connection (or dropped graph) re-check the schema on the next write.
+        if self.client.is_connection_error(exc):
+            self._schema_ready = False
+
+    def _count(self, op: str, *, round_trips: int, **extra: int) -> None:
+        counts = self._stats.setdefault(op, {"writes": 0, "round_trips": 0})
+        counts["writes"] += 1
+        counts["round_trips"] += round_trips
+        for key, value in extra.items():
+            counts[key] = counts.get(key, 0) + value
+
+    def stats(self) -> Dict[str, Any]:
+        """Write counters per operation, with average graph round-trips per write."""
+        ops = {op: dict(counts) for op, counts in self._stats.items()}
+        for counts in ops.values():
+            counts["round_trips_per_write"] = round(counts["round_trips"] / counts["writes"], 2) if counts["writes"] else 0.0
+        return {"graph_name": self.graph_name, "operations": ops}
+
+    async def get_qtree_hash(self, tree_id: str, user_type: str) -> Optional[str]:
+        """Content hash stored by the last `upsert_qtree`, if any."""
+        await self.ensure_schema()
+        rows = await self.client.run_cypher(
+            "MATCH (t:QTree {tree_id: $tree_id, user_type: $user_type}) RETURN t.content_hash AS content_hash",
+            {"tree_id": tree_id, "user_type": user_type},
+            idempotent=True,
+        )
+        return rows[0].get("content_hash") if rows else None
+
+    async def upsert_qtree(self, tree: QTreeDefinition, *, content_hash: Optional[str] = None) -> None:
+        await self.ensure_schema()
+        try:
+            await self._upsert_qtree(tree, content_hash)
+        except Exception as exc:
+            self._note_failure(exc)
+            raise
+
+    async def _upsert_qtree(self, tree: QTreeDefinition, content_hash: Optional[str] = None) -> None:
+        """
+        Upsert the tree node, all questions and all NEXT edges in a handful of
+        UNWIND statements (chunked by `upsert_chunk_size`) inside one transaction.
+        """
+        tree_params = {
+            "tree_id": tree.tree_id,
+            "user_type": tree.user_type,
+            "namespace": tree.namespace,
+            "version": tree.version,
+            "content_hash": content_hash,
+        }
+        question_rows = [
+            {
                 "id": q.id,
                 "text": q.text,
                 "attribute": q.attribute,
@@ -43,39 +169,68 @@ class QnaGraphRepository:
                 "end_of_tree": q.end_of_tree,
                 "generation_prompt": q.generation_prompt,
             }
-            await self.client.run_cypher(cypher, params)
-
-            # Follow-ups
-            for value, next_id in (q.follow_ups or {}).items():
-                cypher_fu = """
-                MATCH (q1:Question {id:$qid, tree_id:$tree_id})
-                MATCH (q2:Question {id:$next_id, tree_id:$tree_id})
-                MERGE (q1)-[r:NEXT {value:$value}]->(q2)
+            for q in tree.questions.values()
+        ]
+        edge_rows = [
+            {"qid": q.id, "next_id": next_id, "value": value}
+            for q in tree.questions.values()
+            for value, next_id in (q.follow_ups or {}).items()
+        ]
+
+        statements: List[Statement] = [
+            (
                 """
-                await self.client.run_cypher(
-                    cypher_fu,
-                    {"qid": q.id, "tree_id": tree.tree_id, "next_id": next_id, "value": value},
-                )
+                MERGE (t:QTree {tree_id: $tree_id, user_type: $user_type})
+                SET t.namespace=$namespace, t.version=$version, t.content_hash=$content_hash
+                """,
+                tree_params,
+            )
+        ]
+        cypher_questions = """
+        MATCH (t:QTree {tree_id: $tree_id, user_type: $user_type})
+        UNWIND $rows AS r
+        MERGE (q:Question {id: r.id, tree_id: $tree_id})
+        SET q.user_type=$user_type, q.text=r.text, q.attribute=r.attribute,
+            q.qtype=r.qtype, q.namespace=$namespace, q.end_of_tree=r.end_of_tree,
+            q.generation_prompt=r.generation_prompt
+        MERGE (t)-[:HAS_QUESTION]->(q)
+        """
+        for rows in _chunks(question_rows, self.upsert_chunk_size):
+            statements.append((cypher_questions, {**tree_params, "rows": rows}))
 
-    async def record_answer(self, answer: AnswerRecord, traits: List[HasTraitEdge]) -> None:
-        await self.init_graph_schema()
-        cypher = """
-        MERGE (u:User {id:$user_id})
-        MERGE (q:Question {id:$question_id})
-        CREATE (a:Answer {
-            question_id:$question_id,
-            raw_text:$raw_text,
-            normalized_value:$normalized_value,
-            confidence:$confidence,
-            timestamp:$timestamp,
-            source:$source
-        })
-        MERGE (u)-[:GAVE_ANSWER]->(a)
-        MERGE (a)-[:ABOUT]->(q)
+        # Follow-ups
+        cypher_edges = """
+        UNWIND $rows AS r
+        MATCH (q1:Question {id: r.qid, tree_id: $tree_id})
+        MATCH (q2:Question {id: r.next_id, tree_id: $tree_id})
+        MERGE (q1)-[:NEXT {value: r.value}]->(q2)
         """
+        for rows in _chunks(edge_rows, self.upsert_chunk_size):
+            statements.append((cypher_edges, {"tree_id": tree.tree_id, "rows": rows}))
+
+        # MERGE/SET only, so a retry after an ambiguous failure is harmless.
+        await self.client.run_transaction(statements, idempotent=True)
+        self._count("trees", round_trips=len(statements))
+
+    async def record_answer(self, answer: AnswerRecord, traits: List[HasTraitEdge]) -> None:
+        await self.ensure_schema()
+        try:
+            await self._record_answer(answer, traits)
+        except Exception as exc:
+            self._note_failure(exc)
+            raise
+
+    async def _record_answer(self, answer: AnswerRecord, traits: List[HasTraitEdge]) -> None:
+        if not answer.tree_id:
+            # Question ids repeat across trees; without the tree the MERGE would match all of them.
+            raise ValueError(f"answer to {answer.question_id} has no tree_id")
+        # Answer, its edges, the per-tree LAST_ANSWER pointer and every trait edge in one
+        # statement (one round-trip). The Answer is merged on its id, so a replay after
+        # a timeout or a crash before the outbox settles writes nothing new.
         await self.client.run_cypher(
-            cypher,
+            _RECORD_ANSWER_CYPHER.format(last_answer=_LAST_ANSWER_CYPHER),
             {
+                "answer_id": answer.id or uuid.uuid4().hex,
                 "user_id": answer.user_id,
                 "question_id": answer.question_id,
                 "raw_text": answer.raw_text,
@@ -83,60 +238,89 @@ class QnaGraphRepository:
                 "confidence": answer.confidence,
                 "timestamp": answer.timestamp.isoformat(),
                 "source": answer.source,
+                "tree_id": answer.tree_id,
+                "traits": [
+                    {
+                        "user_id": trait.user_id,
+                        "concept_type": trait.concept_type,
+                        "concept_key": trait.concept_key,
+                        "attribute": trait.attribute,
+                        "normalized_value": trait.normalized_value,
+                        "strength": trait.strength,
+                        "confidence": trait.confidence,
+                    }
+                    for trait in traits
+                ],
             },
+            idempotent=True,
         )
-
-        for trait in traits:
-            cypher_trait = """
-            MERGE (u:User {id:$user_id})
-            MERGE (c:Concept {type:$concept_type, key:$concept_key})
-            MERGE (u)-[h:HAS_TRAIT {attribute:$attribute, normalized_value:$normalized_value}]->(c)
-            SET h.strength=$strength, h.confidence=$confidence
-            """
-            await self.client.run_cypher(
-                cypher_trait,
-                {
-                    "user_id": trait.user_id,
-                    "concept_type": trait.concept_type,
-                    "concept_key": trait.concept_key,
-                    "attribute": trait.attribute,
-                    "normalized_value": trait.normalized_value,
-                    "strength": trait.strength,
-                    "confidence": trait.confidence,
-                },
-            )
+        self._count("answers", round_trips=1, traits=len(traits))
 
     async def get_last_answer(self, user_id: str, tree_id: str) -> Optional[Dict[str, Any]]:
-        cypher = """
-        MATCH (u:User {id:$user_id})-[:GAVE_ANSWER]->(a:Answer)-[:ABOUT]->(q:Question {tree_id:$tree_id})
-        RETURN a.question_id AS question_id, a.normalized_value AS normalized_value, a.timestamp AS ts
-        ORDER BY a.timestamp DESC
-        LIMIT 1
-        """
-        rows = await self.client.run_cypher(cypher, {"user_id": user_id, "tree_id": tree_id})
+        rows = await self.client.run_cypher(_LAST_ANSWER_QUERY, {"user_id": user_id, "tree_id": tree_id}, idempotent=True)
+        return await self._last_answer_from(rows, user_id, tree_id)
+
+    async def _last_answer_from(
+        self, rows: List[Dict[str, Any]], user_id: str, tree_id: str, *, has_answers: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        if rows and rows[0].get("question_id") is not None:
+            return rows[0]
+        if not rows or not has_answers:
+            return None
+        return await self._get_last_answer_by_timestamp(user_id, tree_id)
+
+    async def _get_last_answer_by_timestamp(self, user_id: str, tree_id: str) -> Optional[Dict[str, Any]]:
+        # Answers recorded before the LAST_ANSWER pointer existed.
+        rows = await self.client.run_cypher(
+            _LAST_ANSWER_FALLBACK_QUERY, {"user_id": user_id, "tree_id": tree_id}, idempotent=True
+        )
         return rows[0] if rows else None
 
     async def get_answered_question_ids(self, user_id: str, tree_id: str) -> List[str]:
-        cypher = """
-        MATCH (u:User {id:$user_id})-[:GAVE_ANSWER]->(a:Answer)-[:ABOUT]->(q:Question {tree_id:$tree_id})
-        RETURN DISTINCT q.id AS id
-        """
-        rows = await self.client.run_cypher(cypher, {"user_id": user_id, "tree_id": tree_id})
-        return [r.get("id") for r in rows if r.get("id") is not None]
+        rows = await self.client.run_cypher(_ANSWERED_QUERY, {"user_id": user_id, "tree_id": tree_id}, idempotent=True)
+        return _answered_ids(rows)
 
     async def get_user_traits(self, user_id: str) -> Dict[str, Any]:
-        cypher = """
-        MATCH (u:User {id:$user_id})-[h:HAS_TRAIT]->(c:Concept)
-        RETURN h.attribute AS attribute, h.normalized_value AS normalized_value, h.strength AS strength, h.confidence AS confidence, c.key AS concept_key, c.type AS concept_type
+        rows = await self.client.run_cypher(_TRAITS_QUERY, {"user_id": user_id}, idempotent=True)
+        return _group_traits(rows)
+
+    async def get_user_progress(
+        self,
+        user_id: str,
+        tree_id: str,
+        *,
+        last_answer: bool = True,
+        answered: bool = True,
+        traits: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Fetch the selected parts of a user's progress (`last_answer`, `answered` ids
+        for the tree, `traits`) with concurrent reads instead of one after another.
         """
-        rows = await self.client.run_cypher(cypher, {"user_id": user_id})
-        traits: Dict[str, Any] = {}
-        for row in rows:
-            attr = row.get("attribute")
-            if not attr:
-                continue
-            traits.setdefault(attr, []).append(row)
-        return traits
+        params = {"user_id": user_id, "tree_id": tree_id}
+        wanted = [
+            (name, query)
+            for name, query, enabled in (
+                ("last_answer", _LAST_ANSWER_QUERY, last_answer),
+                ("answered", _ANSWERED_QUERY, answered),
+                ("traits", _TRAITS_QUERY, traits),
+            )
+            if enabled
+        ]
+        results = await self.client.run_many([(query, params) for _, query in wanted])
+        rows_by_name = {name: rows for (name, _), rows in zip(wanted, results)}
+        progress: Dict[str, Any] = {}
+        if "last_answer" in rows_by_name:
+            # With no answered questions in this tree there is nothing for the fallback to find.
+            has_answers = bool(rows_by_name["answered"]) if "answered" in rows_by_name else True
+            progress["last_answer"] = await self._last_answer_from(
+                rows_by_name["last_answer"], user_id, tree_id, has_answers=has_answers
+            )
+        if "answered" in rows_by_name:
+            progress["answered"] = _answered_ids(rows_by_name["answered"])
+        if "traits" in rows_by_name:
+            progress["traits"] = _group_traits(rows_by_name["traits"])
+        return progress
 
     async def get_question(self, qid: str, tree: QTreeDefinition) -> Optional[QuestionNode]:
         return tree.questions.get(qid)
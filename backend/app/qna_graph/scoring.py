@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from .graph_client_base import GraphClient
 
 
+@dataclass
+class GraphMatchScore:
+    subject_id: str  # user id when ranking users for a job, job id when ranking jobs for a user
+    score: float
+    breakdown: List[Dict[str, Any]] = field(default_factory=list)
+
+
 async def compute_job_user_score(graph_client: GraphClient, job_id: str, user_id: str) -> Tuple[float, list[dict[str, Any]]]:
     query = """
     MATCH (j:Job {id:$job_id})-[req:REQUIRES_SKILL]->(c:Concept)<-[has:HAS_TRAIT]-(u:User {id:$user_id})
@@ -12,7 +21,7 @@ async def compute_job_user_score(graph_client: GraphClient, job_id: str, user_id
     WITH attr, sum(req.weight * has.strength * has.confidence) AS attr_score
     RETURN sum(attr_score) AS total_match_score, collect({attribute: attr, score: attr_score}) AS breakdown
     """
-    rows = await graph_client.run_cypher(query, {"job_id": job_id, "user_id": user_id})
+    rows = await graph_client.run_cypher(query, {"job_id": job_id, "user_id": user_id}, idempotent=True)
     if not rows:
         return 0.0, []
     row = rows[0]
@@ -28,5 +37,88 @@ async def explain_attribute(graph_client: GraphClient, user_id: str, attribute:
     RETURN q.id AS question_id, q.text AS question_text, a.raw_text AS raw_answer,
            h.normalized_value AS normalized_value, h.strength AS strength, h.confidence AS confidence
     """
-    rows = await graph_client.run_cypher(query, {"user_id": user_id, "attribute": attribute})
+    rows = await graph_client.run_cypher(query, {"user_id": user_id, "attribute": attribute}, idempotent=True)
     return rows or []
+
+
+# Same scoring as `compute_job_user_score`, grouped per counterpart so one traversal
+# scores many users (or jobs). `$ids` optionally restricts the counterpart set.
+_USERS_FOR_JOB = """
+MATCH (j:Job {id:$job_id})-[req:REQUIRES_SKILL]->(c:Concept)<-[has:HAS_TRAIT]-(u:User)
+WHERE $ids IS NULL OR u.id IN $ids
+WITH u.id AS subject_id, req.attribute AS attr, sum(req.weight * has.strength * has.confidence) AS attr_score
+RETURN subject_id, sum(attr_score) AS total_match_score, collect({attribute: attr, score: attr_score}) AS breakdown
+"""
+
+_JOBS_FOR_USER = """
+MATCH (u:User {id:$user_id})-[has:HAS_TRAIT]->(c:Concept)<-[req:REQUIRES_SKILL]-(j:Job)
+WHERE $ids IS NULL OR j.id IN $ids
+WITH j.id AS subject_id, req.attribute AS attr, sum(req.weight * has.strength * has.confidence) AS attr_score
+RETURN subject_id, sum(attr_score) AS total_match_score, collect({attribute: attr, score: attr_score}) AS breakdown
+"""
+
+
+async def _iter_scores(
+    graph_client: GraphClient,
+    query: str,
+    params: Dict[str, Any],
+    ids: Optional[Sequence[str]],
+    chunk_size: int,
+) -> AsyncIterator[List[GraphMatchScore]]:
+    # Without an explicit id list this is a single traversal; long id lists are split
+    # so each query (and each yielded batch) stays bounded.
+    id_chunks: List[Optional[List[str]]] = (
+        [None] if ids is None else [list(ids[i : i + chunk_size]) for i in range(0, len(ids), max(chunk_size, 1))]
+    )
+    for chunk in id_chunks:
+        rows = await graph_client.run_cypher(query, {**params, "ids": chunk}, idempotent=True)
+        batch = [
+            GraphMatchScore(
+                subject_id=str(row.get("subject_id")),
+                score=float(row.get("total_match_score") or 0.0),
+                breakdown=row.get("breakdown") or [],
+            )
+            for row in rows
+            if row.get("subject_id") is not None
+        ]
+        batch.sort(key=lambda s: s.score, reverse=True)
+        yield batch
+
+
+def iter_users_for_job(
+    graph_client: GraphClient,
+    job_id: str,
+    user_ids: Optional[Sequence[str]] = None,
+    *,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[GraphMatchScore]]:
+    """Score one job against many users, yielding batches of scores as they are computed."""
+    return _iter_scores(graph_client, _USERS_FOR_JOB, {"job_id": job_id}, user_ids, chunk_size)
+
+
+def iter_jobs_for_user(
+    graph_client: GraphClient,
+    user_id: str,
+    job_ids: Optional[Sequence[str]] = None,
+    *,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[GraphMatchScore]]:
+    """Score many jobs against one user, yielding batches of scores as they are computed."""
+    return _iter_scores(graph_client, _JOBS_FOR_USER, {"user_id": user_id}, job_ids, chunk_size)
+
+
+async def top_k_scores(batches: AsyncIterator[List[GraphMatchScore]], k: int) -> List[GraphMatchScore]:
+    """Highest `k` scores across all batches, best first, without keeping every score."""
+    if k <= 0:
+        return []
+    top: List[Tuple[float, int, GraphMatchScore]] = []
+    seq = 0
+    async for batch in batches:
+        for item in batch:
+            seq += 1
+            entry = (item.score, -seq, item)
+            if len(top) < k:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+    return [item for _, _, item in sorted(top, reverse=True)]
@@ -1,73 +1,88 @@
 from __future__ import annotations
 
-import asyncio
+import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
+from .compiled_tree import CompiledTree
 from .models import AnswerRecord, HasTraitEdge, QTreeDefinition, QuestionNode
+from .progress_cache import ProgressCache
 from .repository import QnaGraphRepository
-from .yaml_loader import QTreeValidationError, load_qtree_from_yaml
+from .tree_registry import TreeRegistry
+
+if TYPE_CHECKING:
+    from .outbox import GraphWriteBehind
+    from .projection import TraitProjection
+
+# Called with a user id after that user's progress changes, so other workers can
+# drop their cached copy (they apply it via `QnaService.invalidate_user`).
+InvalidationPublisher = Callable[[str], Awaitable[None]]
 
 
 class QnaService:
     """High-level Q&A orchestration on top of the graph repository."""
 
-    def __init__(self, repository: QnaGraphRepository) -> None:
+    def __init__(
+        self,
+        repository: QnaGraphRepository,
+        write_behind: Optional["GraphWriteBehind"] = None,
+        *,
+        progress_cache: Optional[ProgressCache] = None,
+        invalidation_publisher: Optional[InvalidationPublisher] = None,
+        projection: Optional["TraitProjection"] = None,
+        trees: Optional[TreeRegistry] = None,
+    ) -> None:
         self.repo = repository
-        self._trees: Dict[str, QTreeDefinition] = {}
-        self._lock = asyncio.Lock()
+        self.write_behind = write_behind
+        self.progress = progress_cache or ProgressCache()
+        self.invalidation_publisher = invalidation_publisher
+        self.projection = projection
+        self.trees = trees or TreeRegistry(repository)
 
     async def load_tree_from_file(self, path: str) -> QTreeDefinition:
-        tree = load_qtree_from_yaml(path)
-        async with self._lock:
-            self._trees[tree.tree_id] = tree
-        try:
-            await self.repo.upsert_qtree(tree)
-        except Exception:
-            # If graph persistence fails, keep the in-memory tree so Q&A can still run.
-            pass
-        return tree
-
-    async def preload_directory(self, config_dir: Path) -> List[QTreeDefinition]:
-        loaded: List[QTreeDefinition] = []
-        if not config_dir.exists():
-            return loaded
-        for yaml_file in config_dir.glob("*.yaml"):
-            loaded.append(await self.load_tree_from_file(str(yaml_file)))
-        return loaded
-
-    def get_tree(self, tree_id: str) -> Optional[QTreeDefinition]:
-        return self._trees.get(tree_id)
-
-    async def get_next_question_for_user(self, user_id: str, tree_id: str) -> Optional[QuestionNode]:
-        tree = self._trees.get(tree_id)
-        if not tree:
-            return None
+        # Graph upsert failures are logged by the registry; Q&A still runs from memory.
+        return (await self.trees.load_file(path)).definition
 
-        try:
-            last = await self.repo.get_last_answer(user_id, tree_id)
-        except Exception:
-            # On graph fetch errors, fall back to root question
-            return tree.questions.get(tree.root_question_id)
-        if not last:
-            return tree.questions.get(tree.root_question_id)
+    async def preload_directory(self, config_dir: Path, *, background_sync: bool = False) -> List[QTreeDefinition]:
+        loaded = await self.trees.load_directory(config_dir, background_sync=background_sync)
+        return [compiled.definition for compiled in loaded]
 
-        current_qid = last.get("question_id")
-        normalized_value = last.get("normalized_value")
-        current_q = tree.questions.get(current_qid)
-        if not current_q:
-            return tree.questions.get(tree.root_question_id)
+    def get_tree(self, tree_id: str, version: Optional[str] = None) -> Optional[QTreeDefinition]:
+        compiled = self.trees.get(tree_id, version)
+        return compiled.definition if compiled else None
 
-        if current_q.end_of_tree:
+    def get_compiled_tree(self, tree_id: str, version: Optional[str] = None) -> Optional[CompiledTree]:
+        """The tree at a session's pinned `version` while it is still kept, else the latest."""
+        return self.trees.get(tree_id, version)
+
+    async def get_next_question_for_user(
+        self, user_id: str, tree_id: str, version: Optional[str] = None
+    ) -> Optional[QuestionNode]:
+        tree = self.trees.get(tree_id, version)
+        if not tree:
             return None
 
-        follow = current_q.follow_ups or {}
-        next_id = follow.get(normalized_value) or follow.get("default")
-        if next_id:
-            return tree.questions.get(next_id)
-        # If no follow-up, we are at the end.
-        return None
+        found, last = self.progress.lookup_last_answer(user_id, tree_id)
+        if not found:
+            try:
+                # Cold cache: load the rest of the user's progress in the same round.
+                last = (await self.load_progress(user_id, tree_id))["last_answer"]
+            except Exception:
+                try:
+                    last = await self.repo.get_last_answer(user_id, tree_id)
+                except Exception:
+                    # On graph fetch errors, fall back to root question
+                    return tree.root
+                self.progress.store_last_answer(user_id, tree_id, last)
+        if not last:
+            return tree.root
+
+        current = tree.questions.get(last.get("question_id"))
+        if not current:
+            return tree.root
+        # None at end_of_tree or when no follow-up applies.
+        return current.next_question(last.get("normalized_value"))
 
     async def record_answer(
         self,
@@ -79,7 +94,11 @@ class QnaService:
         attributes: Dict[str, Any],
         confidence: float,
         traits: List[HasTraitEdge],
+        tree_id: Optional[str] = None,
     ) -> None:
+        tree_ids = [tree_id] if tree_id else [t.tree_id for t in self.trees.latest() if question.id in t.questions]
+        if len(tree_ids) != 1:
+            raise ValueError(f"question {question.id} is in {len(tree_ids)} trees; pass tree_id")
         answer = AnswerRecord(
             user_id=user_id,
             question_id=question.id,
@@ -88,8 +107,72 @@ class QnaService:
             attributes=attributes,
             confidence=confidence,
             timestamp=datetime.utcnow(),
+            tree_id=tree_ids[0],
+            id=uuid.uuid4().hex,
         )
-        await self.repo.record_answer(answer, traits)
+        if self.write_behind is not None:
+            # Acknowledge once the answer is durable in SQL; the graph write happens in the background.
+            await self.write_behind.enqueue_answer(answer, traits)
+        else:
+            await self.repo.record_answer(answer, traits)
+
+        for tid in tree_ids:
+            self.progress.apply_answer(tid, answer, traits)
+        if self.projection is not None and traits:
+            try:
+                await self.projection.apply_traits(traits)
+            except Exception as e:
+                print(f"[qna] trait projection update failed: {e}")
+        if self.invalidation_publisher is not None:
+            try:
+                await self.invalidation_publisher(user_id)
+            except Exception as e:
+                print(f"[qna] progress invalidation publish failed: {e}")
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Entry point for cross-worker invalidation messages."""
+        self.progress.invalidate_user(user_id)
+
+    async def load_progress(self, user_id: str, tree_id: str) -> Dict[str, Any]:
+        """
+        Return `last_answer`, `answered` ids and `traits` for a user, reading whatever
+        is not cached with concurrent graph reads, and cache the results.
+        """
+        found_last, last = self.progress.lookup_last_answer(user_id, tree_id)
+        found_answered, answered = self.progress.lookup_answered(user_id, tree_id)
+        found_traits, traits = self.progress.lookup_traits(user_id)
+        fetched: Dict[str, Any] = {}
+        if not (found_last and found_answered and found_traits):
+            fetched = await self.repo.get_user_progress(
+                user_id,
+                tree_id,
+                last_answer=not found_last,
+                answered=not found_answered,
+                traits=not found_traits,
+            )
+        if "last_answer" in fetched:
+            last = fetched["last_answer"]
+            self.progress.store_last_answer(user_id, tree_id, last)
+        if "answered" in fetched:
+            self.progress.store_answered(user_id, tree_id, fetched["answered"])
+            answered = fetched["answered"]
+        if "traits" in fetched:
+            traits = fetched["traits"]
+            self.progress.store_traits(user_id, traits)
+        return {"last_answer": last, "answered": sorted(answered or ()), "traits": traits or {}}
+
+    async def get_answered_question_ids(self, user_id: str, tree_id: str) -> List[str]:
+        found, answered = self.progress.lookup_answered(user_id, tree_id)
+        if found:
+            return sorted(answered or ())
+        ids = await self.repo.get_answered_question_ids(user_id, tree_id)
+        self.progress.store_answered(user_id, tree_id, ids)
+        return ids
 
     async def get_user_traits(self, user_id: str) -> Dict[str, Any]:
-        return await self.repo.get_user_traits(user_id)
+        found, traits = self.progress.lookup_traits(user_id)
+        if found:
+            return traits or {}
+        traits = await self.repo.get_user_traits(user_id)
+        self.progress.store_traits(user_id, traits)
+        return traits
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compiled_tree import CompiledTree, compile_qtree
+from .repository import QnaGraphRepository
+from .yaml_loader import parse_qtree_yaml
+
+# Bump when CompiledTree (or anything it holds) or the YAML parsing change shape, so
+# stale cache entries are ignored instead of unpickled into the wrong structure.
+_CACHE_FORMAT = 2
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class _LoadedFile:
+    __slots__ = ("path", "mtime_ns", "size", "compiled", "cached")
+
+    def __init__(self, path: Path, mtime_ns: int, size: int, compiled: CompiledTree, cached: bool) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.compiled = compiled
+        self.cached = cached
+
+
+class TreeRegistry:
+    """
+    Versioned registry of compiled Q&A trees, optionally hot-reloaded from YAML.
+
+    A tree's version is the hash of its YAML file. Loading a changed file compiles it
+    first and only then swaps it in, so a bad edit leaves the previous version live.
+    The last `keep_versions` versions of each tree stay resolvable, which lets a
+    conversation that started on an older version finish on it (see `get`).
+
+    The graph is upserted only when the stored `QTree.content_hash` differs from the
+    file's, so restarts with unchanged trees cost one read per tree. `start()` polls the
+    directory every `poll_interval` seconds using file mtimes and sizes.
+
+    Files are read and compiled in worker threads. With `cache_dir` set, compiled trees
+    are pickled there under their content hash and reused on the next boot instead of
+    re-parsing and re-validating the YAML. The directory must only be writable by the
+    service.
+    """
+
+    def __init__(
+        self,
+        repository: QnaGraphRepository,
+        *,
+        poll_interval: float = 2.0,
+        keep_versions: int = 5,
+        cache_dir: Optional[str | Path] = None,
+    ) -> None:
+        self.repo = repository
+        self.poll_interval = poll_interval
+        self.keep_versions = keep_versions
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._latest: Dict[str, CompiledTree] = {}
+        self._versions: Dict[str, "OrderedDict[str, CompiledTree]"] = {}
+        self._files: Dict[Path, Tuple[int, int, str]] = {}
+        self._graph_hashes: Dict[str, str] = {}
+        self._config_dir: Optional[Path] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._sync_task: Optional[asyncio.Task[None]] = None
+        self.stats: Dict[str, int] = {
+            "loads": 0,
+            "reloads": 0,
+            "load_errors": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "graph_upserts": 0,
+            "graph_skips": 0,
+        }
+
+    # --- lookups ---
+
+    def get(self, tree_id: str, version: Optional[str] = None) -> Optional[CompiledTree]:
+        """The pinned `version` of a tree if it is still kept, else the latest one."""
+        if version:
+            pinned = self._versions.get(tree_id, {}).get(version)
+            if pinned is not None:
+                return pinned
+        return self._latest.get(tree_id)
+
+    def latest(self) -> List[CompiledTree]:
+        return list(self._latest.values())
+
+    # --- loading ---
+
+    def _install(self, compiled: CompiledTree) -> bool:
+        current = self._latest.get(compiled.tree_id)
+        if current is not None and current.content_hash == compiled.content_hash:
+            return False
+        versions = self._versions.setdefault(compiled.tree_id, OrderedDict())
+        versions[compiled.content_hash] = compiled
+        versions.move_to_end(compiled.content_hash)
+        while len(versions) > max(self.keep_versions, 1):
+            versions.popitem(last=False)
+        self._latest[compiled.tree_id] = compiled
+        return True
+
+    async def _sync_graph(self, compiled: CompiledTree) -> None:
+        tree = compiled.definition
+        if self._graph_hashes.get(tree.tree_id) == compiled.content_hash:
+            return
+        try:
+            stored = await self.repo.get_qtree_hash(tree.tree_id, tree.user_type)
+            if stored == compiled.content_hash:
+                self.stats["graph_skips"] += 1
+            else:
+                await self.repo.upsert_qtree(tree, content_hash=compiled.content_hash)
+                self.stats["graph_upserts"] += 1
+            self._graph_hashes[tree.tree_id] = compiled.content_hash
+        except Exception as e:
+            # Q&A runs from the in-memory tree; the next poll retries the upsert.
+            print(f"[qna_trees] graph upsert for {tree.tree_id} failed: {e}")
+
+    async def sync_graph(self) -> None:
+        """Upsert every latest tree whose graph copy is stale, concurrently."""
+        await asyncio.gather(*(self._sync_graph(tree) for tree in list(self._latest.values())))
+
+    # --- compile cache ---
+
+    def _cache_file(self, digest: str) -> Optional[Path]:
+        return self.cache_dir / f"{digest}.v{_CACHE_FORMAT}.pickle" if self.cache_dir else None
+
+    def _read_cache(self, digest: str) -> Optional[CompiledTree]:
+        cache_file = self._cache_file(digest)
+        if cache_file is None:
+            return None
+        try:
+            with cache_file.open("rb") as fh:
+                tree = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[qna_trees] ignoring unreadable cache entry {cache_file.name}: {e}")
+            return None
+        if not isinstance(tree, CompiledTree) or tree.content_hash != digest:
+            print(f"[qna_trees] ignoring cache entry {cache_file.name}: not a compiled tree for this file")
+            return None
+        return tree
+
+    def _write_cache(self, digest: str, tree: CompiledTree) -> None:
+        cache_file = self._cache_file(digest)
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp.open("wb") as fh:
+                pickle.dump(tree, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)  # atomic, so concurrent workers never read a partial file
+        except OSError as e:
+            print(f"[qna_trees] could not write cache entry {cache_file.name}: {e}")
+
+    def _compile_file(self, path: Path) -> _LoadedFile:
+        # Runs in a worker thread: file IO, YAML parsing and validation stay off the event loop.
+        stat = path.stat()
+        data = path.read_bytes()
+        digest = content_hash(data)
+        compiled = self._read_cache(digest)
+        cached = compiled is not None
+        if compiled is None:
+            tree = parse_qtree_yaml(data.decode("utf-8"), source=str(path))
+            compiled = replace(compile_qtree(tree), content_hash=digest)
+            self._write_cache(digest, compiled)
+        return _LoadedFile(path, stat.st_mtime_ns, stat.st_size, compiled, cached)
+
+    async def _load(self, path: Path) -> _LoadedFile:
+        try:
+            return await asyncio.to_thread(self._compile_file, path)
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+
+    def _accept(self, loaded: _LoadedFile) -> CompiledTree:
+        compiled = loaded.compiled
+        self.stats["cache_hits" if loaded.cached else "cache_misses"] += 1
+        self._files[loaded.path] = (loaded.mtime_ns, loaded.size, compiled.content_hash)
+        if self._install(compiled):
+            self.stats["loads"] += 1
+        return self.get(compiled.tree_id) or compiled
+
+    async def load_file(self, path: str | Path, *, sync_graph: bool = True) -> CompiledTree:
+        """Load (or reload) one YAML tree; raises if it is missing or invalid."""
+        compiled = self._accept(await self._load(Path(path)))
+        if sync_graph:
+            await self._sync_graph(compiled)
+        return compiled
+
+    async def load_directory(self, config_dir: Path, *, background_sync: bool = False) -> List[CompiledTree]:
+        """
+        Compile every tree in `config_dir` in parallel, then bring the graph up to date:
+        awaited by default, or in a background task with `background_sync=True` so the
+        caller (worker startup) does not wait on graph round-trips.
+        """
+        self._config_dir = config_dir
+        if not config_dir.exists():
+            return []
+        files = sorted(config_dir.glob("*.yaml"))
+        results = await asyncio.gather(*(self._load(f) for f in files))
+        # Installed in file order so duplicate tree ids resolve the same way on every boot.
+        loaded = [self._accept(result) for result in results]
+        if background_sync:
+            self._sync_task = asyncio.create_task(self.sync_graph())
+        else:
+            await self.sync_graph()
+        return loaded
+
+    @staticmethod
+    def _scan(
+        config_dir: Path, known_files: Dict[Path, Tuple[int, int, str]]
+    ) -> Tuple[List[Tuple[Path, int, int]], Dict[Path, Tuple[int, int, str]]]:
+        # Runs in a worker thread. Returns the files to reload plus new stat entries for
+        # files that were touched without changing.
+        changed: List[Tuple[Path, int, int]] = []
+        touched: Dict[Path, Tuple[int, int, str]] = {}
+        for yaml_file in sorted(config_dir.glob("*.yaml")):
+            try:
+                stat = yaml_file.stat()
+                known = known_files.get(yaml_file)
+                if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                if known is not None and content_hash(yaml_file.read_bytes()) == known[2]:
+                    touched[yaml_file] = (stat.st_mtime_ns, stat.st_size, known[2])
+                    continue
+            except FileNotFoundError:
+                continue
+            changed.append((yaml_file, stat.st_mtime_ns, stat.st_size))
+        return changed, touched
+
+    async def poll_once(self) -> List[str]:
+        """Reload YAML files whose mtime or size changed; returns the tree ids that got a new version."""
+        config_dir = self._config_dir
+        if config_dir is None or not await asyncio.to_thread(config_dir.exists):
+            return []
+        candidates, touched = await asyncio.to_thread(self._scan, config_dir, dict(self._files))
+        self._files.update(touched)
+        changed: List[str] = []
+        for yaml_file, mtime_ns, size in candidates:
+            known = self._files.get(yaml_file)
+            try:
+                before = {tid: t.content_hash for tid, t in self._latest.items()}
+                compiled = await self.load_file(yaml_file, sync_graph=False)
+            except Exception as e:
+                print(f"[qna_trees] keeping previous version; {yaml_file.name} failed to load: {e}")
+                # Remember the broken state so it is not re-parsed every poll.
+                self._files[yaml_file] = (mtime_ns, size, known[2] if known else "")
+                continue
+            if before.get(compiled.tree_id) != compiled.content_hash:
+                self.stats["reloads"] += 1
+                changed.append(compiled.tree_id)
+                print(f"[qna_trees] loaded {compiled.tree_id} version {compiled.content_hash}")
+        if self._sync_task is None or self._sync_task.done():
+            await self.sync_graph()  # also retries upserts that failed earlier; no-op once synced
+        return changed
+
+    # --- watcher ---
+
+    def start(self, config_dir: Optional[Path] = None) -> None:
+        if config_dir is not None:
+            self._config_dir = config_dir
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._sync_task):
+            if task is None or task.done():
+                continue
+            # An interrupted upsert is redone on the next boot: the stored hash won't match.
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._sync_task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[qna_trees] reload poll failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "watching": self._task is not None,
+            "graph_sync_pending": self._sync_task is not None and not self._sync_task.done(),
+            "counters": dict(self.stats),
+            "trees": {
+                tree_id: {"version": tree.content_hash, "versions_kept": list(self._versions.get(tree_id, {}))}
+                for tree_id, tree in self._latest.items()
+            },
+        }
@@ -7,6 +7,10 @@ import yaml
 
 from .models import QTreeDefinition, QuestionNode
 
+# libyaml's loader is several times faster; fall back to the pure-Python one when
+# PyYAML was built without it.
+_SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class QTreeValidationError(ValueError):
     pass
@@ -22,8 +26,13 @@ def load_qtree_from_yaml(path: str) -> QTreeDefinition:
     yaml_path = Path(path)
     if not yaml_path.exists():
         raise FileNotFoundError(f"Q&A YAML not found: {path}")
+    return parse_qtree_yaml(yaml_path.read_text(), source=path)
+
 
-    raw = yaml.safe_load(yaml_path.read_text())
+def parse_qtree_yaml(text: str, *, source: str = "<string>") -> QTreeDefinition:
+    raw = yaml.load(text, Loader=_SafeLoader)
+    if not isinstance(raw, dict):
+        raise QTreeValidationError(f"Q&A YAML {source} must be a mapping")
     _validate_required(raw, ["version", "namespace", "user_type", "tree_id", "root_question_id", "questions"], "qtree")
 
     questions: Dict[str, QuestionNode] = {}
@@ -8,6 +8,7 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: str | None = None
+    exp: int | None = None
 
 
 class LoginRequest(BaseModel):
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -12,7 +12,13 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str = Field(..., description="Latest user message content.")
-    messages: List[ChatMessage] = Field(default_factory=list, description="Existing conversation history.")
+    conversation_id: Optional[str] = Field(
+        None, description="Server-side conversation to continue; omit to start a new one."
+    )
+    messages: List[ChatMessage] = Field(
+        default_factory=list,
+        description="Client-side messages to append to the stored history before `message` (not the full history).",
+    )
     user_type: Optional[str] = Field(None, description="candidate or job_poster; defaults from user role.")
     qna_tree_id: Optional[str] = None
     qna_mode: bool = False
@@ -20,8 +26,22 @@ class ChatRequest(BaseModel):
 
 
 class ChatResponse(BaseModel):
-    messages: List[ChatMessage]
+    conversation_id: str
+    messages: List[ChatMessage] = Field(..., description="Messages produced by this turn only.")
     qna_mode: bool
     current_question_id: Optional[str]
     qna_tree_id: Optional[str]
     metadata: dict = Field(default_factory=dict)
+
+
+class ChatSocketFrame(BaseModel):
+    """Client frame on the `/chat/ws` WebSocket."""
+
+    type: Literal["auth", "message", "ping"]
+    id: Optional[str] = Field(None, description="Client-chosen id echoed on every event for this message.")
+    token: Optional[str] = Field(None, description="JWT access token (auth frame).")
+    conversation_id: Optional[str] = Field(None, description="Conversation to resume (auth frame).")
+    user_type: Optional[str] = None
+    content: Optional[str] = Field(None, description="User message (message frame).")
+    messages: List[ChatMessage] = Field(default_factory=list)
+    qna_tree_id: Optional[str] = None
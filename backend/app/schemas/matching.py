@@ -1,6 +1,9 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Upper bound on graph top-k results per request.
+GRAPH_TOP_K_MAX = 1000
 
 
 class CandidatesForJobRequest(BaseModel):
@@ -48,3 +51,27 @@ class JobMatchOut(BaseModel):
 class JobsForCandidateResponse(BaseModel):
     candidate_id: int
     matches: List[JobMatchOut]
+
+
+class GraphUsersForJobRequest(BaseModel):
+    job_id: str
+    user_ids: Optional[List[str]] = None  # default: every user with a matching trait
+    top_k: int = Field(20, ge=1, le=GRAPH_TOP_K_MAX)
+    stream: bool = False  # NDJSON of every score, batch by batch, instead of a top-k
+
+
+class GraphJobsForUserRequest(BaseModel):
+    user_id: str
+    job_ids: Optional[List[str]] = None  # default: every job with a matching requirement
+    top_k: int = Field(20, ge=1, le=GRAPH_TOP_K_MAX)
+    stream: bool = False
+
+
+class GraphScoreOut(BaseModel):
+    id: str
+    score: float
+    breakdown: List[Dict[str, Any]] = []
+
+
+class GraphScoresResponse(BaseModel):
+    matches: List[GraphScoreOut]
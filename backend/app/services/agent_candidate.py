@@ -8,11 +8,25 @@ from sqlalchemy.orm import Session
 from ..core.config import get_settings
 from ..models.candidate import Candidate
 from ..models.user import User
+from .llm_cache import get_llm_cache, normalize_input
 
 settings = get_settings()
 
+# Part of the LLM cache key for resume extraction.
+CANDIDATE_EXTRACTION_PROMPT_VERSION = "v1"
+
 
 def _extract_candidate_struct_from_resume_with_openai(text: str) -> Dict[str, Any]:
+    return get_llm_cache().get_or_compute(
+        "agent_candidates.extract",
+        model=settings.OPENAI_CHAT_MODEL,
+        template_version=CANDIDATE_EXTRACTION_PROMPT_VERSION,
+        normalized_input=normalize_input(text),
+        compute=lambda: _call_openai_extraction(text),
+    )
+
+
+def _call_openai_extraction(text: str) -> Dict[str, Any]:
     from openai import OpenAI
 
     client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -8,11 +8,25 @@ from sqlalchemy.orm import Session
 from ..core.config import get_settings
 from ..models.job import Job
 from ..models.user import User
+from .llm_cache import get_llm_cache, normalize_input
 
 settings = get_settings()
 
+# Bump whenever the system prompt or parsing below changes so stale cache entries are ignored.
+JOB_EXTRACTION_PROMPT_VERSION = "v1"
+
 
 def _extract_job_struct_from_prompt_with_openai(prompt: str) -> Dict[str, Any]:
+    return get_llm_cache().get_or_compute(
+        "agent_jobs.extract",
+        model=settings.OPENAI_CHAT_MODEL,
+        template_version=JOB_EXTRACTION_PROMPT_VERSION,
+        normalized_input=normalize_input(prompt),
+        compute=lambda: _call_openai_extraction(prompt),
+    )
+
+
+def _call_openai_extraction(prompt: str) -> Dict[str, Any]:
     from openai import OpenAI
 
     client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.conversation import Conversation, ConversationMessage
+
+
+@dataclass
+class ConversationRecord:
+    id: str
+    user_id: int
+    user_type: Optional[str] = None
+    qna_tree_id: Optional[str] = None
+    qna_tree_version: Optional[str] = None
+    qna_mode: bool = False
+    current_question_id: Optional[str] = None
+    message_count: int = 0
+    # Only the trailing history window is kept resident.
+    messages: Deque[Dict[str, Any]] = field(default_factory=deque)
+
+
+class ConversationStore:
+    """
+    Server-side chat history, so clients send only the new message each turn.
+
+    SQL is the source of truth; an LRU of recently active conversations (with the
+    last `history_window` messages each) avoids reloading history per turn. A hot
+    entry is trusted only while its message count matches the SQL row, which keeps
+    multiple workers consistent at the cost of one primary-key lookup.
+    """
+
+    def __init__(self, *, history_window: int = 50, hot_size: int = 1000) -> None:
+        self.history_window = history_window
+        self.hot_size = hot_size
+        self._hot: "OrderedDict[str, ConversationRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, record: ConversationRecord) -> None:
+        with self._lock:
+            self._hot[record.id] = record
+            self._hot.move_to_end(record.id)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def create(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        user_type: Optional[str] = None,
+    ) -> ConversationRecord:
+        record = ConversationRecord(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            user_type=user_type,
+            messages=deque(maxlen=self.history_window),
+        )
+        db.add(Conversation(id=record.id, user_id=user_id, user_type=user_type, qna_mode=False, message_count=0))
+        db.commit()
+        self._remember(record)
+        return record
+
+    def get(self, db: Session, conversation_id: str, *, user_id: int) -> Optional[ConversationRecord]:
+        row = db.get(Conversation, conversation_id)
+        if row is None or row.user_id != user_id:
+            return None
+
+        with self._lock:
+            hot = self._hot.get(conversation_id)
+            if hot is not None:
+                self._hot.move_to_end(conversation_id)
+        if hot is not None and hot.message_count == (row.message_count or 0):
+            return hot
+
+        recent = (
+            db.query(ConversationMessage)
+            .filter(ConversationMessage.conversation_id == conversation_id)
+            .order_by(ConversationMessage.seq.desc())
+            .limit(self.history_window)
+            .all()
+        )
+        record = ConversationRecord(
+            id=row.id,
+            user_id=row.user_id,
+            user_type=row.user_type,
+            qna_tree_id=row.qna_tree_id,
+            qna_tree_version=row.qna_tree_version,
+            qna_mode=bool(row.qna_mode),
+            current_question_id=row.current_question_id,
+            message_count=row.message_count or 0,
+            messages=deque(
+                ({"role": m.role, "content": m.content} for m in reversed(recent)),
+                maxlen=self.history_window,
+            ),
+        )
+        self._remember(record)
+        return record
+
+    def history(self, record: ConversationRecord) -> List[Dict[str, Any]]:
+        return list(record.messages)
+
+    def append(
+        self,
+        db: Session,
+        record: ConversationRecord,
+        messages: Iterable[Dict[str, Any]],
+        *,
+        user_type: Optional[str],
+        qna_tree_id: Optional[str],
+        qna_mode: bool,
+        current_question_id: Optional[str],
+        qna_tree_version: Optional[str] = None,
+    ) -> None:
+        """
+        Persist new messages plus the resulting Q&A state, then update the hot entry.
+        The hot entry is only touched once the commit succeeds; on failure (e.g. another
+        worker appended first and `seq` collided) it is dropped so the next `get` reloads.
+        """
+        new_messages = [{"role": m.get("role"), "content": m.get("content") or ""} for m in messages]
+        seq = record.message_count
+        try:
+            for m in new_messages:
+                seq += 1
+                db.add(ConversationMessage(conversation_id=record.id, seq=seq, role=m["role"], content=m["content"]))
+
+            row = db.get(Conversation, record.id)
+            if row is not None:
+                row.user_type = user_type
+                row.qna_tree_id = qna_tree_id
+                row.qna_tree_version = qna_tree_version
+                row.qna_mode = qna_mode
+                row.current_question_id = current_question_id
+                row.message_count = seq
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._hot.pop(record.id, None)
+            raise
+
+        record.messages.extend(new_messages)
+        record.message_count = seq
+        record.user_type = user_type
+        record.qna_tree_id = qna_tree_id
+        record.qna_tree_version = qna_tree_version
+        record.qna_mode = qna_mode
+        record.current_question_id = current_question_id
+        self._remember(record)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..models.llm_cache import LLMCacheEntry
+
+settings = get_settings()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes, Postgres aware ones; both hold UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def normalize_input(text: str, *, casefold: bool = False) -> str:
+    """Collapse whitespace (and optionally case) so trivially different inputs share a cache key."""
+    normalized = _WHITESPACE_RE.sub(" ", text or "").strip()
+    return normalized.casefold() if casefold else normalized
+
+
+class LLMResponseCache:
+    """
+    Persistent cache for deterministic LLM calls, keyed by
+    (namespace, model, prompt template version, normalized input hash).
+
+    Entries expire after `ttl_seconds`; once the table grows past `max_entries`
+    the least recently used rows are evicted. Eviction runs on one write in every
+    `max_entries // 100`, not on every write. Cache failures never break the
+    underlying call: lookups degrade to misses and writes are dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: sessionmaker = SessionLocal,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_entries: int = 10_000,
+        enabled: bool = True,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._evict_every = max(1, max_entries // 100)
+        self._writes_until_evict = 1  # evict on the first write, then periodically
+
+    @staticmethod
+    def make_key(namespace: str, model: str, template_version: str, normalized_input: str) -> str:
+        digest = hashlib.sha256()
+        for part in (namespace, model, template_version, normalized_input):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _count(self, namespace: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            ns = self._stats.setdefault(
+                namespace, {"hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evictions": 0, "errors": 0}
+            )
+            ns[field] += amount
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        now = _utcnow()
+        try:
+            db: Session = self.session_factory()
+            try:
+                entry = db.get(LLMCacheEntry, key)
+                if entry is None:
+                    return None
+                if entry.expires_at is not None and _as_utc(entry.expires_at) <= now:
+                    db.delete(entry)
+                    db.commit()
+                    return None
+                entry.hits = (entry.hits or 0) + 1
+                entry.last_used_at = now
+                value = entry.value
+                db.commit()
+                return value
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"[llm_cache] lookup failed for {namespace}: {e}")
+            self._count(namespace, "errors")
+            return None
+
+    def _evict_due(self) -> bool:
+        with self._lock:
+            self._writes_until_evict -= 1
+            if self._writes_until_evict > 0:
+                return False
+            self._writes_until_evict = self._evict_every
+            return True
+
+    def set(self, namespace: str, key: str, value: Any, *, model: str, template_version: str) -> None:
+        now = _utcnow()
+        try:
+            db: Session = self.session_factory()
+            try:
+                entry = db.get(LLMCacheEntry, key) or LLMCacheEntry(key=key)
+                entry.namespace = namespace
+                entry.model = model
+                entry.template_version = template_version
+                entry.value = value
+                entry.hits = entry.hits or 0
+                entry.expires_at = now + timedelta(seconds=self.ttl_seconds) if self.ttl_seconds > 0 else None
+                entry.last_used_at = now
+                db.add(entry)
+                db.commit()
+                self._count(namespace, "writes")
+                if self._evict_due():
+                    self._evict(db, namespace, now)
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"[llm_cache] write failed for {namespace}: {e}")
+            self._count(namespace, "errors")
+
+    def _evict(self, db: Session, namespace: str, now: datetime) -> None:
+        expired = (
+            db.query(LLMCacheEntry)
+            .filter(LLMCacheEntry.expires_at.isnot(None), LLMCacheEntry.expires_at <= now)
+            .delete(synchronize_session=False)
+        )
+        overflow = db.query(LLMCacheEntry).count() - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            stale_keys = [
+                k
+                for (k,) in db.query(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.last_used_at.asc())
+                .limit(overflow)
+                .all()
+            ]
+            evicted = (
+                db.query(LLMCacheEntry)
+                .filter(LLMCacheEntry.key.in_(stale_keys))
+                .delete(synchronize_session=False)
+            )
+        if expired or evicted:
+            db.commit()
+            self._count(namespace, "evictions", expired + evicted)
+
+    def lookup(self, namespace: str, key: str) -> Optional[Any]:
+        """`get` with hit/miss accounting, for callers that compute misses themselves (e.g. in batches)."""
+        value = self.get(namespace, key)
+        self._count(namespace, "hits" if value is not None else "misses")
+        return value
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        *,
+        model: str,
+        template_version: str,
+        normalized_input: str,
+        compute: Callable[[], Any],
+        bypass: bool = False,
+    ) -> Any:
+        """
+        Return the cached response for this input, or call `compute()` and store its
+        (JSON-serializable) result. `bypass=True` skips both the lookup and the write.
+        """
+        if bypass or not self.enabled:
+            self._count(namespace, "bypassed")
+            return compute()
+
+        key = self.make_key(namespace, model, template_version, normalized_input)
+        cached = self.lookup(namespace, key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        self.set(namespace, key, value, model=model, template_version=template_version)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {ns: dict(counts) for ns, counts in self._stats.items()}
+        for counts in namespaces.values():
+            lookups = counts.get("hits", 0) + counts.get("misses", 0)
+            counts["hit_rate"] = round(counts.get("hits", 0) / lookups, 4) if lookups else 0.0
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "namespaces": namespaces,
+        }
+
+
+@lru_cache
+def get_llm_cache() -> LLMResponseCache:
+    return LLMResponseCache(
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        enabled=not settings.LLM_CACHE_BYPASS,
+    )
@@ -2,13 +2,19 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from typing import List
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Sequence
 
 from sqlalchemy.orm import Session
 
 from ..core.config import get_settings
 from ..models.candidate import Candidate
 from ..models.job import Job
+from ..models.user import User
+from ..qna_graph.graph_client_base import GraphClient
+from ..qna_graph.scoring import GraphMatchScore, iter_jobs_for_user, iter_users_for_job
+
+if TYPE_CHECKING:
+    from ..qna_graph.projection import TraitProjection
 
 settings = get_settings()
 
@@ -347,3 +353,69 @@ def rank_jobs_for_candidate(
 
     matches.sort(key=lambda m: m.score, reverse=True)
     return matches[:limit]
+
+
+# --- graph trait scoring ---
+#
+# Graph `User`/`Job` ids are the SQL primary keys as strings. Both directions are
+# scoped to the caller's org: the anchor must belong to it, and the scored ids are
+# limited to it (all of the org's ids when the request names none).
+
+
+def _in_org(db: Session, model, org_id: int, subject_id: str) -> bool:
+    if not str(subject_id).isdigit():
+        return False
+    return db.query(model.id).filter(model.org_id == org_id, model.id == int(subject_id)).first() is not None
+
+
+def _org_ids(db: Session, model, org_id: int, requested: Optional[Sequence[str]]) -> List[str]:
+    query = db.query(model.id).filter(model.org_id == org_id)
+    if requested is not None:
+        wanted = {int(i) for i in requested if str(i).isdigit()}
+        if not wanted:
+            return []
+        query = query.filter(model.id.in_(wanted))
+    return [str(row.id) for row in query.order_by(model.id).all()]
+
+
+def _use_projection(projection: Optional["TraitProjection"]) -> bool:
+    # In-process trait vectors instead of a graph traversal when configured.
+    return projection is not None and settings.GRAPH_SCORING_SOURCE == "projection"
+
+
+def graph_users_for_job(
+    *,
+    db: Session,
+    org_id: int,
+    job_id: str,
+    user_ids: Optional[Sequence[str]],
+    graph_client: Optional[GraphClient],
+    projection: Optional["TraitProjection"] = None,
+) -> AsyncIterator[List[GraphMatchScore]]:
+    if not _in_org(db, Job, org_id, job_id):
+        raise ValueError("Job not found")
+    scoped = _org_ids(db, User, org_id, user_ids)
+    if _use_projection(projection):
+        return projection.iter_users_for_job(job_id, scoped)
+    if graph_client is None:
+        raise RuntimeError("Graph client not initialized")
+    return iter_users_for_job(graph_client, job_id, scoped, chunk_size=settings.GRAPH_SCORING_CHUNK_SIZE)
+
+
+def graph_jobs_for_user(
+    *,
+    db: Session,
+    org_id: int,
+    user_id: str,
+    job_ids: Optional[Sequence[str]],
+    graph_client: Optional[GraphClient],
+    projection: Optional["TraitProjection"] = None,
+) -> AsyncIterator[List[GraphMatchScore]]:
+    if not _in_org(db, User, org_id, user_id):
+        raise ValueError("User not found")
+    scoped = _org_ids(db, Job, org_id, job_ids)
+    if _use_projection(projection):
+        return projection.iter_jobs_for_user(user_id, scoped)
+    if graph_client is None:
+        raise RuntimeError("Graph client not initialized")
+    return iter_jobs_for_user(graph_client, user_id, scoped, chunk_size=settings.GRAPH_SCORING_CHUNK_SIZE)
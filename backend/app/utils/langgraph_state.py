@@ -7,9 +7,12 @@ from typing import Any, Dict, List, Literal, Optional
 @dataclass
 class ChatState:
     messages: List[Dict[str, Any]] = field(default_factory=list)
+    conversation_id: Optional[str] = None
     user_id: str = ""
     user_type: Literal["candidate", "job_poster"] = "candidate"
     qna_tree_id: Optional[str] = None
+    # Tree version (content hash) pinned when the Q&A flow started.
+    qna_tree_version: Optional[str] = None
     current_question_id: Optional[str] = None
     qna_mode: bool = False
     pending_attribute: Optional[str] = None
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from app.agents.qna_agent import _pattern_tier
+from app.qna_graph.compiled_tree import PATTERN_AMBIGUOUS_CONFIDENCE, PATTERN_MATCH_CONFIDENCE, compile_qtree
+from app.qna_graph.yaml_loader import QTreeValidationError, load_qtree_from_yaml, parse_qtree_yaml
+
+CONFIG_DIR = Path(__file__).resolve().parents[1] / "app" / "qna_graph" / "config"
+
+
+@pytest.fixture(scope="module")
+def language_question():
+    tree = compile_qtree(load_qtree_from_yaml(str(CONFIG_DIR / "candidate_programming_language.yaml")))
+    return tree.questions["q.programming_language"]
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [
+        ("Python, mostly", "python"),
+        ("python all day, I love py... python", "python"),
+        ("No favorite really", "polyglot"),  # the negation is part of the pattern
+    ],
+)
+def test_plain_match_is_confident(language_question, text, value) -> None:
+    match = language_question.classify(text)
+    assert (match.normalized_value, match.confidence) == (value, PATTERN_MATCH_CONFIDENCE)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I don't like python, prefer ruby",
+        "not java",
+        "Never rust again",
+        "java, or maybe rust",
+    ],
+)
+def test_negated_or_mixed_answer_is_left_to_the_llm(language_question, text) -> None:
+    assert language_question.classify(text).confidence == PATTERN_AMBIGUOUS_CONFIDENCE
+
+
+def test_pattern_tier_only_answers_confident_matches(language_question) -> None:
+    _, result = _pattern_tier(language_question.node, "python", language_question)
+    assert result is not None and result[0] == "python"
+    match, result = _pattern_tier(language_question.node, "I don't like python, prefer ruby", language_question)
+    assert match is not None and result is None  # falls through to the LLM tier
+
+
+_LOOP_TREE = """
+version: 1
+namespace: test
+user_type: candidate
+tree_id: loop
+root_question_id: q.more
+questions:
+  q.more:
+    text: "Anything else?"
+    type: free_text_classified
+    attribute: more
+    options:
+      - label: "Yes"
+        patterns: ["yes"]
+        normalized_value: "yes"
+    follow_ups:
+      on_value:
+        "yes": q.detail
+  q.detail:
+    text: "Tell me more."
+    type: free_text
+    attribute: detail
+    follow_ups:
+      default: q.more
+"""
+
+
+def test_branching_question_without_default_can_end_the_tree() -> None:
+    # q.more -> q.detail -> q.more is a loop, but any answer to q.more other than "yes" ends it.
+    tree = compile_qtree(parse_qtree_yaml(_LOOP_TREE))
+    assert tree.next_question("q.more", "yes").id == "q.detail"
+    assert tree.next_question("q.more", "no") is None
+
+
+def test_loop_with_no_way_out_is_rejected() -> None:
+    trapped = _LOOP_TREE.replace('"yes": q.detail', "default: q.detail")
+    with pytest.raises(QTreeValidationError, match="cycle"):
+        compile_qtree(parse_qtree_yaml(trapped))
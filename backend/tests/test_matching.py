@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.job import Job
+from app.models.organization import Organization
+from app.models.user import User
+from app.qna_graph.memory_graph_client import InMemoryGraphClient
+from app.services.matching import graph_jobs_for_user, graph_users_for_job
+
+
+def _db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'matching.db'}")
+    Base.metadata.create_all(bind=engine, tables=[Organization.__table__, User.__table__, Job.__table__])
+    db = sessionmaker(bind=engine)()
+    for org_id in (1, 2):
+        db.add(Organization(id=org_id, name=f"org{org_id}"))
+    # Users 1-2 and job 1 are in org 1; user 3 and job 2 in org 2.
+    for user_id, org_id in ((1, 1), (2, 1), (3, 2)):
+        db.add(User(id=user_id, org_id=org_id, email=f"u{user_id}@example.com", password_hash="x"))
+    for job_id, org_id in ((1, 1), (2, 2)):
+        db.add(Job(id=job_id, org_id=org_id, title=f"job{job_id}", created_by_user_id=job_id))
+    db.commit()
+    return db
+
+
+async def _graph() -> InMemoryGraphClient:
+    client = InMemoryGraphClient()
+    for job_id in ("1", "2"):
+        await client.run_cypher(
+            "MERGE (j:Job {id:$job_id}) MERGE (c:Concept {id:'python'}) "
+            "MERGE (j)-[:REQUIRES_SKILL {attribute:'programming_language', weight:1.0}]->(c)",
+            {"job_id": job_id},
+        )
+    for user_id in ("1", "2", "3"):
+        await client.run_cypher(
+            "MERGE (u:User {id:$user_id}) MERGE (c:Concept {id:'python'}) "
+            "MERGE (u)-[:HAS_TRAIT {attribute:'programming_language', strength:1.0, confidence:1.0}]->(c)",
+            {"user_id": user_id},
+        )
+    return client
+
+
+async def _ids(batches) -> list:
+    return sorted([score.subject_id async for batch in batches for score in batch])
+
+
+def test_graph_scores_are_scoped_to_the_org(tmp_path) -> None:
+    db = _db(tmp_path)
+
+    async def scenario() -> None:
+        client = await _graph()
+        users = graph_users_for_job(db=db, org_id=1, job_id="1", user_ids=None, graph_client=client)
+        assert await _ids(users) == ["1", "2"]
+        # Ids from another org are dropped even when asked for by name.
+        users = graph_users_for_job(db=db, org_id=1, job_id="1", user_ids=["2", "3"], graph_client=client)
+        assert await _ids(users) == ["2"]
+        jobs = graph_jobs_for_user(db=db, org_id=1, user_id="1", job_ids=None, graph_client=client)
+        assert await _ids(jobs) == ["1"]
+
+    asyncio.run(scenario())
+
+
+def test_graph_scores_reject_another_orgs_anchor(tmp_path) -> None:
+    db = _db(tmp_path)
+    client = InMemoryGraphClient()
+    with pytest.raises(ValueError, match="Job not found"):
+        graph_users_for_job(db=db, org_id=1, job_id="2", user_ids=None, graph_client=client)
+    with pytest.raises(ValueError, match="User not found"):
+        graph_jobs_for_user(db=db, org_id=1, user_id="3", job_ids=None, graph_client=client)
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.qna_graph.neptune_graph_client import NeptuneGraphClient, NeptuneTransientError
+
+# (status, body) returned in order by the fake openCypher endpoint; the last one repeats.
+Reply = Tuple[int, Dict[str, Any]]
+
+
+async def _serve(replies: List[Reply]) -> Tuple[TestServer, List[Dict[str, Any]]]:
+    received: List[Dict[str, Any]] = []
+
+    async def open_cypher(request: web.Request) -> web.Response:
+        received.append(await request.json())
+        status, body = replies[min(len(received), len(replies)) - 1]
+        return web.json_response(body, status=status)
+
+    app = web.Application()
+    app.router.add_post("/openCypher", open_cypher)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    return server, received
+
+
+def _client(server: TestServer) -> NeptuneGraphClient:
+    return NeptuneGraphClient(
+        endpoint=server.host,
+        port=server.port,
+        region=None,
+        use_https=False,
+        retry_base_delay=0.0,
+        retry_max_delay=0.0,
+    )
+
+
+def _run(replies: List[Reply], scenario) -> List[Dict[str, Any]]:
+    async def main() -> List[Dict[str, Any]]:
+        server, received = await _serve(replies)
+        client = _client(server)
+        try:
+            await scenario(client)
+        finally:
+            await client.close()
+            await server.close()
+        return received
+
+    return asyncio.run(main())
+
+
+def test_decodes_results_and_sends_parameters() -> None:
+    async def scenario(client: NeptuneGraphClient) -> None:
+        rows = await client.run_cypher("MATCH (u:User {id:$id}) RETURN u.id AS id", {"id": "7"}, idempotent=True)
+        assert rows == [{"id": "7"}]
+
+    received = _run([(200, {"results": [{"id": "7"}]})], scenario)
+    assert received == [{"query": "MATCH (u:User {id:$id}) RETURN u.id AS id", "parameters": {"id": "7"}}]
+
+
+def test_retries_5xx_for_idempotent_statements() -> None:
+    async def scenario(client: NeptuneGraphClient) -> None:
+        assert await client.run_cypher("MATCH (n) RETURN n", idempotent=True) == [{"n": 1}]
+
+    received = _run([(503, {"code": "ServiceUnavailable"}), (200, {"results": [{"n": 1}]})], scenario)
+    assert len(received) == 2
+
+
+def test_retries_throttling_even_for_writes() -> None:
+    async def scenario(client: NeptuneGraphClient) -> None:
+        assert await client.run_cypher("CREATE (n:Answer) RETURN n") == []
+
+    received = _run([(429, {"code": "ThrottlingException"}), (200, {"results": []})], scenario)
+    assert len(received) == 2
+
+
+def test_does_not_retry_5xx_for_non_idempotent_writes() -> None:
+    async def scenario(client: NeptuneGraphClient) -> None:
+        with pytest.raises(NeptuneTransientError):
+            await client.run_cypher("CREATE (n:Answer) RETURN n")
+
+    received = _run([(500, {"code": "InternalFailureException"}), (200, {"results": []})], scenario)
+    assert len(received) == 1
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.graph_outbox import GraphOutboxEntry, GraphOutboxLease
+from app.qna_graph.memory_graph_client import InMemoryGraphClient
+from app.qna_graph.models import AnswerRecord, HasTraitEdge
+from app.qna_graph.outbox import GraphWriteBehind
+from app.qna_graph.repository import QnaGraphRepository
+
+
+def _session_factory(tmp_path) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    GraphOutboxEntry.__table__.create(bind=engine)
+    GraphOutboxLease.__table__.create(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_replaying_an_entry_writes_one_answer(tmp_path) -> None:
+    async def scenario() -> None:
+        client = InMemoryGraphClient()
+        outbox = GraphWriteBehind(QnaGraphRepository(client, "test"), session_factory=_session_factory(tmp_path))
+        answer = AnswerRecord(
+            user_id="u1",
+            question_id="q.programming_language",
+            raw_text="java",
+            normalized_value="java",
+            attributes={},
+            confidence=0.9,
+            timestamp=datetime(2026, 1, 1),
+            tree_id="candidate.programming_language",
+        )
+        trait = HasTraitEdge("u1", "programming_language", "java", "programming_language", 1.0, 0.9, "java")
+        await outbox.enqueue_answer(answer, [trait])
+
+        # A flush that dies before `_settle` leaves the entry pending, so it is applied again.
+        [entry] = await asyncio.to_thread(outbox._load_pending)
+        await outbox._apply(entry)
+        assert await outbox.flush_once() == 0
+
+        assert await client.run_cypher("MATCH (a:Answer) RETURN count(a) AS n") == [{"n": 1}]
+        assert await client.run_cypher("MATCH (:User)-[h:HAS_TRAIT]->(:Concept) RETURN count(h) AS n") == [{"n": 1}]
+        assert await asyncio.to_thread(outbox._load_pending) == []
+
+    asyncio.run(scenario())
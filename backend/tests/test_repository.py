@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from app.qna_graph.memory_graph_client import InMemoryGraphClient
+from app.qna_graph.models import AnswerRecord, HasTraitEdge
+from app.qna_graph.repository import QnaGraphRepository
+from app.qna_graph.tree_registry import TreeRegistry
+
+CONFIG_DIR = Path(__file__).resolve().parents[1] / "app" / "qna_graph" / "config"
+
+
+async def _two_tree_repo() -> tuple[InMemoryGraphClient, QnaGraphRepository]:
+    client = InMemoryGraphClient()
+    repo = QnaGraphRepository(client, "test")
+    # The candidate and job trees both define q.programming_language.
+    await TreeRegistry(repo).load_directory(CONFIG_DIR)
+    return client, repo
+
+
+def test_record_answer_matches_only_its_own_tree() -> None:
+    async def scenario() -> None:
+        client, repo = await _two_tree_repo()
+        shared = await client.run_cypher("MATCH (q:Question {id:'q.programming_language'}) RETURN count(q) AS n")
+        assert shared == [{"n": 2}]
+
+        answer = AnswerRecord(
+            user_id="u1",
+            question_id="q.programming_language",
+            raw_text="python",
+            normalized_value="python",
+            attributes={},
+            confidence=0.9,
+            timestamp=datetime(2026, 1, 1),
+            tree_id="candidate.programming_language",
+        )
+        trait = HasTraitEdge("u1", "programming_language", "python", "programming_language", 1.0, 0.9, "python")
+        await repo.record_answer(answer, [trait])
+
+        assert await client.run_cypher("MATCH (a:Answer) RETURN count(a) AS n") == [{"n": 1}]
+        assert await client.run_cypher("MATCH (:User)-[r:LAST_ANSWER]->(:Answer) RETURN count(r) AS n") == [{"n": 1}]
+        last = await repo.get_last_answer("u1", "candidate.programming_language")
+        assert last is not None and last["normalized_value"] == "python"
+        assert await repo.get_last_answer("u1", "job.programming_language") is None
+
+    asyncio.run(scenario())
@@ -1,3 +1,5 @@
+from typing import Any, Dict
+
 import streamlit as st
 
 from utils.api_client import APIClient
@@ -16,6 +18,10 @@ def init_session():
         st.session_state["qna_tree_id"] = None
     if "qna_mode" not in st.session_state:
         st.session_state["qna_mode"] = False
+    if "conversation_id" not in st.session_state:
+        st.session_state["conversation_id"] = None
+    if "chat_unsynced" not in st.session_state:
+        st.session_state["chat_unsynced"] = []  # local messages the server hasn't seen yet
 
 
 def main():
@@ -38,6 +44,7 @@ def main():
 
         if st.button("Start Questions"):
             st.session_state["chat_messages"].append({"role": "user", "content": "start job questions"})
+            st.session_state["chat_unsynced"].append({"role": "user", "content": "start job questions"})
 
         # if st.button("Show open jobs"):
         #     st.session_state["chat_messages"].append({"role": "user", "content": "Show open jobs"})
@@ -82,15 +89,15 @@ def main():
                 else:
                     summary = result["summary"]
                     job = result["job"]
-                    st.session_state["chat_messages"].append(
+                    local_messages = [
                         {
                             "role": "user",
                             "content": f"I uploaded a job description file '{result['filename']}'.",
-                        }
-                    )
-                    st.session_state["chat_messages"].append(
-                        {"role": "agent", "content": summary}
-                    )
+                        },
+                        {"role": "agent", "content": summary},
+                    ]
+                    st.session_state["chat_messages"].extend(local_messages)
+                    st.session_state["chat_unsynced"].extend(local_messages)
                     st.success(f"Created job #{job['id']}: {job['title']}")
 
     with left:
@@ -107,31 +114,51 @@ def main():
         if user_input:
             print(f"user input: {user_input}")
             st.session_state["chat_messages"].append({"role": "user", "content": user_input})
-            payload_messages = []
-            for m in st.session_state["chat_messages"]:
-                role = "assistant" if m["role"] != "user" else "user"
-                payload_messages.append({"role": role, "content": m["content"]})
+            payload_messages = [
+                {"role": "assistant" if m["role"] != "user" else "user", "content": m["content"]}
+                for m in st.session_state["chat_unsynced"]
+            ]
 
             user_type = None
             current_user = st.session_state.get("current_user")
             if current_user and "role" in current_user:
                 user_type = "candidate" if current_user["role"] == "candidate" else "job_poster"
 
-            resp = api.router_chat(
-                message=user_input,
-                messages=payload_messages,
-                user_type=user_type,
-                qna_tree_id=st.session_state.get("qna_tree_id"),
-                qna_mode=st.session_state.get("qna_mode", False),
-                current_question_id=st.session_state.get("current_question_id"),
-            )
-            if "error" in resp:
-                st.session_state["chat_messages"].append({"role": "assistant", "content": resp["error"]})
+            resp: Dict[str, Any] = {}
+            with st.chat_message("user"):
+                st.markdown(user_input)
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                streamed = ""
+                for event in api.router_chat_stream(
+                    message=user_input,
+                    conversation_id=st.session_state.get("conversation_id"),
+                    messages=payload_messages,
+                    user_type=user_type,
+                ):
+                    kind = event.get("event")
+                    if kind == "token":
+                        streamed += event.get("content", "")
+                        placeholder.markdown(streamed)
+                    elif kind == "message" and event.get("role") != "user":
+                        streamed = event.get("content", "")
+                        placeholder.markdown(streamed)
+                    elif kind == "done":
+                        resp = event
+                    elif kind == "error":
+                        resp = {"error": str(event.get("detail"))}
+
+            if "error" in resp or not resp:
+                st.session_state["chat_messages"].append(
+                    {"role": "assistant", "content": resp.get("error", "No response from the chat service.")}
+                )
             else:
-                st.session_state["chat_messages"] = [
+                st.session_state["chat_unsynced"] = []
+                st.session_state["conversation_id"] = resp.get("conversation_id")
+                st.session_state["chat_messages"].extend(
                     {"role": "user" if m["role"] == "user" else "assistant", "content": m["content"]}
                     for m in resp.get("messages", [])
-                ]
+                )
                 st.session_state["qna_mode"] = resp.get("qna_mode", False)
                 st.session_state["qna_tree_id"] = resp.get("qna_tree_id", st.session_state.get("qna_tree_id"))
                 st.session_state["current_question_id"] = resp.get(
@@ -1,5 +1,6 @@
+import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 import requests
 
@@ -55,27 +56,62 @@ class APIClient:
     def router_chat(
         self,
         message: str,
+        conversation_id: str | None = None,
         messages: List[Dict[str, Any]] | None = None,
         user_type: str | None = None,
-        qna_tree_id: str | None = None,
-        qna_mode: bool = False,
-        current_question_id: str | None = None,
     ) -> Dict[str, Any]:
+        """
+        Send one chat turn. History and Q&A state live server-side under `conversation_id`;
+        `messages` only carries client-side messages the server hasn't seen yet.
+        """
         payload: Dict[str, Any] = {"message": message}
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
         if messages:
             payload["messages"] = messages
         if user_type:
             payload["user_type"] = user_type
-        if qna_tree_id:
-            payload["qna_tree_id"] = qna_tree_id
-        payload["qna_mode"] = qna_mode
-        payload["current_question_id"] = current_question_id
 
         resp = requests.post(f"{API_URL}/chat/router", json=payload, headers=self._headers())
         if resp.status_code == 200:
             return resp.json()
         return {"error": f"[error {resp.status_code}] {resp.text}"}
 
+    def router_chat_stream(
+        self,
+        message: str,
+        conversation_id: str | None = None,
+        messages: List[Dict[str, Any]] | None = None,
+        user_type: str | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of `router_chat`. Yields server-sent events as dicts with an
+        "event" key ("token", "node", "message", "done" or "error") plus the event data.
+        """
+        payload: Dict[str, Any] = {"message": message}
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        if messages:
+            payload["messages"] = messages
+        if user_type:
+            payload["user_type"] = user_type
+
+        with requests.post(
+            f"{API_URL}/chat/router/stream", json=payload, headers=self._headers(), stream=True
+        ) as resp:
+            if resp.status_code != 200:
+                yield {"event": "error", "detail": f"[error {resp.status_code}] {resp.text}"}
+                return
+            event = "message"
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:") :].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:") :].strip())
+                    yield {"event": event, **data}
+
     def get_jobs(self, status_filter: Optional[str] = None, q: Optional[str] = None) -> List[Dict[str, Any]]:
         params: Dict[str, Any] = {}
         if status_filter: